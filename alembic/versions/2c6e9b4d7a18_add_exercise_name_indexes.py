@@ -0,0 +1,39 @@
+"""Add lower(name) and trigram indexes on exercises
+
+Revision ID: 2c6e9b4d7a18
+Revises: e71a4c2b9f35
+Create Date: 2026-10-19 19:21:08.437519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c6e9b4d7a18'
+down_revision: Union[str, Sequence[str], None] = 'e71a4c2b9f35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Trigram similarity (% operator, similarity()) for fuzzy exercise name matches
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index('ix_exercises_name_lower', 'exercises', [sa.text('lower(name)')], unique=False)
+    op.create_index(
+        'ix_exercises_name_trgm',
+        'exercises',
+        ['name'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'name': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_exercises_name_trgm', table_name='exercises')
+    op.drop_index('ix_exercises_name_lower', table_name='exercises')
@@ -0,0 +1,63 @@
+"""Add knowledge metadata GIN index and per-source vector indexes
+
+Revision ID: 3f9c2a7d1b84
+Revises: a586b6b7cae2
+Create Date: 2026-10-19 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2a7d1b84'
+down_revision: Union[str, Sequence[str], None] = 'a586b6b7cae2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SOURCE_TYPES = ("exercise", "doc_chunk")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_knowledge_items_metadata_info',
+        'knowledge_items',
+        ['metadata_info'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'metadata_info': 'jsonb_path_ops'},
+    )
+    for source_type in SOURCE_TYPES:
+        op.create_index(
+            f'ix_knowledge_items_embedding_{source_type}',
+            'knowledge_items',
+            ['embedding'],
+            unique=False,
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'embedding': 'vector_cosine_ops'},
+            postgresql_where=sa.text(f"source_type = '{source_type}'"),
+        )
+
+    # Backfill the machine type on already ingested exercises so they can be filtered
+    # without a full re-ingestion. The level only comes from the CSV (ingest_knowledge.py).
+    op.execute(
+        """
+        UPDATE knowledge_items AS ki
+        SET metadata_info = ki.metadata_info || jsonb_build_object('machine_type', e.machine_type_id)
+        FROM exercises AS e
+        WHERE ki.source_type = 'exercise'
+          AND ki.source_id = e.id
+          AND e.machine_type_id IS NOT NULL
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for source_type in SOURCE_TYPES:
+        op.drop_index(f'ix_knowledge_items_embedding_{source_type}', table_name='knowledge_items')
+    op.drop_index('ix_knowledge_items_metadata_info', table_name='knowledge_items')
@@ -0,0 +1,43 @@
+"""Add generated content_tsv column to knowledge_items
+
+Revision ID: 7b1e5c9a04d2
+Revises: 3f9c2a7d1b84
+Create Date: 2026-10-19 11:03:27.540916
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b1e5c9a04d2'
+down_revision: Union[str, Sequence[str], None] = '3f9c2a7d1b84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Stored generated column: existing rows are populated when the column is added
+    op.add_column('knowledge_items', sa.Column(
+        'content_tsv',
+        postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('simple', content_text)", persisted=True),
+        nullable=True,
+    ))
+    op.create_index(
+        'ix_knowledge_items_content_tsv',
+        'knowledge_items',
+        ['content_tsv'],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_knowledge_items_content_tsv', table_name='knowledge_items')
+    op.drop_column('knowledge_items', 'content_tsv')
@@ -0,0 +1,40 @@
+"""Add speculative generation jobs
+
+Revision ID: 7b4e1d9c3a52
+Revises: 2c6e9b4d7a18
+Create Date: 2026-10-19 20:02:44.118306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b4e1d9c3a52'
+down_revision: Union[str, Sequence[str], None] = '2c6e9b4d7a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'generation_jobs',
+        sa.Column('speculative', sa.Boolean(), server_default=sa.text('false'), nullable=False),
+    )
+    op.add_column('generation_jobs', sa.Column('profile_version', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Speculative programs were never shown to the user
+    op.execute(
+        "UPDATE generation_jobs SET program_id = NULL "
+        "WHERE program_id IN (SELECT id FROM programs WHERE status = 'pending')"
+    )
+    op.execute("DELETE FROM sessions WHERE program_id IN (SELECT id FROM programs WHERE status = 'pending')")
+    op.execute("DELETE FROM programs WHERE status = 'pending'")
+    op.drop_column('generation_jobs', 'profile_version')
+    op.drop_column('generation_jobs', 'speculative')
@@ -0,0 +1,51 @@
+"""Add generation_jobs table
+
+Revision ID: 9d3b7f1e2a64
+Revises: 5a2f8d3c6e17
+Create Date: 2026-10-19 18:05:13.642871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3b7f1e2a64'
+down_revision: Union[str, Sequence[str], None] = '5a2f8d3c6e17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('generation_jobs',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('method', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('program_id', sa.UUID(), nullable=True),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['program_id'], ['programs.id'], name=op.f('fk_generation_jobs_program_id_programs')),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_generation_jobs'))
+    )
+    op.create_index(op.f('ix_generation_jobs_user_id'), 'generation_jobs', ['user_id'], unique=False)
+    op.create_index(
+        'ix_generation_jobs_queued',
+        'generation_jobs',
+        ['created_at'],
+        unique=False,
+        postgresql_where=sa.text("status = 'queued'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_generation_jobs_queued', table_name='generation_jobs')
+    op.drop_index(op.f('ix_generation_jobs_user_id'), table_name='generation_jobs')
+    op.drop_table('generation_jobs')
@@ -0,0 +1,64 @@
+"""Add halfvec and binary quantized embeddings to knowledge_items
+
+Revision ID: c4d8e2f6a913
+Revises: 7b1e5c9a04d2
+Create Date: 2026-10-19 14:26:09.871342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import pgvector
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d8e2f6a913'
+down_revision: Union[str, Sequence[str], None] = '7b1e5c9a04d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SOURCE_TYPES = ("exercise", "doc_chunk")
+COMPACT_COLUMNS = (
+    ("embedding_half", "halfvec_cosine_ops"),
+    ("embedding_bin", "bit_hamming_ops"),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # halfvec and binary_quantize() require pgvector >= 0.7
+    op.add_column('knowledge_items', sa.Column('embedding_half', pgvector.sqlalchemy.HALFVEC(768), nullable=True))
+    op.add_column('knowledge_items', sa.Column('embedding_bin', pgvector.sqlalchemy.BIT(768), nullable=True))
+
+    # Backfill before building the indexes (one bulk build instead of per-row inserts)
+    op.execute(
+        """
+        UPDATE knowledge_items
+        SET embedding_half = embedding::halfvec(768),
+            embedding_bin = binary_quantize(embedding)::bit(768)
+        WHERE embedding IS NOT NULL
+        """
+    )
+
+    for column, ops in COMPACT_COLUMNS:
+        for source_type in SOURCE_TYPES:
+            op.create_index(
+                f'ix_knowledge_items_{column}_{source_type}',
+                'knowledge_items',
+                [column],
+                unique=False,
+                postgresql_using='hnsw',
+                postgresql_with={'m': 16, 'ef_construction': 64},
+                postgresql_ops={column: ops},
+                postgresql_where=sa.text(f"source_type = '{source_type}'"),
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column, _ in COMPACT_COLUMNS:
+        for source_type in SOURCE_TYPES:
+            op.drop_index(f'ix_knowledge_items_{column}_{source_type}', table_name='knowledge_items')
+    op.drop_column('knowledge_items', 'embedding_bin')
+    op.drop_column('knowledge_items', 'embedding_half')
@@ -0,0 +1,67 @@
+"""Add generation idempotency keys and one active program per user
+
+Revision ID: e71a4c2b9f35
+Revises: 9d3b7f1e2a64
+Create Date: 2026-10-19 18:47:30.915402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e71a4c2b9f35'
+down_revision: Union[str, Sequence[str], None] = '9d3b7f1e2a64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('generation_jobs', sa.Column('idempotency_key', sa.String(), nullable=True))
+    op.create_index(
+        'uq_generation_jobs_user_id_in_flight',
+        'generation_jobs',
+        ['user_id'],
+        unique=True,
+        postgresql_where=sa.text("status IN ('queued', 'running')"),
+    )
+    op.create_index(
+        'uq_generation_jobs_user_id_idempotency_key',
+        'generation_jobs',
+        ['user_id', 'idempotency_key'],
+        unique=True,
+        postgresql_where=sa.text("idempotency_key IS NOT NULL"),
+    )
+
+    # Past races may have left several active programs: keep the most recent one
+    op.execute(
+        """
+        UPDATE programs AS p
+        SET status = 'archived', end_date = now()
+        WHERE p.status = 'active'
+          AND EXISTS (
+            SELECT 1 FROM programs AS newer
+            WHERE newer.user_id = p.user_id
+              AND newer.status = 'active'
+              AND (newer.start_date, newer.id) > (p.start_date, p.id)
+          )
+        """
+    )
+    op.create_index(
+        'uq_programs_user_id_active',
+        'programs',
+        ['user_id'],
+        unique=True,
+        postgresql_where=sa.text("status = 'active'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_programs_user_id_active', table_name='programs')
+    op.drop_index('uq_generation_jobs_user_id_idempotency_key', table_name='generation_jobs')
+    op.drop_index('uq_generation_jobs_user_id_in_flight', table_name='generation_jobs')
+    op.drop_column('generation_jobs', 'idempotency_key')
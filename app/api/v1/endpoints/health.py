@@ -3,8 +3,10 @@ Health check endpoints
 """
 
 from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
 
 from app.core.config import settings
+from app.core.metrics import metrics
 from app.core.supabase import supabase_client
 from app.schemas.health import HealthCheck
 
@@ -44,3 +46,11 @@ async def root() -> dict:
         "docs": "/docs",
         "health": "/health",
     }
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> str:
+    """
+    Application metrics (cache hit ratios, ...) in the Prometheus text format
+    """
+    return metrics.render_prometheus()
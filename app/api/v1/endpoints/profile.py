@@ -7,6 +7,7 @@ from app.core.user_db import get_db
 from app.schemas.common import SuccessResponse
 from app.schemas.profile import UserProfileCreate, UserProfileUpdate, UserProfileResponse
 from app.repositories.profile import ProfileRepository
+from app.repositories.generation_job import GenerationJobRepository
 from app.services.profile import ProfileService
 
 # Mock Auth Dependency until Supabase Auth is fully integrated
@@ -18,7 +19,7 @@ router = APIRouter()
 
 async def get_profile_service(session: AsyncSession = Depends(get_db)) -> ProfileService:
     repo = ProfileRepository(session)
-    return ProfileService(repo)
+    return ProfileService(repo, GenerationJobRepository(session))
 
 
 @router.post("/onboarding", response_model=SuccessResponse[UserProfileResponse])
@@ -1,57 +1,76 @@
-from typing import Any
-from fastapi import APIRouter, Depends
+from typing import Any, Optional
+from uuid import UUID
+from fastapi import APIRouter, Depends, Header, status
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.user_db import get_db
 from app.api.dependencies import get_current_user
 
 from app.schemas.common import SuccessResponse
-from app.schemas.program import ProgramRead, ProgramGenerateResponse
-from app.repositories.program import ProgramRepository
+from app.schemas.program import ProgramRead, GenerationJobRead
 from app.repositories.profile import ProfileRepository
-from app.repositories.dictionary import DictionaryRepository
-from app.services.program import ProgramService
-from app.services.knowledge import KnowledgeService
-from app.services.rag import KnowledgeRetriever
-from app.services.program_generator import ProgramGenerator
+from app.repositories.generation_job import GenerationJobRepository
+from app.services.program import ProgramService, build_program_service
+from app.services.generation_job import GenerationJobService
 
 router = APIRouter()
 
 
 
 async def get_program_service(session: AsyncSession = Depends(get_db)) -> ProgramService:
-    prog_repo = ProgramRepository(session)
-    prof_repo = ProfileRepository(session)
-    dict_repo = DictionaryRepository(session)
-    
-    # RAG Dependencies
-    knowledge_service = KnowledgeService()
-    retriever = KnowledgeRetriever(session)
-    generator = ProgramGenerator(knowledge_service, retriever)
-    
-    return ProgramService(prog_repo, prof_repo, dict_repo, generator)
-
-
-@router.post("/generate", response_model=SuccessResponse[ProgramGenerateResponse])
+    return build_program_service(session)
+
+
+async def get_generation_job_service(session: AsyncSession = Depends(get_db)) -> GenerationJobService:
+    return GenerationJobService(GenerationJobRepository(session), ProfileRepository(session))
+
+
+@router.post(
+    "/generate",
+    response_model=SuccessResponse[GenerationJobRead],
+    status_code=status.HTTP_202_ACCEPTED,
+)
 async def generate_program(
     method: str = "template",
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
     current_user: dict = Depends(get_current_user),
-    service: ProgramService = Depends(get_program_service),
+    service: GenerationJobService = Depends(get_generation_job_service),
 ) -> Any:
     """
-    Generate a new workout program based on user's existing profile.
-    Archives any currently active program.
+    Queue the generation of a new workout program based on user's existing profile.
     Method can be 'template' (default) or 'smart' (AI RAG).
+
+    Returns immediately with a job: poll GET /program/jobs/{job_id} until it succeeds,
+    then fetch the program with GET /program/current. The currently active program
+    is archived when the new one is created.
+
+    Retries sending the same `Idempotency-Key` header get the original job back, and
+    while a generation is queued or running for the user, new requests attach to it.
+    A program generated in advance after onboarding comes back as an already succeeded job.
+    """
+    user_id = current_user["id"]
+    job, created = await service.enqueue_generation(user_id, method=method, idempotency_key=idempotency_key)
+    if created:
+        message = f"Program generation queued ({method} mode)"
+    elif job.status == "succeeded":
+        message = "Program ready"
+    else:
+        message = "Program generation already requested"
+    return SuccessResponse(data=job, message=message)
+
+
+@router.get("/jobs/{job_id}", response_model=SuccessResponse[GenerationJobRead])
+async def get_generation_job(
+    job_id: UUID,
+    current_user: dict = Depends(get_current_user),
+    service: GenerationJobService = Depends(get_generation_job_service),
+) -> Any:
+    """
+    Status of a program generation job (queued, running, succeeded, failed).
     """
     user_id = current_user["id"]
-    program = await service.generate_program(user_id, method=method)
-    return SuccessResponse(
-        data=ProgramGenerateResponse(
-            program=program,
-            message=f"New program generated successfully ({method} mode)."
-        ),
-        message="Program generated"
-    )
+    job = await service.get_job(user_id, job_id)
+    return SuccessResponse(data=job)
 
 
 @router.get("/current", response_model=SuccessResponse[ProgramRead])
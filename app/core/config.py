@@ -25,6 +25,73 @@ class Settings(BaseSettings):
     # AI
     GEMINI_API_KEY: str = ""
     FIT_BUDDY_DATA_URL: str = "http://localhost:8001"
+    # "gemini" or "local" (deterministic offline stub, for benchmarks and tests only)
+    EMBEDDING_PROVIDER: str = "gemini"
+
+    # Fit Buddy Data API client (app/core/http.py): one keep-alive pool per process
+    DATA_API_MAX_CONNECTIONS: int = 50
+    DATA_API_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    DATA_API_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    DATA_API_TIMEOUT_SECONDS: float = 5.0  # Default, calls may set a shorter one
+    DATA_API_HTTP2: bool = False  # Only if the Data API is served over HTTP/2 (h2 is installed with httpx's extras)
+    IOT_MACHINE_LIST_TTL_SECONDS: float = 60.0  # Machine list cached by the machine registry
+    IOT_PREDICTION_CONCURRENCY: int = 8  # Prediction requests in flight per lookup
+    IOT_PREDICTION_TIMEOUT_SECONDS: float = 3.0
+    IOT_PREDICTION_DEADLINE_SECONDS: float = 3.0  # Whole fan-out: answer with the predictions received by then
+    # Background availability poller (app/services/availability_poller.py)
+    IOT_POLLER_ENABLED: bool = True
+    IOT_POLL_INTERVAL_SECONDS: float = 5.0  # While availabilities change
+    IOT_POLL_MAX_INTERVAL_SECONDS: float = 10.0  # Back-off limit while nothing changes
+    IOT_AVAILABILITY_MAX_AGE_SECONDS: float = 15.0  # Older observations: live prediction requests instead
+    IOT_POLL_CONCURRENCY: int = 16  # Prediction requests in flight per polling round
+    IOT_POLL_DEADLINE_SECONDS: float = 10.0  # Whole round; the least recently observed machines go first
+
+    # RAG
+    # pgvector >= 0.8 keeps scanning the HNSW graph until enough rows pass the filters.
+    # "strict_order", "relaxed_order" or "off" (older pgvector versions).
+    RAG_HNSW_ITERATIVE_SCAN: str = "strict_order"
+    # Hybrid search: candidates taken from each ranking, and the reciprocal rank fusion constant
+    RAG_HYBRID_POOL_SIZE: int = 20
+    RAG_RRF_K: int = 60
+    # Column used for the first pass of vector search: "full" (float32), "halfvec" or "binary".
+    # Compact first passes fetch limit * RAG_RERANK_FACTOR candidates, re-ranked on the full vectors.
+    RAG_VECTOR_STORAGE: str = "full"
+    RAG_RERANK_FACTOR: int = 10
+    # Search result cache, emptied when ingest_knowledge.py bumps the knowledge base version
+    RAG_CACHE_ENABLED: bool = True
+    RAG_CACHE_MAX_ENTRIES: int = 1024
+    RAG_CACHE_TTL_SECONDS: float = 3600.0
+    RAG_CACHE_VERSION_CHECK_SECONDS: float = 30.0
+    # Query embedding deadline: past it (or on provider errors) searches use the in-memory BM25 index
+    RAG_EMBEDDING_TIMEOUT_SECONDS: float = 2.0
+    # Program realization: candidates fetched per exercise query, and the MMR trade-off
+    # between relevance (1.0) and diversity with the exercises already picked (0.0)
+    LIBRARIAN_POOL_SIZE: int = 8
+    LIBRARIAN_MMR_LAMBDA: float = 0.7
+    # Distinct queries per retrieval task, and retrieval tasks (DB sessions) in flight per program
+    LIBRARIAN_QUERIES_PER_TASK: int = 6
+    LIBRARIAN_CONCURRENCY: int = 4
+    # Architect skeletons shared between similar profiles (see skeleton_cache.py):
+    # each fingerprint bucket reuses one of up to SKELETON_CACHE_POOL_SIZE skeletons
+    SKELETON_CACHE_ENABLED: bool = True
+    SKELETON_CACHE_TTL_SECONDS: float = 86400.0
+    SKELETON_CACHE_POOL_SIZE: int = 3
+    SKELETON_CACHE_MAX_BUCKETS: int = 512
+    # Expert markdown corpus kept in memory, files checked for changes this often
+    KNOWLEDGE_REFRESH_SECONDS: float = 30.0
+    # Prebuilt knowledge bundle (app/scripts/build_knowledge_bundle.py), used when present
+    KNOWLEDGE_BUNDLE_PATH: str = "build/knowledge.bundle"
+    # Compiled program templates, recompiled when seed_exercises.py bumps the exercise catalog version
+    TEMPLATE_CATALOG_VERSION_CHECK_SECONDS: float = 30.0
+
+    # Program generation jobs (python -m app.worker)
+    GENERATION_WORKER_CONCURRENCY: int = 2  # Jobs run in parallel by one worker process
+    GENERATION_POLL_INTERVAL_SECONDS: float = 1.0  # Idle delay between two claims
+    GENERATION_JOB_TIMEOUT_SECONDS: float = 300.0  # A run taking longer is cancelled and fails
+    GENERATION_JOB_STALE_SECONDS: float = 360.0  # Running longer than this: the worker is presumed dead
+    GENERATION_JOB_MAX_ATTEMPTS: int = 2
+    SPECULATIVE_GENERATION_ENABLED: bool = True  # Generate in advance right after onboarding
+    SPECULATIVE_GENERATION_METHOD: str = "template"  # Default method of POST /program/generate
 
 
     BACKEND_CORS_ORIGINS: Any = ["http://localhost:3000", "http://localhost:8000"]
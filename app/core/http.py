@@ -0,0 +1,76 @@
+"""
+Shared HTTP client for the Fit Buddy Data API
+
+One keep-alive connection pool per process, opened in the lifespan of app.main (or on first
+use, e.g. in the generation worker) and closed on shutdown. IoTService and SensorService
+send their requests through it instead of opening a connection per call.
+"""
+
+from typing import Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+class DataApiClient:
+    """Owner of the process-wide httpx.AsyncClient, with connection pool metrics"""
+
+    def __init__(self) -> None:
+        self._client: Optional[httpx.AsyncClient] = None
+        self._transport: Optional[httpx.AsyncHTTPTransport] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self.open()
+        return self._client
+
+    def open(self) -> None:
+        limits = httpx.Limits(
+            max_connections=settings.DATA_API_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.DATA_API_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.DATA_API_KEEPALIVE_EXPIRY_SECONDS,
+        )
+        # Owning the transport gives access to its pool for the metrics
+        self._transport = httpx.AsyncHTTPTransport(limits=limits, http2=settings.DATA_API_HTTP2)
+        self._client = httpx.AsyncClient(
+            base_url=settings.FIT_BUDDY_DATA_URL,
+            transport=self._transport,
+            timeout=settings.DATA_API_TIMEOUT_SECONDS,
+            event_hooks={"request": [self._on_request]},
+        )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._transport = None
+
+    @staticmethod
+    async def _on_request(request: httpx.Request) -> None:
+        metrics.inc("data_api_requests_total", help_text="Requests sent to the Fit Buddy Data API")
+
+    def _connections(self) -> list:
+        # httpcore connection pool behind the transport (not part of the httpx API: guarded)
+        pool = getattr(self._transport, "_pool", None)
+        return list(getattr(pool, "connections", []))
+
+    def open_connections(self) -> int:
+        return len(self._connections())
+
+    def idle_connections(self) -> int:
+        return sum(1 for connection in self._connections() if connection.is_idle())
+
+
+data_api = DataApiClient()
+
+metrics.gauge(
+    "data_api_pool_connections", data_api.open_connections,
+    help_text="Connections open to the Fit Buddy Data API",
+)
+metrics.gauge(
+    "data_api_pool_idle_connections", data_api.idle_connections,
+    help_text="Keep-alive connections to the Fit Buddy Data API waiting for a request",
+)
@@ -1,5 +1,11 @@
+import asyncio
+import hashlib
+import math
+import re
+
 import google.generativeai as genai
 from app.core.config import settings
+from app.core.timing import timed
 
 # Configure Gemini
 genai.configure(api_key=settings.GEMINI_API_KEY)
@@ -8,12 +14,32 @@ genai.configure(api_key=settings.GEMINI_API_KEY)
 MODEL_NAME = "gemini-2.0-flash"
 EMBEDDING_MODEL = "models/text-embedding-004"
 
-import asyncio
+# Dimension of text-embedding-004 vectors (KnowledgeItem.embedding)
+EMBEDDING_DIMENSIONS = 768
 
+def get_local_embedding(text: str) -> list[float]:
+    """
+    Deterministic offline stand-in for the Gemini embeddings (EMBEDDING_PROVIDER="local").
+    Hashed bag of words + character trigrams, L2-normalized: no semantics, but texts sharing
+    words end up close. Only comparable with vectors produced by this same function.
+    """
+    vector = [0.0] * EMBEDDING_DIMENSIONS
+    words = re.findall(r"\w+", text.lower())
+    features = words + [f"#{w[i:i + 3]}" for w in words for i in range(max(len(w) - 2, 1))]
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % EMBEDDING_DIMENSIONS
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+@timed("embedding")
 async def get_text_embedding(text: str) -> list[float] | None:
     """
     Generate an embedding vector for the given text using Gemini.
     """
+    if settings.EMBEDDING_PROVIDER == "local":
+        return get_local_embedding(text)
     try:
         result = await asyncio.to_thread(
             genai.embed_content,
@@ -26,8 +52,28 @@ async def get_text_embedding(text: str) -> list[float] | None:
         print(f"Embedding failed: {e}")
         return None
 
+@timed("embedding")
+async def get_text_embeddings(texts: list[str]) -> list[list[float]] | None:
+    """
+    Embeddings of several texts in a single Gemini call (same order as `texts`).
+    """
+    if settings.EMBEDDING_PROVIDER == "local":
+        return [get_local_embedding(text) for text in texts]
+    try:
+        result = await asyncio.to_thread(
+            genai.embed_content,
+            model=EMBEDDING_MODEL,
+            content=texts,
+            task_type="retrieval_query"
+        )
+        return result['embedding']
+    except Exception as e:
+        print(f"Batch embedding failed: {e}")
+        return None
+
 from app.schemas.template import ProgramTemplate
 
+@timed("llm")
 async def generate_program_narrative(template_data: ProgramTemplate, user_profile_data: dict, context_text: str = "") -> dict:
     """
     Augment the static template with personalized text utilizing the LLM.
@@ -76,6 +122,7 @@ async def generate_program_narrative(template_data: ProgramTemplate, user_profil
             "phase_advice": "Focus on form and consistency."
         }
 
+@timed("llm")
 async def generate_json(prompt: str) -> dict:
     """
     Generic helper to get JSON output from Gemini.
@@ -0,0 +1,56 @@
+"""
+In-process application metrics
+
+Counters are incremented by the services; gauges are read from callbacks when exported.
+Exposed in the Prometheus text format by GET /api/v1/health/metrics.
+"""
+
+from collections.abc import Callable
+from threading import Lock
+
+
+class MetricsRegistry:
+    """Minimal counter / gauge registry (one per process)"""
+
+    def __init__(self) -> None:
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, Callable[[], float]] = {}
+        self._help: dict[str, str] = {}
+        self._lock = Lock()
+
+    def inc(self, name: str, value: float = 1.0, help_text: str = "") -> None:
+        """Increment a counter (created on first use)"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0.0) + value
+            if help_text:
+                self._help.setdefault(name, help_text)
+
+    def gauge(self, name: str, callback: Callable[[], float], help_text: str = "") -> None:
+        """Register a gauge whose value is computed when metrics are exported"""
+        with self._lock:
+            self._gauges[name] = callback
+            if help_text:
+                self._help[name] = help_text
+
+    def snapshot(self) -> dict[str, float]:
+        """Current value of every counter and gauge"""
+        with self._lock:
+            values = dict(self._counters)
+            gauges = dict(self._gauges)
+        for name, callback in gauges.items():
+            values[name] = float(callback())
+        return values
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        for name, value in sorted(self.snapshot().items()):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            kind = "gauge" if name in self._gauges else "counter"
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
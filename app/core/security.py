@@ -14,6 +14,7 @@ from sqlalchemy import text
 from app.core.config import settings
 from app.core.exceptions import UnauthorizedException
 from app.core.logging import app_logger
+from app.core.timing import timed
 from app.core.user_db import async_session_factory
 
 
@@ -48,6 +49,7 @@ def verify_session_signature(session_token: str, secret: str) -> bool:
         return False
 
 
+@timed("auth")
 async def verify_session_token(token: str) -> dict[str, Any]:
     """
     Verify Better Auth session token
@@ -0,0 +1,122 @@
+"""
+Request-scoped timing breakdown
+
+TimingMiddleware opens a RequestTimings for each request (held in a contextvar, so the
+endpoint task, worker threads and SQLAlchemy greenlets all see it). Code on the request path
+records spans into it; the totals come back as a Server-Timing header and one log line.
+
+Spans may nest (e.g. "auth" includes its own "db" query): each one is a total of its own.
+Outside of a request (worker, scripts) recording is a no-op.
+"""
+
+import functools
+import time
+from collections.abc import Callable
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+
+
+class RequestTimings:
+    """Total duration and count of each span name over one request"""
+
+    def __init__(self) -> None:
+        self.started_at = time.perf_counter()
+        self._spans: dict[str, list[float]] = {}  # name -> [seconds, count]
+        self._lock = Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            span = self._spans.setdefault(name, [0.0, 0])
+            span[0] += seconds
+            span[1] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def spans(self) -> dict[str, tuple[float, int]]:
+        with self._lock:
+            return {name: (seconds, count) for name, (seconds, count) in self._spans.items()}
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, durations in milliseconds, "total" last"""
+        entries = [
+            f'{name};dur={seconds * 1000:.1f};desc="{count}x"'
+            for name, (seconds, count) in self.spans().items()
+        ]
+        entries.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(entries)
+
+    def log_fields(self) -> dict[str, float]:
+        """Milliseconds per span name, for the structured log line"""
+        fields = {f"{name}_ms": round(seconds * 1000, 1) for name, (seconds, _) in self.spans().items()}
+        fields["total_ms"] = round(self.elapsed() * 1000, 1)
+        return fields
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def start_request() -> RequestTimings:
+    timings = RequestTimings()
+    _current.set(timings)
+    return timings
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+def record(name: str, seconds: float) -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the enclosed block (sync or async code) under `name`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def timed(name: str) -> Callable:
+    """Decorator for coroutine functions: each call is a span"""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def instrument_engine(engine) -> None:
+    """Record every statement run through `engine` as a "db" span"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("timing_starts", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("timing_starts")
+        if starts:
+            record("db", time.perf_counter() - starts.pop())
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        starts = conn.info.get("timing_starts") if conn is not None else None
+        if starts:
+            record("db", time.perf_counter() - starts.pop())
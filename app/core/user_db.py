@@ -7,6 +7,7 @@ from collections.abc import AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.core.config import settings
+from app.core.timing import instrument_engine
 
 # Create async engine
 engine = create_async_engine(
@@ -15,6 +16,8 @@ engine = create_async_engine(
     future=True,
     pool_pre_ping=True,
 )
+# Statement durations go into the request's Server-Timing breakdown ("db")
+instrument_engine(engine)
 
 # Create session factory
 async_session_factory = async_sessionmaker(
@@ -2,8 +2,9 @@
 FastAPI application entry point
 """
 
+import asyncio
 from collections.abc import AsyncGenerator
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 from slowapi.errors import RateLimitExceeded
@@ -11,11 +12,20 @@ from slowapi.middleware import SlowAPIMiddleware
 
 from app.api.v1.router import api_router
 from app.core.config import settings
+from app.core.http import data_api
 from app.core.logging import app_logger
+from app.core.user_db import async_session_factory
 from app.middleware.cors import setup_cors
 from app.middleware.error_handlers import setup_exception_handlers
 from app.middleware.logging import LoggingMiddleware
 from app.middleware.rate_limit import limiter, rate_limit_exceeded_handler
+from app.middleware.timing import TimingMiddleware
+from app.services.availability_poller import availability_poller
+from app.services.iot import IoTService
+from app.services.knowledge import knowledge_base
+from app.services.knowledge_bundle import open_bundle
+from app.services.rag_lexical import lexical_fallback
+from app.services.template_catalog import template_catalog
 
 
 @asynccontextmanager
@@ -26,9 +36,50 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     app_logger.info(f"Environment: {settings.ENVIRONMENT}")
     app_logger.info(f"Debug mode: {settings.DEBUG}")
 
+    # Keep-alive connection pool to the Fit Buddy Data API
+    data_api.open()
+    # Machine availabilities polled in the background, read by IoTService
+    availability_polling = (
+        asyncio.create_task(availability_poller.run(IoTService())) if settings.IOT_POLLER_ENABLED else None
+    )
+
+    # Prebuilt corpus and knowledge items, shared by the processes of the node (mmap)
+    bundle = await asyncio.to_thread(open_bundle, settings.KNOWLEDGE_BUNDLE_PATH)
+    if bundle is not None:
+        app_logger.info(f"Knowledge bundle {bundle.version}: {len(bundle.embeddings)} embedded items")
+    lexical_fallback.bundle = bundle
+
+    # Lexical fallback of the RAG, used when the embedding provider is down or slow
+    try:
+        async with async_session_factory() as session:
+            await lexical_fallback.load(session)
+        app_logger.info(f"Lexical fallback index: {len(lexical_fallback.index)} knowledge items")
+    except Exception as e:
+        app_logger.warning(f"Lexical fallback index not loaded: {e}")
+
+    # Program templates with their exercises resolved (otherwise compiled on first use)
+    try:
+        async with async_session_factory() as session:
+            await template_catalog.load(session)
+    except Exception as e:
+        app_logger.warning(f"Template catalog not compiled: {e}")
+
+    # Expert markdown corpus, kept in memory and in sync with the files
+    await asyncio.to_thread(knowledge_base.load, bundle)
+    app_logger.info(f"Knowledge corpus: {len(knowledge_base.corpus.documents)} documents")
+    knowledge_refresher = asyncio.create_task(knowledge_base.run_refresher())
+
     yield
 
     # Shutdown
+    knowledge_refresher.cancel()
+    with suppress(asyncio.CancelledError):
+        await knowledge_refresher
+    if availability_polling is not None:
+        availability_polling.cancel()
+        with suppress(asyncio.CancelledError):
+            await availability_polling
+    await data_api.close()
     app_logger.info(f"Shutting down {settings.PROJECT_NAME}")
 
 
@@ -59,6 +110,8 @@ def create_application() -> FastAPI:
     app.state.limiter = limiter
     app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
     app.add_middleware(SlowAPIMiddleware)
+    # Added last: outermost, so the breakdown covers the other middlewares too
+    app.add_middleware(TimingMiddleware)
     # Include routers
     app.include_router(api_router, prefix=settings.API_V1_PREFIX)
 
@@ -0,0 +1,26 @@
+from collections.abc import Callable
+
+from fastapi import Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.logging import app_logger
+from app.core.timing import start_request
+
+
+class TimingMiddleware(BaseHTTPMiddleware):
+    """
+    Collects the spans recorded while handling the request (auth, db, embedding, llm, iot,
+    sensor) and returns them in a Server-Timing header, plus one log line per request.
+    """
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        timings = start_request()
+        response = await call_next(request)
+
+        response.headers["Server-Timing"] = timings.server_timing()
+        fields = timings.log_fields()
+        app_logger.bind(timings=fields).info(
+            f"timing {request.method} {request.url.path} [{response.status_code}] "
+            + " ".join(f"{name}={value}" for name, value in fields.items())
+        )
+        return response
@@ -2,9 +2,9 @@ from datetime import datetime, timezone
 import uuid
 from typing import Optional, List
 
-from sqlalchemy import String, Integer, Float, ForeignKey, DateTime, JSON, ARRAY, Boolean
+from sqlalchemy import String, Integer, Float, ForeignKey, DateTime, JSON, ARRAY, Boolean, Index, Computed, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
 
 from .base import Base
 
@@ -50,14 +50,34 @@ class Exercise(Base):
     alternatives: Mapped[List[uuid.UUID]] = mapped_column(ARRAY(UUID(as_uuid=True)), nullable=True)
 
 
+# Case-insensitive name lookups (DictionaryRepository.get_exercises_by_names):
+# exact matches on lower(name), trigram similarity (pg_trgm) for the names that miss
+Index("ix_exercises_name_lower", func.lower(Exercise.name))
+Index(
+    "ix_exercises_name_trgm",
+    Exercise.name,
+    postgresql_using="gin",
+    postgresql_ops={"name": "gin_trgm_ops"},
+)
+
+
 class Program(Base):
     __tablename__ = "programs"
+    __table_args__ = (
+        # At most one active program per user, even under concurrent generations
+        Index(
+            "uq_programs_user_id_active",
+            "user_id",
+            unique=True,
+            postgresql_where=text("status = 'active'"),
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False, index=True) # Supabase User ID
     name: Mapped[str] = mapped_column(String, nullable=False)
     goal: Mapped[str] = mapped_column(String, nullable=False) # "Weight Loss", "Muscle Gain"
-    status: Mapped[str] = mapped_column(String, default="active") # active, completed, archived
+    status: Mapped[str] = mapped_column(String, default="active") # active, completed, archived, pending (speculative, see GenerationJob)
     
     start_date: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     end_date: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -126,10 +146,43 @@ class SetHistory(Base):
     session_history: Mapped["SessionHistory"] = relationship("SessionHistory", back_populates="sets")
 
 
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import Vector, HALFVEC, BIT
+
+# Source types stored in knowledge_items. Each one gets its own partial vector index.
+KNOWLEDGE_SOURCE_TYPES = ("exercise", "doc_chunk")
+
 
 class KnowledgeItem(Base):
     __tablename__ = "knowledge_items"
+    __table_args__ = (
+        # Containment filters (metadata_info @> '{"muscle": "dos"}') are served by this index
+        Index(
+            "ix_knowledge_items_metadata_info",
+            "metadata_info",
+            postgresql_using="gin",
+            postgresql_ops={"metadata_info": "jsonb_path_ops"},
+        ),
+        # Full text index for the lexical half of hybrid search
+        Index("ix_knowledge_items_content_tsv", "content_tsv", postgresql_using="gin"),
+        # One HNSW index per source type and vector storage, so filtered searches never walk
+        # the other population (see RAG_VECTOR_STORAGE for which one is queried)
+        *(
+            Index(
+                f"ix_knowledge_items_{column}_{source_type}",
+                column,
+                postgresql_using="hnsw",
+                postgresql_with={"m": 16, "ef_construction": 64},
+                postgresql_ops={column: ops},
+                postgresql_where=text(f"source_type = '{source_type}'"),
+            )
+            for column, ops in (
+                ("embedding", "vector_cosine_ops"),
+                ("embedding_half", "halfvec_cosine_ops"),
+                ("embedding_bin", "bit_hamming_ops"),
+            )
+            for source_type in KNOWLEDGE_SOURCE_TYPES
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     
@@ -141,11 +194,91 @@ class KnowledgeItem(Base):
     
     # The actual text content to be retrieved
     content_text: Mapped[str] = mapped_column(String, nullable=False)
+
+    # Lexical representation of content_text, maintained by Postgres ('simple' keeps exercise names intact)
+    content_tsv: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR, Computed("to_tsvector('simple', content_text)", persisted=True), deferred=True
+    )
     
     # The Embedding Vector (Dimension 768 for Gemini 1.5 Flash / Text-Embedding-004)
-    embedding: Mapped[List[float]] = mapped_column(Vector(768))
+    # Deferred: searches only need it in SQL, except for in-memory re-ranking (undefer)
+    embedding: Mapped[List[float]] = mapped_column(Vector(768), deferred=True)
+
+    # Compact copies of `embedding` for first-pass search (exact re-rank uses `embedding`)
+    # Half precision: half the size, near identical ranking
+    embedding_half: Mapped[Optional[List[float]]] = mapped_column(HALFVEC(768), nullable=True, deferred=True)
+    # Binary quantization (sign of each dimension), compared with Hamming distance
+    embedding_bin: Mapped[Optional[str]] = mapped_column(BIT(768), nullable=True, deferred=True)
     
-    # Extra metadata (e.g., {"muscle": "legs", "doc_title": "Hypertrophy Guide"})
+    # Extra metadata (e.g., {"muscle": "dos", "machine_type": "CABLE", "level": "beginner"})
     metadata_info: Mapped[dict] = mapped_column(JSONB, nullable=False, default={})
     
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+
+class CatalogVersion(Base):
+    __tablename__ = "catalog_versions"
+
+    # Which static dataset this stamp describes, e.g. "knowledge_base"
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+
+    # Changes every time the dataset is rewritten (see app/scripts/ingest_knowledge.py)
+    version: Mapped[str] = mapped_column(String, nullable=False)
+
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+
+# Lifecycle of a GenerationJob
+GENERATION_JOB_STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+
+
+class GenerationJob(Base):
+    __tablename__ = "generation_jobs"
+    __table_args__ = (
+        # Workers claim the oldest queued job: only queued rows are indexed
+        Index(
+            "ix_generation_jobs_queued",
+            "created_at",
+            postgresql_where=text("status = 'queued'"),
+        ),
+        # One queued / running generation per user: duplicates attach to it
+        Index(
+            "uq_generation_jobs_user_id_in_flight",
+            "user_id",
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+        # Retries with the same Idempotency-Key header get the original job back
+        Index(
+            "uq_generation_jobs_user_id_idempotency_key",
+            "user_id",
+            "idempotency_key",
+            unique=True,
+            postgresql_where=text("idempotency_key IS NOT NULL"),
+        ),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False, index=True)
+
+    # Generation method: "template" or "smart" (see ProgramService.generate_program)
+    method: Mapped[str] = mapped_column(String, nullable=False, default="template")
+    status: Mapped[str] = mapped_column(String, nullable=False, default="queued") # queued, running, succeeded, failed, cancelled
+
+    # Started on onboarding, before any request: the program is written as "pending" and only
+    # activated when the user asks for a generation of the same profile version
+    speculative: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False, server_default=text("false"))
+    # UserProfile.updated_at the speculative generation was based on
+    profile_version: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    # Client supplied Idempotency-Key header, unique per user
+    idempotency_key: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+
+    # Set when the job succeeded
+    program_id: Mapped[Optional[uuid.UUID]] = mapped_column(ForeignKey("programs.id"), nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
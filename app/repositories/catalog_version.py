@@ -0,0 +1,48 @@
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.domain import CatalogVersion
+
+# Stamp rewritten by app/scripts/ingest_knowledge.py
+KNOWLEDGE_BASE = "knowledge_base"
+# Stamp rewritten by app/scripts/seed_exercises.py
+EXERCISE_CATALOG = "exercises"
+
+
+class CatalogVersionRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_version(self, name: str) -> Optional[str]:
+        query = select(CatalogVersion.version).where(CatalogVersion.name == name)
+        result = await self.session.execute(query)
+        return result.scalar_one_or_none()
+
+    async def check_version(self, name: str) -> Optional[str]:
+        """
+        get_version inside a SAVEPOINT, for the caches checking their stamp on a request's
+        session: if it fails, only the savepoint is rolled back and the request goes on.
+        """
+        async with self.session.begin_nested():
+            return await self.get_version(name)
+
+    async def bump(self, name: str) -> str:
+        """
+        Stamp `name` with a new version. Processes caching data derived from it
+        notice the change and drop their copies.
+        """
+        version = uuid.uuid4().hex
+        now = datetime.now(timezone.utc)
+        stmt = insert(CatalogVersion).values(name=name, version=version, updated_at=now)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CatalogVersion.name],
+            set_={"version": version, "updated_at": now},
+        )
+        await self.session.execute(stmt)
+        await self.session.commit()
+        return version
@@ -1,6 +1,7 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from uuid import UUID
-from sqlalchemy import select
+from sqlalchemy import ARRAY, Float, String, any_, bindparam, cast, exists, func, literal, select, true, union_all
+from sqlalchemy.orm import aliased
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.domain import Machine, Exercise
 
@@ -21,6 +22,16 @@ class DictionaryRepository:
         result = await self.session.execute(query)
         return result.scalars().first()
 
+    async def get_exercises_by_ids(self, exercise_ids: List[UUID]) -> Dict[UUID, Exercise]:
+        """
+        Exercises of many UUIDs in one query (unknown IDs are left out).
+        """
+        if not exercise_ids:
+            return {}
+        query = select(Exercise).where(Exercise.id.in_(set(exercise_ids)))
+        result = await self.session.execute(query)
+        return {exercise.id: exercise for exercise in result.scalars().all()}
+
     async def get_exercises(
         self, 
         muscle_group: Optional[str] = None, 
@@ -44,7 +55,53 @@ class DictionaryRepository:
         """
         Find an exercise by its name (exact match, case-insensitive).
         """
-        # Using ilike for case-insensitive matching
-        query = select(Exercise).where(Exercise.name.ilike(name))
+        # lower(name) is indexed (ix_exercises_name_lower)
+        query = select(Exercise).where(func.lower(Exercise.name) == name.lower())
         result = await self.session.execute(query)
         return result.scalars().first()
+
+    async def get_exercises_by_names(self, names: List[str]) -> Dict[str, Optional[Exercise]]:
+        """
+        Resolve many exercise names in one query: case-insensitive exact matches first
+        (lower(name) = ANY(:names), index ix_exercises_name_lower), then, for the names
+        without one, the most similar name by trigram similarity (pg_trgm `%` operator,
+        index ix_exercises_name_trgm). Names matching nothing map to None.
+        """
+        lowered = list(dict.fromkeys(name.lower() for name in names))
+        if not lowered:
+            return {}
+        names_param = bindparam("names", lowered, type_=ARRAY(String))
+
+        exact = (
+            select(func.lower(Exercise.name).label("requested"), Exercise.id, cast(literal(1.0), Float).label("score"))
+            .where(func.lower(Exercise.name) == any_(names_param))
+        )
+
+        requested = func.unnest(names_param).table_valued("name").render_derived("requested")
+        candidate = aliased(Exercise)
+        similarity = func.similarity(candidate.name, requested.c.name)
+        best = (
+            select(candidate.id, similarity.label("score"))
+            .where(candidate.name.op("%")(requested.c.name))
+            .order_by(similarity.desc())
+            .limit(1)
+            .lateral()
+        )
+        fuzzy = (
+            select(requested.c.name, best.c.id, best.c.score)
+            .select_from(requested.join(best, true()))
+            .where(~exists().where(func.lower(Exercise.name) == requested.c.name))
+        )
+
+        matches = union_all(exact, fuzzy).subquery()
+        query = (
+            select(matches.c.requested, Exercise)
+            .join(Exercise, Exercise.id == matches.c.id)
+            .order_by(matches.c.requested, matches.c.score.desc(), Exercise.name)
+        )
+        result = await self.session.execute(query)
+
+        found: Dict[str, Exercise] = {}
+        for requested_name, exercise in result.all():
+            found.setdefault(requested_name, exercise)
+        return {name: found.get(name.lower()) for name in names}
@@ -0,0 +1,271 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import delete, false, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.domain import GenerationJob, Program, Session
+from app.repositories.program import archive_active_statement
+
+# Statuses covered by the one-generation-per-user unique index
+IN_FLIGHT_STATUSES = ("queued", "running")
+# Speculative jobs whose program can still be handed to the user
+LIVE_SPECULATIVE_STATUSES = ("queued", "running", "succeeded")
+
+
+class GenerationJobRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def enqueue(self, user_id: UUID, method: str,
+                      idempotency_key: Optional[str] = None) -> tuple[GenerationJob, bool]:
+        """
+        Queue a generation unless the user already has one in flight, or already sent this
+        idempotency key. Returns the job and whether it was created.
+
+        The unique indexes on generation_jobs arbitrate concurrent requests: the insert
+        either wins or does nothing, and the existing job is returned instead.
+        """
+        for _ in range(3):
+            stmt = (
+                insert(GenerationJob)
+                .values(user_id=user_id, method=method, status="queued", idempotency_key=idempotency_key)
+                .on_conflict_do_nothing()
+                .returning(GenerationJob)
+            )
+            result = await self.session.execute(stmt)
+            job = result.scalars().one_or_none()
+            if job is not None:
+                await self.session.commit()
+                return job, True
+
+            existing = await self._find_duplicate(user_id, idempotency_key)
+            await self.session.commit()
+            if existing is not None:
+                return existing, False
+            # The conflicting job finished in between: try again
+        raise RuntimeError(f"Could not enqueue a generation job for user {user_id}")
+
+    async def _find_duplicate(self, user_id: UUID, idempotency_key: Optional[str]) -> Optional[GenerationJob]:
+        """Job sent with the same key first, otherwise the user's job in flight"""
+        same_key = (
+            GenerationJob.idempotency_key == idempotency_key if idempotency_key else false()
+        )
+        query = (
+            select(GenerationJob)
+            .where(
+                GenerationJob.user_id == user_id,
+                or_(same_key, GenerationJob.status.in_(IN_FLIGHT_STATUSES)),
+            )
+            .order_by(same_key.desc())
+            .limit(1)
+        )
+        result = await self.session.execute(query)
+        return result.scalars().first()
+
+    async def get_by_idempotency_key(self, user_id: UUID, idempotency_key: str) -> Optional[GenerationJob]:
+        query = select(GenerationJob).where(
+            GenerationJob.user_id == user_id, GenerationJob.idempotency_key == idempotency_key
+        )
+        result = await self.session.execute(query)
+        return result.scalars().one_or_none()
+
+    async def enqueue_speculative(self, user_id: UUID, method: str, profile_version: datetime) -> Optional[GenerationJob]:
+        """
+        Queue a speculative generation for this profile version. Skipped (None) when the user
+        already has a generation in flight.
+        """
+        stmt = (
+            insert(GenerationJob)
+            .values(
+                user_id=user_id, method=method, status="queued",
+                speculative=True, profile_version=profile_version,
+            )
+            .on_conflict_do_nothing()
+            .returning(GenerationJob)
+        )
+        result = await self.session.execute(stmt)
+        job = result.scalars().one_or_none()
+        await self.session.commit()
+        return job
+
+    async def take_speculative(self, user_id: UUID, method: str, profile_version: datetime,
+                               idempotency_key: Optional[str] = None) -> Optional[GenerationJob]:
+        """
+        Turn the speculative job matching this request into a requested one, if any.
+        Already succeeded: its pending program replaces the active one now. Still queued or
+        running: the worker activates the program when it is done (see finish_speculative).
+        """
+        query = (
+            select(GenerationJob)
+            .where(
+                GenerationJob.user_id == user_id,
+                GenerationJob.speculative.is_(True),
+                GenerationJob.method == method,
+                GenerationJob.profile_version == profile_version,
+                GenerationJob.status.in_(LIVE_SPECULATIVE_STATUSES),
+            )
+            .order_by(GenerationJob.created_at.desc())
+            .limit(1)
+            .with_for_update()
+        )
+        result = await self.session.execute(query)
+        job = result.scalars().first()
+        if job is None:
+            await self.session.rollback()
+            return None
+
+        job.speculative = False
+        if idempotency_key and job.idempotency_key is None:
+            job.idempotency_key = idempotency_key
+        if job.status == "succeeded":
+            await self._activate_program(user_id, job.program_id)
+        await self.session.commit()
+        return job
+
+    async def cancel_speculative(self, user_id: UUID) -> int:
+        """
+        Cancel the user's speculative jobs and discard their pending programs (the profile
+        changed, or a different generation was requested). A running job notices when it
+        finishes. Returns the number of cancelled jobs.
+        """
+        query = (
+            select(GenerationJob)
+            .where(
+                GenerationJob.user_id == user_id,
+                GenerationJob.speculative.is_(True),
+                GenerationJob.status.in_(LIVE_SPECULATIVE_STATUSES),
+            )
+            .with_for_update()
+        )
+        jobs = (await self.session.execute(query)).scalars().all()
+        programs = [job.program_id for job in jobs if job.program_id is not None]
+        now = datetime.now(timezone.utc)
+        for job in jobs:
+            job.status = "cancelled"
+            job.program_id = None
+            job.finished_at = now
+        if programs:
+            # The jobs must stop referencing the programs first
+            await self.session.flush()
+            await self._discard_pending_programs(programs)
+        await self.session.commit()
+        return len(jobs)
+
+    async def finish_speculative(self, job_id: UUID, attempt: int, program_id: UUID) -> str:
+        """
+        Record the pending program written by the worker for a speculative job, under the
+        job's row lock (serialized with take_speculative and cancel_speculative):
+        - cancelled meanwhile, or no longer this worker's attempt: the program is deleted
+        - requested meanwhile: the program becomes the active one
+        - otherwise it stays pending until requested
+        Returns the final job status.
+        """
+        query = select(GenerationJob).where(GenerationJob.id == job_id).with_for_update()
+        job = (await self.session.execute(query)).scalars().one()
+        if job.status != "running" or job.attempts != attempt:
+            await self._discard_pending_programs([program_id])
+            await self.session.commit()
+            return job.status
+
+        if not job.speculative:
+            await self._activate_program(job.user_id, program_id)
+        job.status = "succeeded"
+        job.program_id = program_id
+        job.error = None
+        job.finished_at = datetime.now(timezone.utc)
+        await self.session.commit()
+        return job.status
+
+    async def _activate_program(self, user_id: UUID, program_id: UUID) -> None:
+        await self.session.execute(archive_active_statement(user_id))
+        await self.session.execute(
+            update(Program)
+            .where(Program.id == program_id, Program.status == "pending")
+            .values(status="active", start_date=datetime.now())
+        )
+
+    async def _discard_pending_programs(self, program_ids: list[UUID]) -> None:
+        """Delete these programs, if still pending, and their sessions"""
+        pending = select(Program.id).where(Program.id.in_(program_ids), Program.status == "pending")
+        await self.session.execute(delete(Session).where(Session.program_id.in_(pending)))
+        await self.session.execute(delete(Program).where(Program.id.in_(pending)))
+
+    async def get_job(self, job_id: UUID, user_id: UUID) -> Optional[GenerationJob]:
+        query = select(GenerationJob).where(GenerationJob.id == job_id, GenerationJob.user_id == user_id)
+        result = await self.session.execute(query)
+        return result.scalars().one_or_none()
+
+    async def claim_next(self) -> Optional[GenerationJob]:
+        """
+        Oldest queued job, marked running in the same transaction.
+        SKIP LOCKED: concurrent workers never wait on (nor claim) the same row.
+        """
+        query = (
+            select(GenerationJob)
+            .where(GenerationJob.status == "queued")
+            # Requested generations before speculative ones
+            .order_by(GenerationJob.speculative, GenerationJob.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self.session.execute(query)
+        job = result.scalars().first()
+        if job is None:
+            await self.session.rollback()
+            return None
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        job.attempts += 1
+        await self.session.commit()
+        return job
+
+    async def mark_succeeded(self, job_id: UUID, attempt: int, program_id: UUID) -> bool:
+        return await self._finish(job_id, attempt, status="succeeded", program_id=program_id, error=None)
+
+    async def mark_failed(self, job_id: UUID, attempt: int, error: str) -> bool:
+        return await self._finish(job_id, attempt, status="failed", error=error)
+
+    async def requeue_stale(self, stale_seconds: float, max_attempts: int) -> int:
+        """
+        Jobs running for longer than `stale_seconds` (worker crashed or killed: live workers
+        give up on a run before, see GENERATION_JOB_TIMEOUT_SECONDS) go back to the queue,
+        or fail once they have used their attempts. Returns the number of requeued jobs.
+        """
+        now = datetime.now(timezone.utc)
+        stale = (
+            GenerationJob.status == "running",
+            GenerationJob.started_at < now - timedelta(seconds=stale_seconds),
+        )
+        await self.session.execute(
+            update(GenerationJob)
+            .where(*stale, GenerationJob.attempts >= max_attempts)
+            .values(status="failed", error="Generation timed out", finished_at=now)
+        )
+        result = await self.session.execute(
+            update(GenerationJob)
+            .where(*stale, GenerationJob.attempts < max_attempts)
+            .values(status="queued", started_at=None)
+        )
+        await self.session.commit()
+        return result.rowcount
+
+    async def _finish(self, job_id: UUID, attempt: int, **values) -> bool:
+        """
+        Final status of a run, written only if the job is still running this attempt (not
+        requeued and claimed again meanwhile). Returns whether it was written.
+        """
+        stmt = (
+            update(GenerationJob)
+            .where(
+                GenerationJob.id == job_id,
+                GenerationJob.status == "running",
+                GenerationJob.attempts == attempt,
+            )
+            .values(finished_at=datetime.now(timezone.utc), **values)
+        )
+        result = await self.session.execute(stmt)
+        await self.session.commit()
+        return result.rowcount == 1
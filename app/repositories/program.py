@@ -2,13 +2,23 @@ from typing import Optional, List
 from uuid import UUID
 from datetime import datetime
 
-from sqlalchemy import select, update
+from sqlalchemy import insert, inspect, select, update
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.domain import Program, Session, SessionHistory
 
 
+def archive_active_statement(user_id: UUID):
+    """Archives the user's active program (also used when a pending program is activated)"""
+    return (
+        update(Program)
+        .where(Program.user_id == user_id, Program.status == "active")
+        .values(status="archived", end_date=datetime.now())
+    )
+
+
 class ProgramRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
@@ -23,25 +33,47 @@ class ProgramRepository:
         return result.scalars().first()
 
     async def create_program(self, program: Program, sessions: List[Session]) -> Program:
-        self.session.add(program)
-        await self.session.flush() # Generate Program ID
-        
-        for s in sessions:
-            s.program_id = program.id
-            self.session.add(s)
-            
-        await self.session.commit()
-        await self.session.refresh(program)
-        # Re-fetch with sessions to ensure relationships are loaded
-        return await self.get_active_program(program.user_id)
-        
+        """
+        One transaction: archive the user's active program, insert the new one and bulk
+        insert its sessions, both loaded back with RETURNING (no re-fetch).
+        The user always has exactly one active program (uq_programs_user_id_active).
+        A "pending" program (speculative generation) leaves the active one in place.
+        On failure the archive is rolled back with the rest.
+        """
+        try:
+            if program.status == "active":
+                await self.session.execute(archive_active_statement(program.user_id))
+
+            result = await self.session.scalars(insert(Program).returning(Program), [self._column_values(program)])
+            created = result.one()
+
+            created_sessions = []
+            if sessions:
+                rows = [{**self._column_values(s), "program_id": created.id} for s in sessions]
+                result = await self.session.scalars(
+                    insert(Session).returning(Session, sort_by_parameter_order=True), rows
+                )
+                created_sessions = list(result.all())
+            # The collection is complete: mark it loaded instead of querying it again
+            set_committed_value(created, "sessions", created_sessions)
+
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        return created
+
+    @staticmethod
+    def _column_values(obj) -> dict:
+        """Column attributes set on a transient object (unset ones get their column default)"""
+        return {
+            attr.key: obj.__dict__[attr.key]
+            for attr in inspect(obj).mapper.column_attrs
+            if attr.key in obj.__dict__
+        }
+
     async def archive_current_programs(self, user_id: UUID) -> None:
-        stmt = (
-            update(Program)
-            .where(Program.user_id == user_id, Program.status == "active")
-            .values(status="archived", end_date=datetime.now())
-        )
-        await self.session.execute(stmt)
+        await self.session.execute(archive_active_statement(user_id))
         await self.session.commit()
 
     async def get_program_by_id(self, program_id: UUID) -> Optional[Program]:
@@ -0,0 +1,22 @@
+from typing import Optional
+from uuid import UUID
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+# --- Retrieval Schemas ---
+class KnowledgeHit(BaseModel):
+    """
+    Read-only copy of a KnowledgeItem returned by KnowledgeRetriever.
+    Detached from any DB session, so it can be cached and shared between requests.
+    """
+    id: UUID
+    source_type: str
+    source_id: Optional[UUID] = None
+    content_text: str
+    metadata_info: dict = Field(default_factory=dict)
+    # Only set by KnowledgeRetriever.search_pools (ranking score and stored vector)
+    score: Optional[float] = None
+    embedding: Optional[list[float]] = None
+
+    model_config = ConfigDict(from_attributes=True, frozen=True)
@@ -36,3 +36,16 @@ class ProgramRead(BaseModel):
 class ProgramGenerateResponse(BaseModel):
     program: ProgramRead
     message: str
+
+# --- Generation Job Schemas ---
+class GenerationJobRead(BaseModel):
+    id: UUID
+    method: str
+    status: str  # queued, running, succeeded, failed
+    program_id: Optional[UUID] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,203 @@
+"""
+Retrieval quality and latency benchmark for KnowledgeRetriever.search.
+
+Builds a labelled query set from exercices_autorises.csv (name, muscle group, equipment),
+embeds the exercises with the deterministic local stub (EMBEDDING_PROVIDER="local", no API
+calls) and runs every query through each search configuration:
+recall@1, recall@5, MRR, p50/p99 latency and the size of the indexes involved.
+
+Everything happens in one transaction that is rolled back: knowledge_items is emptied and
+re-seeded for the run only. Point DATABASE_URL to a development database (pgvector >= 0.8).
+
+Usage: python app/scripts/benchmark_retrieval.py [--queries 100] [--seed 42]
+"""
+import argparse
+import asyncio
+import csv
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from collections import defaultdict
+
+# Add project root to sys.path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import delete, text
+from app.core.config import settings
+from app.core.llm import get_local_embedding
+from app.core.user_db import async_session_factory
+from app.models.domain import Exercise, KnowledgeItem
+from app.scripts.ingest_knowledge import CSV_PATH, LEVELS, exercise_document, exercise_metadata
+from app.scripts.seed_exercises import slugify
+from app.services.rag import KnowledgeRetriever
+from app.utils.vectors import binary_quantize
+
+# (label, vector storage, search mode, exact scan)
+CONFIGURATIONS = [
+    ("exact", "full", "vector", True),
+    ("full", "full", "vector", False),
+    ("halfvec", "halfvec", "vector", False),
+    ("binary", "binary", "vector", False),
+    ("full+hybrid", "full", "hybrid", False),
+    ("halfvec+hybrid", "halfvec", "hybrid", False),
+    ("binary+hybrid", "binary", "hybrid", False),
+]
+
+INDEXES = {
+    "full": ["ix_knowledge_items_embedding_exercise"],
+    "halfvec": ["ix_knowledge_items_embedding_half_exercise"],
+    "binary": ["ix_knowledge_items_embedding_bin_exercise"],
+    "hybrid": ["ix_knowledge_items_content_tsv"],
+}
+
+K = 5
+
+
+def load_exercises() -> tuple[list[Exercise], dict]:
+    """Transient Exercise rows (same shape as seed_exercises.py) and their levels."""
+    exercises, levels, seen = [], {}, set()
+    with open(CSV_PATH, mode="r", encoding="utf-8") as csvfile:
+        for row in csv.DictReader(csvfile):
+            name, muscle = row["exercice"].strip(), row["groupe_musculaire"].strip()
+            if not name or not muscle or name in seen:
+                continue
+            seen.add(name)
+            material = row["materiel"].strip()
+            exercises.append(Exercise(
+                id=uuid.uuid4(),
+                name=name,
+                muscle_group=muscle,
+                machine_type_id=slugify(material) if material else None,
+            ))
+            levels[name] = LEVELS.get(row["niveau"].strip())
+    return exercises, levels
+
+
+def build_queries(exercises: list[Exercise], n: int, seed: int) -> list[dict]:
+    """
+    Up to three labelled queries per sampled exercise:
+    - name: the exact exercise name, the only relevant item is the exercise itself
+    - description: "<equipment> exercise for <muscle>", any exercise with both is relevant
+    - filtered: "exercise for <muscle>" with an equipment filter, same relevant set
+      (not for bodyweight exercises: there is no machine_type to filter on)
+    """
+    by_group = defaultdict(set)
+    for ex in exercises:
+        by_group[(ex.muscle_group, ex.machine_type_id)].add(ex.id)
+
+    rng = random.Random(seed)
+    queries = []
+    for ex in rng.sample(exercises, min(n, len(exercises))):
+        equipment = (ex.machine_type_id or "bodyweight").replace("_", " ").lower()
+        relevant = by_group[(ex.muscle_group, ex.machine_type_id)]
+        queries.append({"kind": "name", "query": ex.name, "filters": None, "relevant": {ex.id}})
+        queries.append({
+            "kind": "description", "query": f"{equipment} exercise for {ex.muscle_group}",
+            "filters": None, "relevant": relevant,
+        })
+        if ex.machine_type_id is None:
+            continue
+        queries.append({
+            "kind": "filtered", "query": f"exercise for {ex.muscle_group}",
+            "filters": {"machine_type": ex.machine_type_id}, "relevant": relevant,
+        })
+    return queries
+
+
+async def seed_knowledge(session, exercises: list[Exercise], levels: dict) -> None:
+    await session.execute(delete(KnowledgeItem))
+    for ex in exercises:
+        # Exercises themselves are not persisted, only referenced through source_id
+        embedding = get_local_embedding(exercise_document(ex))
+        session.add(KnowledgeItem(
+            source_type="exercise",
+            source_id=ex.id,
+            content_text=exercise_document(ex),
+            embedding=embedding,
+            embedding_half=embedding,
+            embedding_bin=binary_quantize(embedding),
+            metadata_info=exercise_metadata(ex, levels),
+        ))
+    await session.flush()
+
+
+async def index_bytes(session, names: list[str]) -> int:
+    total = 0
+    for name in names:
+        size = await session.scalar(text("SELECT pg_relation_size(to_regclass(:name))"), {"name": name})
+        total += size or 0
+    return total
+
+
+async def run_configuration(session, storage: str, mode: str, exact: bool, queries: list[dict]) -> dict:
+    retriever = KnowledgeRetriever(session, storage=storage, use_cache=False)
+    if exact:
+        await session.execute(text("SET LOCAL enable_indexscan = off"))
+
+    results = defaultdict(lambda: {"ranks": [], "latencies": []})
+    for q in queries:
+        start = time.perf_counter()
+        hits = await retriever.search(q["query"], limit=K, source_type="exercise", filters=q["filters"], mode=mode)
+        elapsed = (time.perf_counter() - start) * 1000
+        rank = next((i + 1 for i, hit in enumerate(hits) if hit.source_id in q["relevant"]), None)
+        for kind in (q["kind"], "all"):
+            results[kind]["ranks"].append(rank)
+            results[kind]["latencies"].append(elapsed)
+
+    if exact:
+        await session.execute(text("SET LOCAL enable_indexscan = on"))
+    return results
+
+
+def summarize(ranks: list, latencies: list) -> dict:
+    n = len(ranks)
+    percentiles = statistics.quantiles(latencies, n=100) if n > 1 else latencies * 99
+    return {
+        "recall@1": sum(1 for r in ranks if r == 1) / n,
+        f"recall@{K}": sum(1 for r in ranks if r is not None) / n,
+        "mrr": sum(1 / r for r in ranks if r is not None) / n,
+        "p50": percentiles[49],
+        "p99": percentiles[98],
+    }
+
+
+async def run(n_queries: int, seed: int) -> None:
+    # Queries and documents must come from the same embedding function
+    settings.EMBEDDING_PROVIDER = "local"
+
+    exercises, levels = load_exercises()
+    async with async_session_factory() as session:
+        try:
+            await seed_knowledge(session, exercises, levels)
+            queries = build_queries(exercises, n_queries, seed)
+            print(f"{len(exercises)} exercises, {len(queries)} queries (seed={seed}), k={K}")
+            print(
+                f"{'config':<15} {'queries':<12} {'R@1':>6} {f'R@{K}':>6} {'MRR':>6} "
+                f"{'p50 ms':>8} {'p99 ms':>8} {'index KiB':>10}"
+            )
+            for label, storage, mode, exact in CONFIGURATIONS:
+                results = await run_configuration(session, storage, mode, exact, queries)
+                indexes = [] if exact else INDEXES[storage] + (INDEXES["hybrid"] if mode == "hybrid" else [])
+                size_kib = await index_bytes(session, indexes) / 1024
+                for kind in ("name", "description", "filtered", "all"):
+                    if kind not in results:
+                        # e.g. only bodyweight exercises sampled: no filtered query
+                        continue
+                    m = summarize(results[kind]["ranks"], results[kind]["latencies"])
+                    print(
+                        f"{label:<15} {kind:<12} {m['recall@1']:>6.3f} {m[f'recall@{K}']:>6.3f} "
+                        f"{m['mrr']:>6.3f} {m['p50']:>8.2f} {m['p99']:>8.2f} {size_kib:>10.0f}"
+                    )
+        finally:
+            await session.rollback()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=100, help="Sampled exercises (up to 3 queries each)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(run(args.queries, args.seed))
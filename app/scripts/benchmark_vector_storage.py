@@ -0,0 +1,100 @@
+"""
+Compares the vector storages of knowledge_items (see RAG_VECTOR_STORAGE):
+index / column size, search latency and recall@k against an exact scan of the float32 column.
+
+Usage: python app/scripts/benchmark_vector_storage.py [--queries 50] [--k 5] [--source-type exercise]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+# Add project root to sys.path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import func, select, text
+from app.core.user_db import async_session_factory
+from app.models.domain import KnowledgeItem
+from app.services.rag import KnowledgeRetriever, VECTOR_STORAGES
+
+STORAGE_COLUMNS = {"full": "embedding", "halfvec": "embedding_half", "binary": "embedding_bin"}
+
+
+def perturb(vector: list[float], noise: float) -> list[float]:
+    """Query vectors are stored embeddings plus noise, so the top-1 is not trivially the item itself."""
+    return [value + random.gauss(0.0, noise) for value in vector]
+
+
+async def storage_sizes(session, source_type: str) -> dict:
+    sizes = {}
+    for storage, column in STORAGE_COLUMNS.items():
+        index_name = f"ix_knowledge_items_{column}_{source_type}"
+        index_bytes = await session.scalar(
+            text("SELECT pg_relation_size(to_regclass(:name))"), {"name": index_name}
+        )
+        column_bytes = await session.scalar(
+            select(func.avg(func.pg_column_size(getattr(KnowledgeItem, column))))
+            .where(KnowledgeItem.source_type == source_type)
+        )
+        sizes[storage] = (index_bytes or 0, float(column_bytes or 0))
+    return sizes
+
+
+async def exact_neighbours(session, query_vector: list[float], k: int, source_type: str) -> list:
+    """Ground truth: sequential scan of the float32 column (no approximate index)."""
+    await session.execute(text("SET LOCAL enable_indexscan = off"))
+    distance = KnowledgeItem.embedding.cosine_distance(query_vector)
+    result = await session.execute(
+        select(KnowledgeItem.id).where(KnowledgeItem.source_type == source_type).order_by(distance).limit(k)
+    )
+    await session.execute(text("SET LOCAL enable_indexscan = on"))
+    return list(result.scalars().all())
+
+
+async def run(n_queries: int, k: int, source_type: str, noise: float) -> None:
+    async with async_session_factory() as session:
+        result = await session.execute(
+            select(KnowledgeItem.embedding)
+            .where(KnowledgeItem.source_type == source_type)
+            .order_by(func.random())
+            .limit(n_queries)
+        )
+        queries = [perturb(list(vector), noise) for vector in result.scalars().all()]
+        if not queries:
+            print(f"No '{source_type}' items to benchmark. Run ingest_knowledge.py first.")
+            return
+
+        truths = [await exact_neighbours(session, q, k, source_type) for q in queries]
+        sizes = await storage_sizes(session, source_type)
+
+        print(f"{len(queries)} queries, k={k}, source_type={source_type}, noise={noise}")
+        print(f"{'storage':<8} {'index KiB':>10} {'col bytes':>10} {'p50 ms':>8} {'p95 ms':>8} {'recall@k':>9}")
+        for storage in VECTOR_STORAGES:
+            retriever = KnowledgeRetriever(session, storage=storage, use_cache=False)
+            latencies, recalls = [], []
+            for query_vector, truth in zip(queries, truths):
+                start = time.perf_counter()
+                items = await retriever.search_by_vector(query_vector, limit=k, source_type=source_type)
+                latencies.append((time.perf_counter() - start) * 1000)
+                recalls.append(len({item.id for item in items} & set(truth)) / len(truth))
+
+            index_bytes, column_bytes = sizes[storage]
+            p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+            print(
+                f"{storage:<8} {index_bytes / 1024:>10.0f} {column_bytes:>10.0f} "
+                f"{statistics.median(latencies):>8.2f} {p95:>8.2f} {statistics.mean(recalls):>9.3f}"
+            )
+        await session.rollback()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--source-type", default="exercise")
+    parser.add_argument("--noise", type=float, default=0.01)
+    args = parser.parse_args()
+    asyncio.run(run(args.queries, args.k, args.source_type, args.noise))
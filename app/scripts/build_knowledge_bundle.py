@@ -0,0 +1,70 @@
+"""
+Build the knowledge bundle loaded by the API and the workers at startup.
+
+Writes one versioned file: the parsed expert markdown corpus, the knowledge_items rows
+and their embeddings (float32 matrix, memory-mapped by every process). Run it after
+ingest_knowledge.py; processes ignore the knowledge_items part of a bundle whose
+knowledge base version is not the current one.
+
+Usage: python app/scripts/build_knowledge_bundle.py [--output build/knowledge.bundle]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+import numpy as np
+
+# Add project root to sys.path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import select
+from sqlalchemy.orm import undefer
+from app.core.config import settings
+from app.core.llm import EMBEDDING_DIMENSIONS
+from app.core.user_db import async_session_factory
+from app.models.domain import KnowledgeItem
+from app.repositories.catalog_version import CatalogVersionRepository, KNOWLEDGE_BASE
+from app.schemas.knowledge import KnowledgeHit
+from app.services.knowledge import knowledge_base, load_corpus
+from app.services.knowledge_bundle import write_bundle
+
+
+async def load_items(session) -> tuple[list[KnowledgeHit], np.ndarray, str | None]:
+    version = await CatalogVersionRepository(session).get_version(KNOWLEDGE_BASE)
+    result = await session.execute(
+        select(KnowledgeItem)
+        .where(KnowledgeItem.embedding.is_not(None))
+        .options(undefer(KnowledgeItem.embedding))
+        .order_by(KnowledgeItem.id)
+    )
+    rows = result.scalars().all()
+    items = [
+        KnowledgeHit(
+            id=row.id, source_type=row.source_type, source_id=row.source_id,
+            content_text=row.content_text, metadata_info=row.metadata_info or {},
+        )
+        for row in rows
+    ]
+    embeddings = np.asarray([row.embedding for row in rows], dtype=np.float32).reshape(-1, EMBEDDING_DIMENSIONS)
+    return items, embeddings, version
+
+
+async def main(output: str) -> None:
+    corpus = load_corpus(knowledge_base.root)
+    print(f"📚 {len(corpus.documents)} markdown files, {len(corpus.sections)} sections")
+
+    async with async_session_factory() as session:
+        items, embeddings, knowledge_version = await load_items(session)
+    print(f"🧮 {len(items)} knowledge items (knowledge base version {knowledge_version})")
+
+    version = write_bundle(output, corpus, items, embeddings, knowledge_version)
+    size_mib = os.path.getsize(output) / 1024 / 1024
+    print(f"✅ Bundle {version} written to {output} ({size_mib:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=settings.KNOWLEDGE_BUNDLE_PATH)
+    args = parser.parse_args()
+    asyncio.run(main(args.output))
@@ -1,4 +1,5 @@
 import asyncio
+import csv
 import os
 import sys
 import glob
@@ -10,6 +11,8 @@ from sqlalchemy import select, delete
 from app.core.user_db import async_session_factory
 from app.models.domain import Exercise, KnowledgeItem
 from app.core.config import settings
+from app.repositories.catalog_version import CatalogVersionRepository, KNOWLEDGE_BASE
+from app.utils.vectors import binary_quantize
 
 import google.generativeai as genai
 
@@ -18,6 +21,20 @@ genai.configure(api_key=settings.GEMINI_API_KEY)
 EMBEDDING_MODEL = "models/text-embedding-004"
 
 ASSETS_DIR = "assets/Documentation pour développement"
+CSV_PATH = os.path.join(ASSETS_DIR, "Dataset Exercices (à cleaner)", "exercices_autorises.csv")
+
+# CSV levels -> profile levels (OnboardingData.experience_level), so both can be matched
+LEVELS = {"débutant": "beginner", "intermédiaire": "intermediate", "avancé": "advanced"}
+
+def load_exercise_levels() -> dict:
+    """Exercise name -> level. The level only lives in the source CSV, not in `exercises`."""
+    if not os.path.exists(CSV_PATH):
+        return {}
+    with open(CSV_PATH, mode="r", encoding="utf-8") as csvfile:
+        return {
+            row["exercice"].strip(): LEVELS.get(row["niveau"].strip())
+            for row in csv.DictReader(csvfile)
+        }
 
 async def get_embedding(text: str):
     try:
@@ -32,6 +49,19 @@ async def get_embedding(text: str):
         print(f"Error embedding text '{text[:50]}...': {e}")
         return None
 
+def exercise_document(ex: Exercise) -> str:
+    """Text embedded for an exercise."""
+    return f"Exercise: {ex.name}. Muscle: {ex.muscle_group}. Description: {ex.description or ''}"
+
+def exercise_metadata(ex: Exercise, levels: dict) -> dict:
+    """Filterable metadata (see KnowledgeRetriever.search). Missing values are left out."""
+    meta = {"name": ex.name, "muscle": ex.muscle_group}
+    if ex.machine_type_id:
+        meta["machine_type"] = ex.machine_type_id
+    if level := levels.get(ex.name):
+        meta["level"] = level
+    return meta
+
 async def ingest_exercises(session):
     print("--- 1. Ingesting Exercises ---")
     stmt = select(Exercise)
@@ -43,11 +73,12 @@ async def ingest_exercises(session):
     total_ex = len(exercises)
     
     print(f"Total exercises to ingest: {total_ex}")
+    levels = load_exercise_levels()
     
     # Prepare all items first (descriptions)
     ex_items = []
     for ex in exercises:
-        desc = f"Exercise: {ex.name}. Muscle: {ex.muscle_group}. Description: {ex.description or ''}"
+        desc = exercise_document(ex)
         ex_items.append((ex, desc))
         
     for i in range(0, total_ex, BATCH_SIZE):
@@ -65,7 +96,9 @@ async def ingest_exercises(session):
                     source_id=ex.id,
                     content_text=desc,
                     embedding=embedding,
-                    metadata_info={"name": ex.name, "muscle": ex.muscle_group}
+                    embedding_half=embedding,
+                    embedding_bin=binary_quantize(embedding),
+                    metadata_info=exercise_metadata(ex, levels)
                 )
                 session.add(item)
                 count += 1
@@ -161,6 +194,8 @@ async def ingest_documents(session):
                         source_type="doc_chunk",
                         content_text=text,
                         embedding=embedding,
+                        embedding_half=embedding,
+                        embedding_bin=binary_quantize(embedding),
                         metadata_info=meta
                     )
                     session.add(item)
@@ -181,6 +216,9 @@ async def main():
         await clear_knowledge(session)
         await ingest_exercises(session)
         await ingest_documents(session)
+        # Invalidates the search caches of running API processes
+        version = await CatalogVersionRepository(session).bump(KNOWLEDGE_BASE)
+        print(f"📌 Knowledge base version: {version}")
 
 if __name__ == "__main__":
     asyncio.run(main())
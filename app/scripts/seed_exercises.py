@@ -9,6 +9,7 @@ sys.path.append(os.getcwd())
 from sqlalchemy import select, delete
 from app.core.user_db import async_session_factory
 from app.models.domain import Machine, Exercise
+from app.repositories.catalog_version import CatalogVersionRepository, EXERCISE_CATALOG
 
 CSV_PATH = "assets/Documentation pour développement/Dataset Exercices (à cleaner)/exercices_autorises.csv"
 
@@ -82,6 +83,8 @@ async def seed_data():
             session.add_all(new_exercises_objects)
             await session.commit()
             print(f"Inserted {len(new_exercises_objects)} new exercises.")
+            # Running API processes recompile their template catalog
+            await CatalogVersionRepository(session).bump(EXERCISE_CATALOG)
         else:
             print("No new exercises to insert.")
 
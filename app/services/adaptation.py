@@ -113,7 +113,10 @@ class AdaptationService:
         async def fetch_rag_alts():
             rag_res = []
             query = f"Alternative to {original_exercise.name} targeting {original_exercise.muscle_group}"
-            rag_hits = await self.retriever.search(query, limit=3, source_type="exercise")
+            rag_hits = await self.retriever.search(
+                query, limit=3, source_type="exercise",
+                filters={"muscle": original_exercise.muscle_group}
+            )
             for hit in rag_hits:
                 if str(hit.source_id) == str(original_exercise.id): continue
                 rag_res.append({
@@ -135,19 +138,24 @@ class AdaptationService:
 
     async def _filter_available_candidates(self, candidates: List[dict]) -> List[dict]:
         """
-        Check IoT availability for all candidates in parallel.
+        Check IoT availability for all candidates at once: one query for their exercises,
+        one wait time lookup for all their machine types.
         """
-        async def check_one(cand):
-            cw = 0
-            if cand.get("id"):
-                c_ex = await self.dict_repo.get_exercise_by_id(UUID(cand["id"]))
-                if c_ex and c_ex.machine_type_id:
-                    cw = await self.iot_service.get_estimated_wait_time(c_ex.machine_type_id)
-            cand["wait_time"] = cw
-            return cand if cw <= self.WAIT_THRESHOLD_MINUTES else None
+        exercises = await self.dict_repo.get_exercises_by_ids([UUID(c["id"]) for c in candidates if c.get("id")])
+        machine_types = {
+            c["id"]: exercises[UUID(c["id"])].machine_type_id
+            for c in candidates
+            if c.get("id") and UUID(c["id"]) in exercises and exercises[UUID(c["id"])].machine_type_id
+        }
+        wait_times = await self.iot_service.get_wait_times(list(dict.fromkeys(machine_types.values())))
 
-        results = await asyncio.gather(*[check_one(c) for c in candidates])
-        return [r for r in results if r is not None]
+        available = []
+        for cand in candidates:
+            machine_type_id = machine_types.get(cand.get("id"))
+            cand["wait_time"] = wait_times.get(machine_type_id, 0) if machine_type_id else 0
+            if cand["wait_time"] <= self.WAIT_THRESHOLD_MINUTES:
+                available.append(cand)
+        return available
 
     async def _ask_llm_for_swap(self, user_profile: dict, original_exercise: Exercise, candidates: List[dict], stats_context: str) -> dict:
         """
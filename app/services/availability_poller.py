@@ -0,0 +1,124 @@
+import asyncio
+import time
+from types import MappingProxyType
+from typing import Dict, Iterable, Mapping, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+class MachineAvailability(BaseModel):
+    """Last prediction seen for a machine"""
+    available: bool
+    time_to_wait: int
+    observed_at: float  # time.monotonic() of the observation
+
+    model_config = ConfigDict(frozen=True)
+
+
+class AvailabilityPoller:
+    """
+    Process-wide snapshot of the availability of every machine, kept current by a
+    background task (started in the lifespan of app.main) instead of one round of
+    prediction requests per user and exercise.
+
+    Polls every `interval_seconds` while availabilities change, and backs off up to
+    `max_interval_seconds` while nothing does. Readers only trust observations younger
+    than `max_age_seconds` (see `fresh`); anything older is requested live by IoTService.
+    """
+
+    def __init__(self, interval_seconds: float, max_interval_seconds: float, max_age_seconds: float,
+                 concurrency: int = 16, deadline_seconds: float = 10.0):
+        self.interval_seconds = interval_seconds
+        self.max_interval_seconds = max_interval_seconds
+        self.max_age_seconds = max_age_seconds
+        # A round has its own budget, larger than a user lookup's
+        self.concurrency = concurrency
+        self.deadline_seconds = deadline_seconds
+        self.snapshot: Mapping[str, MachineAvailability] = MappingProxyType({})
+
+    def fresh(self, machine_ids: Iterable[str]) -> Optional[Dict[str, MachineAvailability]]:
+        """Observations of these machines if all of them are recent enough, else None"""
+        snapshot = self.snapshot
+        oldest_allowed = time.monotonic() - self.max_age_seconds
+        observations = {}
+        for machine_id in machine_ids:
+            observation = snapshot.get(machine_id)
+            if observation is None or observation.observed_at < oldest_allowed:
+                return None
+            observations[machine_id] = observation
+        return observations
+
+    def record(self, predictions: Mapping[str, dict], machine_ids: Optional[Iterable[str]] = None) -> bool:
+        """
+        Merge prediction payloads into the snapshot (a new mapping, swapped in one assignment).
+        With `machine_ids`, machines no longer listed are dropped. Returns whether an
+        availability or wait time changed.
+        """
+        now = time.monotonic()
+        previous = self.snapshot
+        updated = dict(previous)
+        if machine_ids is not None:
+            keep = set(machine_ids)
+            updated = {machine_id: obs for machine_id, obs in updated.items() if machine_id in keep}
+        changed = False
+        for machine_id, data in predictions.items():
+            observation = MachineAvailability(
+                available=bool(data.get("available")),
+                time_to_wait=data.get("time_to_wait") or 0,
+                observed_at=now,
+            )
+            old = previous.get(machine_id)
+            changed = changed or old is None or (old.available, old.time_to_wait) != (
+                observation.available, observation.time_to_wait
+            )
+            updated[machine_id] = observation
+        self.snapshot = MappingProxyType(updated)
+        return changed
+
+    async def poll_once(self, iot_service) -> bool:
+        """One round over all machines. Returns whether anything changed."""
+        machine_ids = await iot_service.registry.all_machines(iot_service.client)
+        # Least recently observed first: a round cut off by its deadline leaves out others next time
+        snapshot = self.snapshot
+        order = sorted(
+            machine_ids,
+            key=lambda machine_id: snapshot[machine_id].observed_at if machine_id in snapshot else float("-inf"),
+        )
+        predictions = await iot_service.fetch_predictions(
+            order, done=lambda received: False,
+            concurrency=self.concurrency, deadline_seconds=self.deadline_seconds,
+        )
+        metrics.inc("iot_availability_polls_total", help_text="Availability polling rounds")
+        return self.record(predictions, machine_ids)
+
+    async def run(self, iot_service) -> None:
+        """Background task (cancelled on shutdown), polling through an IoTService"""
+        interval = self.interval_seconds
+        while True:
+            try:
+                changed = await self.poll_once(iot_service)
+                interval = self.interval_seconds if changed else min(interval * 2, self.max_interval_seconds)
+            except Exception as e:
+                print(f"⚠️ IoT availability poll failed: {e}")
+                interval = self.interval_seconds
+            await asyncio.sleep(interval)
+
+
+availability_poller = AvailabilityPoller(
+    interval_seconds=settings.IOT_POLL_INTERVAL_SECONDS,
+    max_interval_seconds=settings.IOT_POLL_MAX_INTERVAL_SECONDS,
+    max_age_seconds=settings.IOT_AVAILABILITY_MAX_AGE_SECONDS,
+    concurrency=settings.IOT_POLL_CONCURRENCY,
+    deadline_seconds=settings.IOT_POLL_DEADLINE_SECONDS,
+)
+
+metrics.gauge(
+    "iot_availability_snapshot_age_seconds",
+    lambda: time.monotonic() - min(
+        (obs.observed_at for obs in availability_poller.snapshot.values()), default=time.monotonic()
+    ),
+    help_text="Age of the oldest machine availability in the snapshot",
+)
@@ -0,0 +1,53 @@
+from typing import Optional
+from uuid import UUID
+
+from fastapi import HTTPException
+
+from app.models.domain import GenerationJob
+from app.repositories.generation_job import GenerationJobRepository
+from app.repositories.profile import ProfileRepository
+
+
+class GenerationJobService:
+    """
+    Program generation as a background job: the API only enqueues and reports status,
+    the generation itself runs in app/worker.py.
+    """
+    def __init__(self, job_repo: GenerationJobRepository, profile_repo: ProfileRepository):
+        self.job_repo = job_repo
+        self.profile_repo = profile_repo
+
+    async def enqueue_generation(self, user_id: UUID, method: str = "template",
+                                 idempotency_key: Optional[str] = None) -> tuple[GenerationJob, bool]:
+        """
+        Returns the job and whether it is new. A retry with the same idempotency key, or any
+        request while the user already has a generation queued or running, gets that job back.
+
+        A speculative generation started at onboarding for the same method and profile
+        version is taken over instead of starting a new one: already done, the job comes back
+        succeeded with its program activated.
+        """
+        # Fail fast instead of queueing a job that can only fail
+        profile = await self.profile_repo.get_by_user_id(user_id)
+        if not profile:
+            raise HTTPException(status_code=400, detail="User profile not found. Complete onboarding first.")
+
+        if idempotency_key:
+            existing = await self.job_repo.get_by_idempotency_key(user_id, idempotency_key)
+            if existing is not None:
+                return existing, False
+
+        speculative = await self.job_repo.take_speculative(
+            user_id, method, profile.updated_at, idempotency_key=idempotency_key
+        )
+        if speculative is not None:
+            return speculative, False
+        # Speculation for another method or profile version: not what the user wants
+        await self.job_repo.cancel_speculative(user_id)
+        return await self.job_repo.enqueue(user_id, method, idempotency_key=idempotency_key)
+
+    async def get_job(self, user_id: UUID, job_id: UUID) -> GenerationJob:
+        job = await self.job_repo.get_job(job_id, user_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Generation job not found.")
+        return job
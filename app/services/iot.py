@@ -1,54 +1,136 @@
-from typing import List, Optional
+import asyncio
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
 import httpx
 from app.core.config import settings
+from app.core.http import data_api
+from app.core.metrics import metrics
+from app.core.timing import timed
+from app.services.availability_poller import AvailabilityPoller, availability_poller
+from app.services.machine_registry import MachineRegistry, machine_registry
 
 class IoTService:
-    def __init__(self):
-        self.base_url = settings.FIT_BUDDY_DATA_URL
-        # In a real app, we might want to cache the machine list
+    def __init__(self, client: Optional[httpx.AsyncClient] = None, registry: Optional[MachineRegistry] = None,
+                 poller: Optional[AvailabilityPoller] = None):
+        # Shared keep-alive client of the process by default (base URL: FIT_BUDDY_DATA_URL)
+        self.client = client or data_api.client
+        # Cached machine list, indexed by machine type
+        self.registry = registry or machine_registry
+        # Availability snapshot kept current in the background
+        self.poller = poller or availability_poller
         
     async def get_estimated_wait_time(self, machine_type_id: str) -> int:
         """
         Connects to fit-buddy-data API to get real predictions.
         Logic: 
-        1. List all machines.
-        2. Filter those matching 'machine_type_id' (Naive contains match).
-        3. Get prediction for each.
-        4. Return the BEST availability (min wait time).
+        1. Units of 'machine_type_id' from the machine registry (IDs like "DC_BENCH_001"
+           for the type "DC_BENCH"; the list is only downloaded when its TTL expired).
+        2. Availability of each from the poller's snapshot when recent enough, else
+           live predictions (concurrently, see fetch_predictions).
+        3. Return the BEST availability (min wait time).
         """
+        wait_times = await self.get_wait_times([machine_type_id])
+        return wait_times[machine_type_id]
+
+    @timed("iot")
+    async def get_wait_times(self, machine_type_ids: Sequence[str]) -> Dict[str, int]:
+        """
+        Best wait time (minutes) of each machine type, as in get_estimated_wait_time but with
+        one look at the machine list and one round of predictions for all the types: a unit
+        shared by several types is requested once, and the round stops as soon as every type
+        has a free unit. Types without units, or without any prediction received, get 0.
+        """
+        wait_times = {machine_type_id: 0 for machine_type_id in machine_type_ids}
         try:
-            async with httpx.AsyncClient() as client:
-                # 1. Get All Machines
-                resp = await client.get(f"{self.base_url}/api/machine/list", timeout=5.0)
-                if resp.status_code != 200:
-                    print(f"⚠️ IoT API Error (List): {resp.status_code}")
-                    return 0 # Fallback 
-                
-                all_machines = resp.json().get("machines", [])
-                
-                # 2. Naive Filter
-                # We assume machine_type_id (e.g. "DC_BENCH") is widely used in the ID (e.g. "DC_BENCH_001")
-                candidates = [m for m in all_machines if machine_type_id in m]
-                
-                if not candidates:
-                    return 0 
-
-                # 3. Check Prediction for each
-                wait_times = []
-                for mid in candidates:
-                    p_resp = await client.get(f"{self.base_url}/api/machine/{mid}/prediction", timeout=3.0)
-                    if p_resp.status_code == 200:
-                        data = p_resp.json().get("data", {})
-                        if data.get("available"):
-                            return 0 # Found one free!
-                        else:
-                            wait_times.append(data.get("time_to_wait", 0))
-                
-                if not wait_times:
-                     return 0
-                     
-                return min(wait_times)
-                
+            # 1. Machines of those types
+            units = await self.registry.machines_of_types(wait_times, self.client)
+            units = {machine_type_id: ids for machine_type_id, ids in units.items() if ids}
+
+            # 2. Types whose units are all in a recent enough snapshot: no request at all
+            pending = {}
+            for machine_type_id, ids in units.items():
+                observations = self.poller.fresh(ids)
+                if observations is None:
+                    pending[machine_type_id] = ids
+                    continue
+                metrics.inc("iot_availability_snapshot_hits_total", help_text="Wait times answered from the snapshot")
+                wait_times[machine_type_id] = _best_wait(
+                    (obs.available, obs.time_to_wait) for obs in observations.values()
+                )
+            if not pending:
+                return wait_times
+
+            # 3. Otherwise predictions of all their units at once, stop once each type has a free one
+            def every_type_free(received: Dict[str, dict]) -> bool:
+                return all(
+                    any(received.get(machine_id, {}).get("available") for machine_id in ids)
+                    for ids in pending.values()
+                )
+
+            predictions = await self.fetch_predictions(
+                [machine_id for ids in pending.values() for machine_id in ids], done=every_type_free
+            )
+            self.poller.record(predictions)
+            for machine_type_id, ids in pending.items():
+                wait_times[machine_type_id] = _best_wait(
+                    (bool(predictions[machine_id].get("available")), predictions[machine_id].get("time_to_wait", 0))
+                    for machine_id in ids if machine_id in predictions
+                )
+            return wait_times
+
         except Exception as e:
             print(f"⚠️ IoT Service Connection Error: {e}")
-            return 0 # Fail open
+            return {machine_type_id: 0 for machine_type_id in machine_type_ids} # Fail open
+
+    async def fetch_predictions(self, machine_ids: Sequence[str],
+                                done: Callable[[Dict[str, dict]], bool],
+                                concurrency: Optional[int] = None,
+                                deadline_seconds: Optional[float] = None) -> Dict[str, dict]:
+        """
+        Prediction payloads ("data") by machine ID, requested concurrently (at most
+        `concurrency`, default IOT_PREDICTION_CONCURRENCY, in flight). Returns as soon as
+        `done(received)` is true or `deadline_seconds` (default IOT_PREDICTION_DEADLINE_SECONDS)
+        have passed, and cancels the requests still running. Failed predictions are left out.
+        """
+        semaphore = asyncio.Semaphore(concurrency or settings.IOT_PREDICTION_CONCURRENCY)
+        deadline_seconds = deadline_seconds or settings.IOT_PREDICTION_DEADLINE_SECONDS
+
+        async def predict(machine_id: str) -> tuple[str, Optional[dict]]:
+            async with semaphore:
+                resp = await self.client.get(
+                    f"/api/machine/{machine_id}/prediction", timeout=settings.IOT_PREDICTION_TIMEOUT_SECONDS
+                )
+            if resp.status_code != 200:
+                return machine_id, None
+            return machine_id, resp.json().get("data", {})
+
+        received: Dict[str, dict] = {}
+        tasks = [asyncio.create_task(predict(machine_id)) for machine_id in dict.fromkeys(machine_ids)]
+        try:
+            async with asyncio.timeout(deadline_seconds):
+                for next_done in asyncio.as_completed(tasks):
+                    try:
+                        machine_id, data = await next_done
+                    except Exception as e:
+                        print(f"⚠️ IoT prediction failed: {e}")
+                        continue
+                    if data is not None:
+                        received[machine_id] = data
+                        if done(received):
+                            break
+        except TimeoutError:
+            print(f"⚠️ IoT predictions deadline: {len(received)}/{len(tasks)} received")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return received
+
+
+def _best_wait(states: Iterable[tuple[bool, int]]) -> int:
+    """0 if a unit is free (or nothing is known), else the shortest wait"""
+    wait_times = []
+    for available, time_to_wait in states:
+        if available:
+            return 0 # Found one free!
+        wait_times.append(time_to_wait)
+    return min(wait_times, default=0)
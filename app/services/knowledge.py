@@ -1,36 +1,227 @@
-import os
+import asyncio
 import glob
-from typing import List
+import hashlib
+import os
+from types import MappingProxyType
+from typing import Iterable, List, Mapping, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+from app.core.config import settings
+from app.services.knowledge_sections import KnowledgeSection, parse_sections
 
 ASSETS_DIR = "assets/Documentation pour développement/Exemples_markdowns_sport"
 
+
+class MarkdownDocument(BaseModel):
+    """One markdown file of the expert corpus"""
+    directory: str
+    name: str
+    text: str
+    digest: str  # sha256 of the content
+    # mtime of the file read on this machine; None when it comes from a bundle built elsewhere
+    mtime_ns: Optional[int] = None
+
+    model_config = ConfigDict(frozen=True)
+
+
+class KnowledgeCorpus(BaseModel):
+    """
+    Immutable snapshot of the expert markdown corpus: the files, their sections
+    (see knowledge_sections.py) and the sections of each directory and tag.
+    """
+    documents: tuple[MarkdownDocument, ...]
+    sections: tuple[KnowledgeSection, ...]
+    by_directory: Mapping[str, tuple[int, ...]]
+    by_tag: Mapping[str, frozenset[int]]
+
+    model_config = ConfigDict(frozen=True, arbitrary_types_allowed=True)
+
+    @classmethod
+    def build(cls, documents: list[MarkdownDocument],
+              sections: Optional[list[KnowledgeSection]] = None) -> "KnowledgeCorpus":
+        """Parses the documents, unless their sections are given (prebuilt bundle)"""
+        documents = sorted(documents, key=lambda doc: (doc.directory, doc.name))
+        if sections is None:
+            sections = [
+                section for doc in documents for section in parse_sections(doc.directory, doc.name, doc.text)
+            ]
+        by_directory, by_tag = {}, {}
+        for index, section in enumerate(sections):
+            by_directory.setdefault(section.directory, []).append(index)
+            for tag in section.tags:
+                by_tag.setdefault(tag, set()).add(index)
+        return cls(
+            documents=tuple(documents),
+            sections=tuple(sections),
+            by_directory=MappingProxyType({key: tuple(value) for key, value in by_directory.items()}),
+            by_tag=MappingProxyType({key: frozenset(value) for key, value in by_tag.items()}),
+        )
+
+    def select(self, directory: str, tags: Optional[Iterable[str]] = None) -> list[KnowledgeSection]:
+        """Sections of a directory, in file order; with `tags`, only those having one of them"""
+        indexes = self.by_directory.get(directory, ())
+        if tags is not None:
+            wanted = set().union(*(self.by_tag.get(tag, ()) for tag in tags))
+            indexes = [index for index in indexes if index in wanted]
+        return [self.sections[index] for index in indexes]
+
+    def text(self, directory: str, tags: Optional[Iterable[str]] = None) -> str:
+        return render_sections(self.select(directory, tags))
+
+
+def render_sections(sections: Iterable[KnowledgeSection]) -> str:
+    """Prompt text: the sections grouped under a source line per file"""
+    text = ""
+    document = None
+    for section in sections:
+        if section.document != document:
+            document = section.document
+            text += f"\n\n--- Source: {document} ---\n"
+        else:
+            text += "\n\n"
+        text += section.text
+    return text
+
+
+def _markdown_paths(root: str) -> list[str]:
+    return glob.glob(os.path.join(root, "*", "*.md"))
+
+
+def _read_document(path: str, mtime_ns: int) -> MarkdownDocument:
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    return MarkdownDocument(
+        directory=os.path.basename(os.path.dirname(path)),
+        name=os.path.basename(path),
+        text=text,
+        mtime_ns=mtime_ns,
+        digest=hashlib.sha256(text.encode("utf-8")).hexdigest(),
+    )
+
+
+def load_corpus(root: str) -> KnowledgeCorpus:
+    return KnowledgeCorpus.build([_read_document(path, os.stat(path).st_mtime_ns) for path in _markdown_paths(root)])
+
+
+def refresh_corpus(current: KnowledgeCorpus, root: str) -> Optional[KnowledgeCorpus]:
+    """
+    New corpus if files were added, removed or have a new mtime, else None (nothing read).
+
+    The mtime only tells which files to read again: whether a file changed is decided on its
+    content digest, so a touched file (or one from a bundle, whose mtime is not this
+    machine's) with the same content only gets its mtime recorded and is not parsed again.
+    """
+    known = {os.path.join(root, doc.directory, doc.name): doc for doc in current.documents}
+    documents = []
+    touched = changed = False
+    for path in _markdown_paths(root):
+        mtime_ns = os.stat(path).st_mtime_ns
+        doc = known.pop(path, None)
+        if doc is not None and doc.mtime_ns == mtime_ns:
+            documents.append(doc)
+            continue
+        touched = True
+        read = _read_document(path, mtime_ns)
+        if doc is not None and doc.digest == read.digest:
+            documents.append(doc.model_copy(update={"mtime_ns": mtime_ns}))
+        else:
+            documents.append(read)
+            changed = True
+    if known:
+        changed = True
+    if not touched and not changed:
+        return None
+    return KnowledgeCorpus.build(documents, sections=None if changed else list(current.sections))
+
+
+def _contents(corpus: KnowledgeCorpus) -> list[tuple[str, str, str]]:
+    return [(doc.directory, doc.name, doc.digest) for doc in corpus.documents]
+
+
+class KnowledgeBase:
+    """
+    Process-wide expert corpus: loaded once (at startup, or on first use), then kept in sync
+    with the files by `run_refresher`. Readers get the current snapshot, swapped in one
+    assignment, and never touch the disk.
+    """
+
+    def __init__(self, root: str, refresh_seconds: float):
+        self.root = root
+        self.refresh_seconds = refresh_seconds
+        self._corpus: Optional[KnowledgeCorpus] = None
+
+    @property
+    def corpus(self) -> KnowledgeCorpus:
+        if self._corpus is None:
+            self.load()
+        return self._corpus
+
+    def load(self, bundle=None) -> None:
+        """From the files, or already parsed from a KnowledgeBundle (checked by the next refresh)"""
+        self._corpus = bundle.corpus() if bundle is not None else load_corpus(self.root)
+
+    async def refresh(self) -> bool:
+        """
+        Returns whether the content changed (content digests, see refresh_corpus: a touched
+        but identical file only updates its mtime).
+        """
+        current = self.corpus
+        updated = await asyncio.to_thread(refresh_corpus, current, self.root)
+        if updated is None:
+            return False
+        self._corpus = updated
+        return _contents(updated) != _contents(current)
+
+    async def run_refresher(self) -> None:
+        """Background task (cancelled on shutdown)"""
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                if await self.refresh():
+                    print(f"Knowledge corpus reloaded: {len(self.corpus.documents)} documents")
+            except Exception as e:
+                # Keep serving the current corpus
+                print(f"Knowledge corpus refresh failed: {e}")
+
+
+knowledge_base = KnowledgeBase(os.path.join(os.getcwd(), ASSETS_DIR), settings.KNOWLEDGE_REFRESH_SECONDS)
+
+
 class KnowledgeService:
-    @staticmethod
-    def _read_markdown_files(directory: str) -> str:
-        """Reads all markdown files in a subdirectory and returns combined text."""
-        path = os.path.join(os.getcwd(), ASSETS_DIR, directory, "*.md")
-        combined_text = ""
-        for file_path in glob.glob(path):
-            with open(file_path, "r", encoding="utf-8") as f:
-                combined_text += f"\n\n--- Source: {os.path.basename(file_path)} ---\n"
-                combined_text += f.read()
-        return combined_text
-
-    def get_construction_guidelines(self) -> str:
-        """Returns guidelines from 'contruction-de-programme' and 'principe-de-base'."""
+    """Expert markdown knowledge given to the LLM, served from memory (see KnowledgeBase)"""
+
+    def __init__(self, base: KnowledgeBase = knowledge_base):
+        self.base = base
+
+    def _read_markdown_files(self, directory: str, tags: Optional[Iterable[str]] = None) -> str:
+        """Sections of a subdirectory (those with one of `tags`, when given)."""
+        return self.base.corpus.text(directory, tags)
+
+    def _matching_tags(self, tags: list[str]) -> Optional[list[str]]:
+        """The tags known to the corpus; None (no filter) when none of them is"""
+        known = [tag for tag in tags if tag in self.base.corpus.by_tag]
+        return known or None
+
+    def get_construction_guidelines(self, program_type: Optional[str] = None) -> str:
+        """
+        Returns guidelines from 'principe-de-base' and 'contruction-de-programme', the latter
+        restricted to the given program type (slug, see program_type_for) when known.
+        """
         text = self._read_markdown_files("principe-de-base")
-        text += self._read_markdown_files("contruction-de-programme")
+        tags = self._matching_tags([f"programme:{program_type}"]) if program_type else None
+        text += self._read_markdown_files("contruction-de-programme", tags)
         return text
 
     def get_muscle_group_info(self, muscle_groups: List[str]) -> str:
         """
-        Returns info for specific exercises/muscle groups.
-        Naive implementation: reads all files in 'exercices' and lets LLM filter/use relevance.
-        Optimized: could match filenames to muscle groups.
+        Returns the exercise guidance for the given muscle groups (Exercise.muscle_group values),
+        all of it when none is given or none has guidance.
         """
-        # For prototype simplicity, we read all exercise guidance as "Expert Reference"
-        return self._read_markdown_files("exercices")
-                
+        tags = self._matching_tags([f"muscle:{group}" for group in muscle_groups])
+        return self._read_markdown_files("exercices", tags)
+
     def get_profile_adaptation(self, profile_type: str) -> str:
-        # e.g. read "adaptation-au-profil"
-        return self._read_markdown_files("adaptation-au-profil")
+        """Sections of 'adaptation-au-profil' for that profile (slug, e.g. "ectomorphe"), else all"""
+        tags = self._matching_tags([f"adaptation:{profile_type}"]) if profile_type else None
+        return self._read_markdown_files("adaptation-au-profil", tags)
@@ -0,0 +1,132 @@
+"""
+Prebuilt knowledge bundle (app/scripts/build_knowledge_bundle.py)
+
+One versioned file holding what every process would otherwise rebuild at startup:
+the parsed markdown corpus, the knowledge_items used by the lexical fallback and their
+embeddings as a float32 matrix. The matrix is memory-mapped read-only, so all the
+processes of a node share the same pages.
+
+Layout: MAGIC, header length (uint64, little endian), JSON header, zero padding up to
+MATRIX_ALIGNMENT, then the rows x dimensions float32 matrix (C order).
+"""
+
+import hashlib
+import json
+import os
+import struct
+from typing import Optional, Sequence
+
+import numpy as np
+
+from app.schemas.knowledge import KnowledgeHit
+from app.services.knowledge import KnowledgeCorpus, MarkdownDocument
+from app.services.knowledge_sections import KnowledgeSection
+
+MAGIC = b"FBKBUNDLE\n"
+# 2: documents without their mtime
+FORMAT_VERSION = 2
+MATRIX_ALIGNMENT = 64
+
+
+def _document_row(doc: MarkdownDocument) -> dict:
+    # The mtime is the build machine's: the content digest tells whether a file changed since
+    return doc.model_dump(exclude={"mtime_ns"})
+
+
+def _section_row(section: KnowledgeSection) -> dict:
+    return {**section.model_dump(), "tags": sorted(section.tags)}
+
+
+def _item_row(item: KnowledgeHit) -> dict:
+    return item.model_dump(mode="json", exclude={"score", "embedding"})
+
+
+def write_bundle(path: str, corpus: KnowledgeCorpus, items: Sequence[KnowledgeHit],
+                 embeddings: np.ndarray, knowledge_version: Optional[str]) -> str:
+    """
+    Write the bundle atomically (processes that mapped the previous file keep reading it).
+    Row i of `embeddings` is the vector of items[i]. Returns the bundle version.
+    """
+    matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+    if matrix.ndim != 2 or matrix.shape[0] != len(items):
+        raise ValueError(f"Expected one embedding row per item, got {matrix.shape} for {len(items)} items")
+
+    header = {
+        "format": FORMAT_VERSION,
+        "knowledge_version": knowledge_version,
+        "documents": [_document_row(doc) for doc in corpus.documents],
+        "sections": [_section_row(section) for section in corpus.sections],
+        "items": [_item_row(item) for item in items],
+        "rows": matrix.shape[0],
+        "dimensions": matrix.shape[1],
+    }
+    content = json.dumps(header, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    digest = hashlib.sha256(content)
+    digest.update(matrix.tobytes())
+    header["version"] = digest.hexdigest()[:16]
+
+    encoded = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    prefix_length = len(MAGIC) + 8 + len(encoded)
+    padding = -prefix_length % MATRIX_ALIGNMENT
+
+    tmp_path = f"{path}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(encoded)))
+        f.write(encoded)
+        f.write(b"\0" * padding)
+        f.write(matrix.tobytes())
+    os.replace(tmp_path, path)
+    return header["version"]
+
+
+class KnowledgeBundle:
+    """A bundle file opened read-only; `embeddings` is a np.memmap"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a knowledge bundle")
+            (length,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(length).decode("utf-8"))
+        if header.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported knowledge bundle format {header.get('format')}")
+
+        self.path = path
+        self.version: str = header["version"]
+        # catalog_versions stamp of knowledge_items when the bundle was built
+        self.knowledge_version: Optional[str] = header["knowledge_version"]
+        self._header = header
+
+        offset = len(MAGIC) + 8 + length
+        offset += -offset % MATRIX_ALIGNMENT
+        shape = (header["rows"], header["dimensions"])
+        self.embeddings = (
+            np.memmap(path, dtype=np.float32, mode="r", offset=offset, shape=shape)
+            if header["rows"] else np.zeros(shape, dtype=np.float32)
+        )
+
+    def corpus(self) -> KnowledgeCorpus:
+        """The markdown corpus as parsed by the build (no file read, no parsing)"""
+        return KnowledgeCorpus.build(
+            [MarkdownDocument(**row) for row in self._header["documents"]],
+            sections=[
+                KnowledgeSection(**{**row, "tags": frozenset(row["tags"])}) for row in self._header["sections"]
+            ],
+        )
+
+    def items(self) -> list[KnowledgeHit]:
+        """knowledge_items rows, in embedding matrix order"""
+        return [KnowledgeHit(**row) for row in self._header["items"]]
+
+
+def open_bundle(path: Optional[str]) -> Optional[KnowledgeBundle]:
+    """The bundle at `path`, or None when there is none (or it cannot be read)"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        return KnowledgeBundle(path)
+    except Exception as e:
+        print(f"Knowledge bundle {path} ignored: {e}")
+        return None
@@ -0,0 +1,118 @@
+"""
+Section-level parsing of the expert markdown corpus
+
+Each file is split into sections (the text under the H1, then one section per H2, H3 kept
+inside their H2) and every section is tagged from the file's front matter:
+- "<type>:<slug>", e.g. "programme:push-pull-legs", "technique:supersets", "exercice:biceps"
+- "muscle:<group>" for exercise files, with the Exercise.muscle_group values
+- the front matter "tags" as they are
+"""
+
+import json
+import os
+import re
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict
+
+# Exercise file slug -> Exercise.muscle_group values it covers
+EXERCISE_MUSCLE_GROUPS = {
+    "biceps": ("biceps",),
+    "triceps": ("triceps",),
+    "avant-bras": ("avant-bras",),
+    "dos": ("dos", "trapèzes"),
+    "pectoraux": ("pectoraux",),
+    "jambes": ("quadriceps", "ischio-jambiers", "fessiers", "mollets", "adducteurs", "abducteurs"),
+    "abdos": ("abdominaux",),
+    "gainage": ("abdominaux",),
+}
+
+# Link lists to the other files: nothing for the LLM
+SKIPPED_HEADINGS = ("Pour aller plus loin",)
+
+_FRONT_MATTER = re.compile(r"\A---\s*\n(.*?)\n---\s*\n", re.DOTALL)
+_HEADING = re.compile(r"^(#{1,2})\s+(.+?)\s*$", re.MULTILINE)
+
+
+class KnowledgeSection(BaseModel):
+    """An H1 introduction or an H2 section of a markdown file, with the tags of its file"""
+    directory: str
+    document: str  # File name
+    title: str  # H1 of the file
+    heading: str  # H2, empty for the text under the H1
+    text: str  # Markdown of the section, heading line included
+    tags: frozenset[str]
+
+    model_config = ConfigDict(frozen=True)
+
+
+def parse_front_matter(text: str) -> tuple[dict, str]:
+    """
+    Front matter fields and the remaining markdown. Values are JSON-like
+    ("strings", [lists], numbers); anything else is kept as the raw string.
+    """
+    match = _FRONT_MATTER.match(text)
+    if not match:
+        return {}, text
+    fields = {}
+    for line in match.group(1).splitlines():
+        key, sep, value = line.partition(":")
+        if not sep:
+            continue
+        value = value.strip()
+        try:
+            fields[key.strip()] = json.loads(value)
+        except ValueError:
+            fields[key.strip()] = value
+    return fields, text[match.end():]
+
+
+def document_tags(directory: str, name: str, front_matter: dict) -> frozenset[str]:
+    slug = front_matter.get("slug") or re.sub(r"^\d+_", "", os.path.splitext(name)[0])
+    doc_type = front_matter.get("type") or directory
+    tags = {f"{doc_type}:{slug}"}
+    tags.update(f"muscle:{group}" for group in EXERCISE_MUSCLE_GROUPS.get(slug, ()) if doc_type == "exercice")
+    declared = front_matter.get("tags")
+    if isinstance(declared, list):
+        tags.update(str(tag).lower() for tag in declared)
+    return frozenset(tags)
+
+
+def parse_sections(directory: str, name: str, text: str) -> list[KnowledgeSection]:
+    front_matter, body = parse_front_matter(text)
+    tags = document_tags(directory, name, front_matter)
+    title = front_matter.get("titre") or name
+
+    sections = []
+    headings = list(_HEADING.finditer(body))
+    starts = [match.start() for match in headings] + [len(body)]
+    for match, end in zip(headings, starts[1:]):
+        level, heading = len(match.group(1)), match.group(2)
+        if level == 1:
+            title = heading
+        content = body[match.start():end].strip()
+        if heading in SKIPPED_HEADINGS or not content:
+            continue
+        sections.append(KnowledgeSection(
+            directory=directory,
+            document=name,
+            title=title,
+            heading=heading if level == 2 else "",
+            text=content,
+            tags=tags,
+        ))
+    if not headings and body.strip():
+        sections.append(KnowledgeSection(
+            directory=directory, document=name, title=title, heading="", text=body.strip(), tags=tags,
+        ))
+    return sections
+
+
+def program_type_for(days_per_week: Optional[int], experience_level: Optional[str]) -> str:
+    """Slug of the program construction file matching the training frequency"""
+    days = days_per_week or 3
+    if days <= 3:
+        return "full-body-debutant" if experience_level in (None, "beginner") else "full-body-intermediaire"
+    if days == 4:
+        return "split-haut-bas"
+    return "push-pull-legs"
@@ -0,0 +1,87 @@
+import asyncio
+import re
+import time
+from types import MappingProxyType
+from typing import Iterable, Mapping, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+# Unit number at the end of a machine ID: "DC_BENCH_001" is a unit of "DC_BENCH"
+_UNIT_SUFFIX = re.compile(r"_\d+$")
+
+
+def machine_type_of(machine_id: str) -> str:
+    """Machine type of a Data API machine ID (the ID itself when it has no unit number)"""
+    return _UNIT_SUFFIX.sub("", machine_id)
+
+
+class MachineRegistry:
+    """
+    Process-wide copy of the Data API machine list, indexed by machine type.
+
+    The list is fetched again once older than `ttl_seconds` (one request at a time, the
+    other callers wait for it). Types are matched exactly, so "DC_BENCH" never picks the
+    units of "DC_BENCH_INCLINE". If a refresh fails, the previous list keeps being served.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.machines: tuple[str, ...] = ()
+        self.by_type: Mapping[str, tuple[str, ...]] = MappingProxyType({})
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    async def machines_of_type(self, machine_type_id: str, client: httpx.AsyncClient) -> tuple[str, ...]:
+        """Units of a machine type, no request while the list is fresh"""
+        await self._ensure_fresh(client)
+        return self.by_type.get(machine_type_id, ())
+
+    async def machines_of_types(self, machine_type_ids: Iterable[str],
+                                client: httpx.AsyncClient) -> dict[str, tuple[str, ...]]:
+        """Units of several machine types, from one look at the list"""
+        await self._ensure_fresh(client)
+        by_type = self.by_type
+        return {machine_type_id: by_type.get(machine_type_id, ()) for machine_type_id in machine_type_ids}
+
+    async def all_machines(self, client: httpx.AsyncClient) -> tuple[str, ...]:
+        await self._ensure_fresh(client)
+        return self.machines
+
+    async def _ensure_fresh(self, client: httpx.AsyncClient) -> None:
+        if self.is_fresh():
+            return
+        async with self._lock:
+            if self.is_fresh():
+                # Refreshed by the caller we waited for
+                return
+            try:
+                await self.refresh(client)
+            except Exception:
+                if self._loaded_at is None:
+                    raise
+                print("⚠️ IoT machine list refresh failed, keeping the previous list")
+                # Retry on the next TTL, not on every call
+                self._loaded_at = time.monotonic()
+
+    async def refresh(self, client: httpx.AsyncClient) -> None:
+        resp = await client.get("/api/machine/list", timeout=5.0)
+        resp.raise_for_status()
+        self.load(resp.json().get("machines", []))
+        metrics.inc("iot_machine_list_refreshes_total", help_text="Machine list downloads from the Data API")
+
+    def load(self, machine_ids: list[str]) -> None:
+        by_type: dict[str, list[str]] = {}
+        for machine_id in machine_ids:
+            by_type.setdefault(machine_type_of(machine_id), []).append(machine_id)
+        self.machines = tuple(machine_ids)
+        self.by_type = MappingProxyType({machine_type: tuple(units) for machine_type, units in by_type.items()})
+        self._loaded_at = time.monotonic()
+
+
+machine_registry = MachineRegistry(ttl_seconds=settings.IOT_MACHINE_LIST_TTL_SECONDS)
@@ -1,13 +1,19 @@
+from typing import Optional
 from uuid import UUID
 from fastapi import HTTPException
 
+from app.core.config import settings
+from app.core.logging import app_logger
+from app.repositories.generation_job import GenerationJobRepository
 from app.repositories.profile import ProfileRepository
 from app.schemas.profile import UserProfileCreate, UserProfileUpdate, UserProfileResponse
 
 
 class ProfileService:
-    def __init__(self, repo: ProfileRepository):
+    def __init__(self, repo: ProfileRepository, job_repo: Optional[GenerationJobRepository] = None):
         self.repo = repo
+        # Speculative program generation (skipped without it)
+        self.job_repo = job_repo
 
     async def get_current_profile(self, user_id: UUID) -> UserProfileResponse:
         profile = await self.repo.get_by_user_id(user_id)
@@ -25,7 +31,26 @@ class ProfileService:
             onboarding=data.onboarding_data.model_dump(),
             stats=data.current_stats.model_dump()
         )
-        return profile
+        # Read before the speculation: a rollback on its failure would expire the row
+        response = UserProfileResponse.model_validate(profile)
+        await self._speculate_program(response)
+        return response
+
+    async def _speculate_program(self, profile) -> None:
+        """
+        The first thing a new user does is generate a program: start it now, in the
+        background, for this profile version. POST /program/generate then takes it over.
+        """
+        if self.job_repo is None or not settings.SPECULATIVE_GENERATION_ENABLED:
+            return
+        try:
+            await self.job_repo.enqueue_speculative(
+                profile.user_id, settings.SPECULATIVE_GENERATION_METHOD, profile.updated_at
+            )
+        except Exception as e:
+            # Only an optimization: onboarding succeeded anyway
+            await self.job_repo.session.rollback()
+            app_logger.warning(f"Speculative program generation not queued for user {profile.user_id}: {e}")
 
     async def update_profile(self, user_id: UUID, data: UserProfileUpdate) -> UserProfileResponse:
         updated = await self.repo.update(
@@ -35,4 +60,13 @@ class ProfileService:
         )
         if not updated:
             raise HTTPException(status_code=404, detail="Profile not found")
-        return updated
+        response = UserProfileResponse.model_validate(updated)
+        if self.job_repo is not None and (data.onboarding_data or data.current_stats):
+            # Generated for the previous profile version: no longer what the user would get
+            try:
+                await self.job_repo.cancel_speculative(user_id)
+            except Exception as e:
+                # The update is committed; at worst POST /program/generate cancels it later
+                await self.job_repo.session.rollback()
+                app_logger.warning(f"Speculative generation of user {user_id} not cancelled: {e}")
+        return response
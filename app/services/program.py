@@ -1,3 +1,4 @@
+import asyncio
 from uuid import UUID
 from datetime import datetime
 from typing import List
@@ -6,11 +7,17 @@ from fastapi import HTTPException
 
 from app.repositories.program import ProgramRepository
 from app.repositories.profile import ProfileRepository
-from app.models.domain import Program, Session
+from app.models.domain import Program
 
 
 from app.repositories.dictionary import DictionaryRepository
 from app.services.program_generator import ProgramGenerator
+from app.services.knowledge import KnowledgeService
+from app.services.knowledge_sections import program_type_for
+from app.services.rag import KnowledgeRetriever
+from app.services.template_catalog import template_catalog
+from app.services.templates import get_template
+from app.core.llm import generate_program_narrative
 
 class ProgramService:
     def __init__(self, 
@@ -23,26 +30,40 @@ class ProgramService:
         self.dictionary_repo = dictionary_repo
         self.program_generator = program_generator
 
-    async def generate_program(self, user_id: UUID, method: str = "template") -> Program:
+    async def generate_program(self, user_id: UUID, method: str = "template", status: str = "active") -> Program:
+        """
+        status="pending" writes the program without touching the active one
+        (speculative generation, see GenerationJobRepository.finish_speculative).
+        """
         # 1. Get User Profile
         profile = await self.profile_repo.get_by_user_id(user_id)
         if not profile:
             raise HTTPException(status_code=400, detail="User profile not found. Complete onboarding first.")
 
-        # 2. Archive existing active program
-        await self.program_repo.archive_current_programs(user_id)
+        # Only the construction guidelines of the program type matching the user's frequency
+        program_type = program_type_for(
+            profile.onboarding_data.get("days_per_week"), profile.onboarding_data.get("experience_level")
+        )
 
-        # 3. GENERATION LOGIC
+        # 2. GENERATION LOGIC
+        # The current program is archived by create_program, in the same transaction as the
+        # insert: it stays active while generating and survives a failed generation
         if method == "smart":
             # --- FULL AI (RAG) ---
             print("🤖 Using SMART (RAG) Generation Mode")
-            
+
+            # No DB connection held during the LLM call
+            await self._release_connection()
+
             # A. Architect Phase
             skeleton = await self.program_generator.generate_program_structure({
                 "goal": profile.onboarding_data.get("goal"),
                 "experience_level": profile.onboarding_data.get("experience_level"),
+                "days_per_week": profile.onboarding_data.get("days_per_week"),
+                "session_duration_minutes": profile.onboarding_data.get("session_duration_minutes"),
+                "injuries": profile.onboarding_data.get("injuries", []),
                 "current_stats": profile.current_stats
-            })
+            }, guidelines=self._load_expert_context(program_type))
             
             # B. Librarian Phase
             sessions = await self.program_generator.realize_program(skeleton)
@@ -54,37 +75,36 @@ class ProgramService:
                 user_id=user_id,
                 name=program_name,
                 goal=profile.onboarding_data.get("goal"),
-                status="active",
+                status=status,
                 start_date=datetime.now()
             )
             
             return await self.program_repo.create_program(new_program, sessions)
-            
-        else:
-            # --- HYBRID (TEMPLATE) ---
-            print("📜 Using CLASSIC (Template) Generation Mode")
-            # A. Select Template
-            goal = profile.onboarding_data.get("goal", "general_fitness")
+
+        # --- HYBRID (TEMPLATE) ---
+        print("📜 Using CLASSIC (Template) Generation Mode")
+        # A. Select Template
+        goal = profile.onboarding_data.get("goal", "general_fitness")
         exp_level = profile.onboarding_data.get("experience_level", "beginner")
-        
-        from app.services.templates import get_template
         template = get_template(goal, exp_level)
-        
-        # B. Get Knowledge Context
-        from app.services.knowledge import KnowledgeService
-        knowledge_service = KnowledgeService()
-        expert_context = knowledge_service.get_construction_guidelines()
-        expert_context += "\n" + knowledge_service.get_muscle_group_info([])
-        
-        # C. LLM Enrichment (Textualization)
-        from app.core.llm import generate_program_narrative
-        narrative = await generate_program_narrative(template, {
-            "goal": goal,
-            "experience_level": exp_level,
-            "current_stats": profile.current_stats
-        }, context_text=expert_context)
-
-        # D. Construct Objects
+        # Exercise guidance for the muscle groups the template trains
+        expert_context = self._load_expert_context(program_type, muscle_groups=list(dict.fromkeys(
+            ex.muscle_group for sess_tmpl in template.sessions for ex in sess_tmpl.exercises
+        )))
+
+        # B. LLM Enrichment (Textualization), overlapped with the template catalog check
+        # (compiled at startup: exercise IDs and plans are already resolved)
+        narrative, _ = await asyncio.gather(
+            generate_program_narrative(template, {
+                "goal": goal,
+                "experience_level": exp_level,
+                "current_stats": profile.current_stats
+            }, context_text=expert_context),
+            self._sync_template_catalog(),
+        )
+        compiled = template_catalog.get(goal, exp_level)
+
+        # C. Construct Objects
         program_name = narrative.get("program_name", template.name_template)
         
         # Create Program Object
@@ -92,39 +112,50 @@ class ProgramService:
             user_id=user_id,
             name=program_name,
             goal=goal,
-            status="active",
+            status=status,
             start_date=datetime.now()
         )
 
-        # Create Sessions from Template
-        sessions = []
-        for i, sess_tmpl in enumerate(template.sessions):
-            exercises_plan = []
-            for ex in sess_tmpl.exercises:
-                exercise_obj = await self.dictionary_repo.get_exercise_by_name(ex.default_exercise)
-                exercise_id = exercise_obj.id if exercise_obj else None
-                
-                exercises_plan.append({
-                    "exercise_id": str(exercise_id) if exercise_id else None,
-                    "exercise_name": ex.default_exercise,
-                    "target_sets": ex.sets,
-                    "target_reps": ex.reps,
-                    "rest_seconds": ex.rest,
-                    "notes": ex.notes
-                })
-
-            s = Session(
-                name=sess_tmpl.name_template,
-                order_index=i + 1,
-                exercises_plan=exercises_plan
-            )
-            sessions.append(s)
+        # Create Sessions from Template (copies of the precomputed plans, no query)
+        sessions = compiled.build_sessions()
+
+        return await self.program_repo.create_program(new_program, sessions)
+
+    @staticmethod
+    def _load_expert_context(program_type: str, muscle_groups: list[str] | None = None) -> str:
+        """Knowledge given to the LLM (in-memory markdown corpus, no I/O)"""
+        knowledge_service = KnowledgeService()
+        expert_context = knowledge_service.get_construction_guidelines(program_type)
+        if muscle_groups is not None:
+            expert_context += "\n" + knowledge_service.get_muscle_group_info(muscle_groups)
+        return expert_context
+
+    async def _sync_template_catalog(self) -> None:
+        await template_catalog.sync(self.dictionary_repo.session)
+        # Done with the DB until the program is written: give the connection back
+        await self._release_connection()
+
+    async def _release_connection(self) -> None:
+        """
+        End the read-only transaction so the pooled connection is returned while the LLM
+        runs (loaded objects stay usable: sessions do not expire on commit).
+        """
+        await self.profile_repo.session.commit()
 
-        created_program = await self.program_repo.create_program(new_program, sessions)
-        return created_program
-    
     async def get_current_program(self, user_id: UUID) -> Program:
         program = await self.program_repo.get_active_program(user_id)
         if not program:
             raise HTTPException(status_code=404, detail="No active program found.")
         return program
+
+
+def build_program_service(session) -> ProgramService:
+    """ProgramService and its dependencies on one DB session (API requests and the generation worker)"""
+    # RAG Dependencies
+    knowledge_service = KnowledgeService()
+    retriever = KnowledgeRetriever(session)
+    generator = ProgramGenerator(knowledge_service, retriever)
+
+    return ProgramService(
+        ProgramRepository(session), ProfileRepository(session), DictionaryRepository(session), generator
+    )
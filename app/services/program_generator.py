@@ -1,12 +1,31 @@
 from uuid import UUID
+import asyncio
 import json
+import time
 from datetime import datetime
 
+import numpy as np
+
+from app.core.config import settings
+from app.core.logging import app_logger
+from app.core.metrics import metrics
+from app.core.user_db import async_session_factory
 from app.models.domain import Program, Session
 from app.services.knowledge import KnowledgeService
+from app.services.knowledge_sections import program_type_for
 from app.services.rag import KnowledgeRetriever
+from app.services.skeleton_cache import profile_fingerprint, skeleton_cache
 from app.core.llm import generate_json
+from app.schemas.knowledge import KnowledgeHit
 from app.schemas.profile import PhysicsStats
+from app.utils.vectors import max_marginal_relevance, normalize_rows
+
+# Values of Exercise.muscle_group (mirrored in KnowledgeItem.metadata_info["muscle"])
+MUSCLE_GROUPS = (
+    "quadriceps", "ischio-jambiers", "fessiers", "mollets", "adducteurs", "abducteurs",
+    "pectoraux", "dos", "trapèzes", "épaules", "biceps", "triceps", "avant-bras",
+    "abdominaux", "fléchisseurs hanche",
+)
 
 class ProgramGenerator:
     """
@@ -16,17 +35,35 @@ class ProgramGenerator:
     1. Architect (LLM): Designs the high-level skeleton and semantic queries.
     2. Librarian (RAG): Resolves queries to concrete Database Entities.
     """
-    def __init__(self, knowledge_service: KnowledgeService, retriever: KnowledgeRetriever):
+    def __init__(self, knowledge_service: KnowledgeService, retriever: KnowledgeRetriever,
+                 session_factory=async_session_factory):
         self.knowledge_service = knowledge_service
         self.retriever = retriever
+        # Parallel Librarian lookups each get their own session (one connection per query in flight)
+        self.session_factory = session_factory
+        # Seconds spent in each stage of the last realize_program call
+        self.last_timings: dict[str, float] = {}
 
-    async def generate_program_structure(self, profile_data: dict) -> dict:
+    async def generate_program_structure(self, profile_data: dict, guidelines: str | None = None) -> dict:
         """
         Step 1: The Architect.
-        Generates the skeleton of the program based on profile and guidelines.
+        Generates the skeleton of the program based on profile and guidelines
+        (read from the knowledge base when not given).
+
+        Skeletons are shared between profiles with the same fingerprint (goal, level,
+        days per week, duration, injuries, stat bands): see skeleton_cache.py.
         """
+        fingerprint = profile_fingerprint(profile_data)
+        if settings.SKELETON_CACHE_ENABLED:
+            cached = skeleton_cache.get(fingerprint)
+            if cached is not None:
+                return cached
+
         # 1. Fetch Context
-        guidelines = self.knowledge_service.get_construction_guidelines()
+        if guidelines is None:
+            guidelines = self.knowledge_service.get_construction_guidelines(
+                program_type_for(profile_data.get("days_per_week"), profile_data.get("experience_level"))
+            )
         
         # 2. Build Prompt
         prompt = f"""
@@ -37,6 +74,9 @@ class ProgramGenerator:
         - Goal: {profile_data.get('goal')}
         - Experience: {profile_data.get('experience_level')}
         - Stats: {profile_data.get('current_stats')}
+        - Sessions per week: {profile_data.get('days_per_week')} (one session each in "sessions")
+        - Session duration: {profile_data.get('session_duration_minutes')} minutes
+        - Injuries to work around: {profile_data.get('injuries') or 'None'}
         - Valid Equipment: Gym (All machines allowed)
         
         ### EXPERT GUIDELINES (Use these rules!)
@@ -59,6 +99,7 @@ class ProgramGenerator:
                         {{
                             "search_query": "Semantic query to find the best exercise",
                             "muscle_target": "Target muscle",
+                            "muscle_group": "One of {list(MUSCLE_GROUPS)}",
                             "sets": 3,
                             "reps": "8-12",
                             "rest": 90,
@@ -70,46 +111,182 @@ class ProgramGenerator:
         }}
         """
         
-        return await generate_json(prompt)
+        skeleton = await generate_json(prompt)
+        if settings.SKELETON_CACHE_ENABLED:
+            skeleton_cache.put(fingerprint, skeleton)
+        return skeleton
 
     async def realize_program(self, skeleton: dict) -> list[Session]:
         """
         Step 2: The Librarian.
         Converts the skeleton queries into real DB Session objects with linked Exercise IDs.
+
+        Candidate pools for all the queries of the program are fetched in one round trip,
+        then exercises are assigned in memory by maximal marginal relevance: a session never
+        gets the same exercise twice, and exercises similar to those already picked elsewhere
+        in the program are penalized, so similar queries spread over different exercises.
+
+        Stages: dedupe the queries, retrieve the pools (chunks of LIBRARIAN_QUERIES_PER_TASK
+        queries, up to LIBRARIAN_CONCURRENCY in parallel), assign, reassemble in skeleton order.
         """
-        sessions = []
-        
+        timings = {}
+        start = time.perf_counter()
+
+        # Distinct (query, muscle group) pairs share their candidate pool
+        slots = []
+        pool_keys = {}
         for i, session_plan in enumerate(skeleton.get("sessions", [])):
-            exercises_plan = []
-            
             for ex_plan in session_plan.get("exercises", []):
-                query = ex_plan.get("search_query")
-                
-                # RAG Search
-                candidates = await self.retriever.search(query, limit=1, source_type="exercise")
-                
-                exercise_id = None
-                exercise_name = query # Fallback if not found
-                
-                if candidates:
-                    best_match = candidates[0]
-                    exercise_id = str(best_match.source_id)
-                    exercise_name = best_match.metadata_info.get("name", query)
-                    # print(f"Mapped '{query}' -> '{exercise_name}'")
-                
-                exercises_plan.append({
-                    "exercise_id": exercise_id,
-                    "exercise_name": exercise_name,
-                    "target_sets": ex_plan.get("sets"),
-                    "target_reps": ex_plan.get("reps"),
-                    "rest_seconds": ex_plan.get("rest"),
-                    "notes": ex_plan.get("notes")
-                })
-                
-            sessions.append(Session(
+                muscle_group = ex_plan.get("muscle_group")
+                key = (ex_plan.get("search_query") or "", muscle_group if muscle_group in MUSCLE_GROUPS else None)
+                slots.append((i, ex_plan, pool_keys.setdefault(key, len(pool_keys))))
+
+        timings["dedupe"] = self._lap(start)
+
+        start = time.perf_counter()
+        pools = await self._candidate_pools(list(pool_keys))
+        timings["retrieve"] = self._lap(start)
+
+        start = time.perf_counter()
+        picks = self._assign_exercises(slots, pools)
+        timings["assign"] = self._lap(start)
+
+        start = time.perf_counter()
+        sessions_plans = {}
+        for (i, ex_plan, _), best_match in zip(slots, picks, strict=True):
+            query = ex_plan.get("search_query")
+            exercise_id = None
+            exercise_name = query # Fallback if not found
+
+            if best_match:
+                exercise_id = str(best_match.source_id)
+                exercise_name = best_match.metadata_info.get("name", query)
+
+            sessions_plans.setdefault(i, []).append({
+                "exercise_id": exercise_id,
+                "exercise_name": exercise_name,
+                "target_sets": ex_plan.get("sets"),
+                "target_reps": ex_plan.get("reps"),
+                "rest_seconds": ex_plan.get("rest"),
+                "notes": ex_plan.get("notes")
+            })
+
+        sessions = [
+            Session(
                 name=session_plan.get("name"),
                 order_index=i+1,
-                exercises_plan=exercises_plan
-            ))
-            
+                exercises_plan=sessions_plans.get(i, [])
+            )
+            for i, session_plan in enumerate(skeleton.get("sessions", []))
+        ]
+        timings["assemble"] = self._lap(start)
+
+        self.last_timings = timings
+        for stage, seconds in timings.items():
+            metrics.inc(f"librarian_{stage}_seconds_total", seconds,
+                        help_text=f"Time spent in the '{stage}' stage of program realization")
+        app_logger.info(
+            f"Realized {len(slots)} exercises from {len(pool_keys)} distinct queries: "
+            + ", ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in timings.items())
+        )
         return sessions
+
+    @staticmethod
+    def _lap(start: float) -> float:
+        return time.perf_counter() - start
+
+    async def _candidate_pools(self, keys: list[tuple[str, str | None]]) -> list[list[KnowledgeHit]]:
+        """
+        Hybrid RAG candidates (exact names in the query win) for each (query, muscle group),
+        restricted to the muscle group when the Architect gave a known one.
+        """
+        pools = [[] for _ in keys]
+        active = [i for i, (query, _) in enumerate(keys) if query]
+        if not active:
+            return pools
+
+        found = await self._search_pools(
+            [keys[i][0] for i in active],
+            [{"muscle": keys[i][1]} if keys[i][1] else None for i in active],
+        )
+        for i, pool in zip(active, found, strict=True):
+            pools[i] = pool
+
+        # Nothing indexed for that muscle group: widen these queries only
+        widen = [i for i in active if not pools[i] and keys[i][1]]
+        if widen:
+            found = await self._search_pools([keys[i][0] for i in widen], [None] * len(widen))
+            for i, pool in zip(widen, found, strict=True):
+                pools[i] = pool
+        return pools
+
+    async def _search_pools(self, queries: list[str], filters: list[dict | None]) -> list[list[KnowledgeHit]]:
+        """
+        search_pools over chunks of the queries with bounded concurrency; pools come back
+        in query order. A single chunk runs on the request's own retriever.
+        """
+        size = max(settings.LIBRARIAN_QUERIES_PER_TASK, 1)
+        chunks = [range(start, min(start + size, len(queries))) for start in range(0, len(queries), size)]
+        if len(chunks) <= 1:
+            return await self.retriever.search_pools(
+                queries, pool_size=settings.LIBRARIAN_POOL_SIZE, source_type="exercise",
+                filters=filters, mode="hybrid"
+            )
+
+        semaphore = asyncio.Semaphore(settings.LIBRARIAN_CONCURRENCY)
+
+        async def resolve(chunk: range) -> list[list[KnowledgeHit]]:
+            async with semaphore:
+                async with self.session_factory() as session:
+                    retriever = KnowledgeRetriever(session, storage=self.retriever.storage)
+                    return await retriever.search_pools(
+                        [queries[i] for i in chunk], pool_size=settings.LIBRARIAN_POOL_SIZE,
+                        source_type="exercise", filters=[filters[i] for i in chunk], mode="hybrid"
+                    )
+
+        results = await asyncio.gather(*(resolve(chunk) for chunk in chunks))
+        return [pool for chunk_pools in results for pool in chunk_pools]
+
+    @staticmethod
+    def _assign_exercises(slots: list[tuple], pools: list[list[KnowledgeHit]]) -> list[KnowledgeHit | None]:
+        """
+        Greedy MMR assignment, in program order, on the candidate vectors of the pools.
+        Relevance is the retrieval score scaled to the best candidate of its pool.
+        """
+        trade_off = settings.LIBRARIAN_MMR_LAMBDA
+        # Pools from the lexical fallback have no vectors: one-hot per exercise instead,
+        # so only exact repeats are penalized
+        exercise_ids = list(dict.fromkeys(hit.source_id for pool in pools for hit in pool))
+        one_hot = {exercise_id: np.eye(1, len(exercise_ids), k)[0] for k, exercise_id in enumerate(exercise_ids)}
+        use_one_hot = any(hit.embedding is None for pool in pools for hit in pool)
+
+        prepared = []
+        for pool in pools:
+            if not pool:
+                prepared.append(None)
+                continue
+            scores = np.array([hit.score or 0.0 for hit in pool], dtype=np.float32)
+            top = scores.max()
+            vectors = [one_hot[hit.source_id] if use_one_hot else hit.embedding for hit in pool]
+            prepared.append((scores / top if top > 0 else scores, normalize_rows(vectors)))
+
+        picks = []
+        selected = []  # Vectors of the exercises picked so far, whole program
+        used = set()  # (session index, exercise id)
+        for session_index, _, pool_index in slots:
+            if prepared[pool_index] is None:
+                picks.append(None)
+                continue
+            relevance, vectors = prepared[pool_index]
+            pool = pools[pool_index]
+            allowed = np.array([(session_index, hit.source_id) not in used for hit in pool])
+            best = max_marginal_relevance(
+                relevance, vectors, np.asarray(selected, dtype=np.float32), trade_off, allowed
+            )
+            if best is None:
+                picks.append(None)
+                continue
+            picks.append(pool[best])
+            selected.append(vectors[best])
+            used.add((session_index, pool[best].source_id))
+        return picks
@@ -1,30 +1,344 @@
+import asyncio
+import re
 from typing import List, Optional
-from sqlalchemy import select, text
-from app.models.domain import KnowledgeItem
-from app.core.llm import get_text_embedding
-from app.repositories.dictionary import DictionaryRepository # Maybe useful later?
+from sqlalchemy import bindparam, func, literal, select, union_all
+from sqlalchemy.orm import undefer
+from app.models.domain import KnowledgeItem, KNOWLEDGE_SOURCE_TYPES
+from app.core.config import settings
+from app.core.llm import get_text_embedding, get_text_embeddings
+from app.core.metrics import metrics
+from app.schemas.knowledge import KnowledgeHit
+from app.services.rag_cache import search_cache
+from app.services.rag_lexical import lexical_fallback
+from app.utils.vectors import binary_quantize
+
+# Keys of KnowledgeItem.metadata_info that can be filtered on (written by ingest_knowledge.py)
+FILTERABLE_METADATA = ("muscle", "machine_type", "level")
+
+SEARCH_MODES = ("vector", "hybrid")
+
+# Column scanned by the first pass of vector search (see RAG_VECTOR_STORAGE)
+VECTOR_STORAGES = ("full", "halfvec", "binary")
+
+# pgvector >= 0.8 setting, see RAG_HNSW_ITERATIVE_SCAN
+HNSW_ITERATIVE_SCAN = "hnsw.iterative_scan"
+
 
 class KnowledgeRetriever:
-    def __init__(self, session):
+    def __init__(self, session, storage: Optional[str] = None, use_cache: bool = True):
         self.session = session
+        self.storage = storage or settings.RAG_VECTOR_STORAGE
+        if self.storage not in VECTOR_STORAGES:
+            raise ValueError(f"Unknown vector storage: {self.storage}")
+        self.cache = search_cache if use_cache and settings.RAG_CACHE_ENABLED else None
 
-    async def search(self, query: str, limit: int = 5, source_type: Optional[str] = None) -> List[KnowledgeItem]:
+    async def search(
+        self,
+        query: str,
+        limit: int = 5,
+        source_type: Optional[str] = None,
+        filters: Optional[dict] = None,
+        mode: str = "vector",
+        semantic_weight: float = 1.0,
+        lexical_weight: float = 1.0,
+    ) -> List[KnowledgeHit]:
         """
         Semantic search in the Knowledge Base.
+
+        `filters` restricts results on metadata (e.g. {"muscle": "dos", "machine_type": "CABLE"}).
+        They are applied in SQL, so the `limit` nearest items that match are returned.
+
+        `mode="hybrid"` fuses the vector ranking with a full text ranking on content_text
+        (reciprocal rank fusion), which helps queries containing exact exercise names.
+        The weights scale the contribution of each ranking for this query.
+
+        Results are cached until the knowledge base is re-ingested: a hit costs
+        neither an embedding call nor a DB query.
+
+        If the query cannot be embedded within RAG_EMBEDDING_TIMEOUT_SECONDS, results come
+        from the in-memory BM25 index (rag_lexical.py) instead of an empty list.
         """
-        # 1. Embed the query
-        query_vector = await get_text_embedding(query)
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+        filters = self._clean_filters(filters)
+
+        cache_key = None
+        if self.cache is not None:
+            await self.cache.sync_version(self.session)
+            cache_generation = self.cache.generation
+            cache_key = self.cache.make_key(
+                query, limit=limit, source_type=source_type, filters=filters, mode=mode,
+                semantic_weight=semantic_weight, lexical_weight=lexical_weight, storage=self.storage,
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        # 1. Embed the query (provider down or too slow: BM25 over the in-memory index, not cached)
+        query_vector = await self._embed(get_text_embedding(query))
         if not query_vector:
-            print("Failed to embed query.")
+            return (await self._lexical_fallback([query], limit, source_type, [filters]))[0]
+
+        hits = await self.search_by_vector(
+            query_vector, limit=limit, source_type=source_type, filters=filters,
+            lexical_query=query if mode == "hybrid" else None,
+            semantic_weight=semantic_weight, lexical_weight=lexical_weight,
+        )
+        if cache_key is not None:
+            self.cache.put(cache_key, hits, cache_generation)
+        return hits
+
+    async def search_by_vector(
+        self,
+        query_vector: List[float],
+        limit: int = 5,
+        source_type: Optional[str] = None,
+        filters: Optional[dict] = None,
+        lexical_query: Optional[str] = None,
+        semantic_weight: float = 1.0,
+        lexical_weight: float = 1.0,
+    ) -> List[KnowledgeHit]:
+        """
+        Same as `search` for an already embedded query. A `lexical_query` turns on hybrid ranking.
+        """
+        filters = self._clean_filters(filters)
+
+        # 2. Build SQL Query (Cosine Similarity, optionally fused with full text rank)
+        conditions = self._conditions(source_type, filters)
+        terms = self._lexical_terms(lexical_query) if lexical_query else []
+        ranked = self._ranked(query_vector, terms, conditions, limit, semantic_weight, lexical_weight)
+        stmt = (
+            select(KnowledgeItem, ranked.c.score)
+            .join(ranked, KnowledgeItem.id == ranked.c.id)
+            .order_by(ranked.c.score.desc())
+        )
+
+        rows = await self._execute_search(stmt, filtered=bool(filters))
+        return [self._to_hit(item, score) for item, score in rows]
+
+    async def search_pools(
+        self,
+        queries: List[str],
+        pool_size: int = 10,
+        source_type: Optional[str] = None,
+        filters: Optional[List[Optional[dict]]] = None,
+        mode: str = "vector",
+    ) -> List[List[KnowledgeHit]]:
+        """
+        Candidate pools for several queries at once: one embedding call for all of them and
+        one SQL round trip (UNION ALL of the per-query searches).
+
+        `filters`, when given, holds one filter dict (or None) per query.
+        Hits carry their `score` and `embedding` so that callers can re-rank or diversify
+        the pools in memory (no `embedding` when served by the lexical fallback).
+        Pools are not cached.
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+        if not queries:
             return []
+        filters = [self._clean_filters(f) for f in (filters or [None] * len(queries))]
+        if len(filters) != len(queries):
+            raise ValueError("One filter per query is required")
+
+        query_vectors = await self._embed(get_text_embeddings(queries))
+        if not query_vectors:
+            return await self._lexical_fallback(queries, pool_size, source_type, filters)
+
+        parts = []
+        per_query = zip(queries, query_vectors, filters, strict=True)
+        for index, (query, query_vector, query_filters) in enumerate(per_query):
+            conditions = self._conditions(source_type, query_filters)
+            terms = self._lexical_terms(query) if mode == "hybrid" else []
+            ranked = self._ranked(query_vector, terms, conditions, pool_size, 1.0, 1.0)
+            parts.append(select(literal(index).label("query_index"), ranked.c.id, ranked.c.score))
+        pools = union_all(*parts).subquery("pools")
+        stmt = (
+            select(KnowledgeItem, pools.c.query_index, pools.c.score)
+            .join(pools, KnowledgeItem.id == pools.c.id)
+            .options(undefer(KnowledgeItem.embedding))
+            .order_by(pools.c.query_index, pools.c.score.desc())
+        )
+
+        rows = await self._execute_search(stmt, filtered=any(filters))
+        hits = [[] for _ in queries]
+        for item, query_index, score in rows:
+            hits[query_index].append(self._to_hit(item, score, embedding=item.embedding))
+        return hits
 
-        # 2. Build SQL Query (Cosine Similarity)
-        stmt = select(KnowledgeItem).order_by(
-            KnowledgeItem.embedding.cosine_distance(query_vector)
-        ).limit(limit)
-        
+    @staticmethod
+    async def _embed(embedding_call):
+        """Result of an embedding coroutine, or None if it fails or exceeds RAG_EMBEDDING_TIMEOUT_SECONDS."""
+        try:
+            return await asyncio.wait_for(embedding_call, timeout=settings.RAG_EMBEDDING_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            print("Embedding timed out.")
+            return None
+
+    async def _lexical_fallback(self, queries: List[str], limit: int, source_type: Optional[str],
+                                filters: List[dict]) -> List[List[KnowledgeHit]]:
+        """BM25 over the process-wide index of knowledge_items, used when queries cannot be embedded."""
+        if source_type and source_type not in KNOWLEDGE_SOURCE_TYPES:
+            raise ValueError(f"Unknown knowledge source type: {source_type}")
+        metrics.inc("rag_lexical_fallback_total", len(queries),
+                    help_text="Searches answered by the BM25 fallback (embedding failed or timed out)")
+        await lexical_fallback.sync(self.session)
+        return [
+            lexical_fallback.search(query, limit=limit, source_type=source_type, filters=query_filters)
+            for query, query_filters in zip(queries, filters, strict=True)
+        ]
+
+    def _ranked(self, query_vector, terms: list[str], conditions: list, limit: int,
+                semantic_weight: float, lexical_weight: float):
+        """
+        Subquery (id, score) of the `limit` best items, highest score first:
+        cosine similarity, or the reciprocal rank fusion score when lexical `terms` are given.
+        """
+        if terms:
+            return self._hybrid(
+                query_vector, " | ".join(terms), conditions, limit, semantic_weight, lexical_weight
+            )
+        nearest = self._nearest(query_vector, conditions, limit)
+        return select(nearest.c.id, (1 - nearest.c.distance).label("score")).subquery()
+
+    def _nearest(self, query_vector, conditions: list, k: int):
+        """
+        Subquery (id, distance) of the k nearest items by exact cosine distance.
+
+        With a compact storage, the first pass walks the halfvec / binary index for
+        k * RAG_RERANK_FACTOR candidates, which are then re-ranked on the full vectors.
+        """
+        exact = KnowledgeItem.embedding.cosine_distance(query_vector)
+        if self.storage == "full":
+            return (
+                select(KnowledgeItem.id, exact.label("distance"))
+                .where(*conditions)
+                .order_by(exact)
+                .limit(k)
+                .subquery()
+            )
+
+        if self.storage == "halfvec":
+            first_pass = KnowledgeItem.embedding_half.cosine_distance(query_vector)
+        else:
+            first_pass = KnowledgeItem.embedding_bin.hamming_distance(binary_quantize(query_vector))
+        candidates = (
+            select(KnowledgeItem.id, KnowledgeItem.embedding)
+            .where(*conditions)
+            .order_by(first_pass)
+            .limit(k * settings.RAG_RERANK_FACTOR)
+            .subquery()
+        )
+        rerank = candidates.c.embedding.cosine_distance(query_vector)
+        return (
+            select(candidates.c.id, rerank.label("distance"))
+            .order_by(rerank)
+            .limit(k)
+            .subquery()
+        )
+
+    def _hybrid(self, query_vector, tsquery_text: str, conditions: list, limit: int,
+                semantic_weight: float, lexical_weight: float):
+        """
+        Top candidates by cosine distance and by ts_rank_cd, each ranked, full-outer-joined
+        and scored by sum(weight / (k + rank)). Equal scores go to the better semantic rank.
+        """
+        pool = max(settings.RAG_HYBRID_POOL_SIZE, limit)
+        rrf_k = settings.RAG_RRF_K
+
+        nearest = self._nearest(query_vector, conditions, pool)
+        semantic = select(
+            nearest.c.id,
+            func.row_number().over(order_by=nearest.c.distance).label("rank"),
+        ).subquery("semantic")
+
+        tsquery = func.to_tsquery("simple", tsquery_text)
+        text_rank = func.ts_rank_cd(KnowledgeItem.content_tsv, tsquery).label("text_rank")
+        matching = (
+            select(KnowledgeItem.id, text_rank)
+            .where(KnowledgeItem.content_tsv.op("@@")(tsquery), *conditions)
+            .order_by(text_rank.desc())
+            .limit(pool)
+            .subquery()
+        )
+        lexical = select(
+            matching.c.id,
+            func.row_number().over(order_by=matching.c.text_rank.desc()).label("rank"),
+        ).subquery("lexical")
+
+        score = (
+            func.coalesce(semantic_weight / (rrf_k + semantic.c.rank), 0.0)
+            + func.coalesce(lexical_weight / (rrf_k + lexical.c.rank), 0.0)
+        )
+        return (
+            select(func.coalesce(semantic.c.id, lexical.c.id).label("id"), score.label("score"))
+            .select_from(semantic.join(lexical, semantic.c.id == lexical.c.id, full=True))
+            .order_by(score.desc(), semantic.c.rank.nulls_last(), lexical.c.rank)
+            .limit(limit)
+            .subquery()
+        )
+
+    @staticmethod
+    def _to_hit(item: KnowledgeItem, score: float, embedding: Optional[List[float]] = None) -> KnowledgeHit:
+        # Built field by field: model_validate would lazy-load the deferred embedding
+        return KnowledgeHit(
+            id=item.id,
+            source_type=item.source_type,
+            source_id=item.source_id,
+            content_text=item.content_text,
+            metadata_info=item.metadata_info,
+            score=score,
+            embedding=embedding,
+        )
+
+    @staticmethod
+    def _conditions(source_type: Optional[str], filters: dict) -> list:
+        conditions = []
         if source_type:
-            stmt = stmt.where(KnowledgeItem.source_type == source_type)
+            if source_type not in KNOWLEDGE_SOURCE_TYPES:
+                raise ValueError(f"Unknown knowledge source type: {source_type}")
+            # Rendered inline so the planner can match the partial index of this source type
+            conditions.append(
+                KnowledgeItem.source_type == bindparam("source_type", source_type, literal_execute=True, unique=True)
+            )
+        if filters:
+            # JSONB containment, served by the GIN index on metadata_info
+            conditions.append(KnowledgeItem.metadata_info.contains(filters))
+        return conditions
+
+    @staticmethod
+    def _lexical_terms(query: str) -> list[str]:
+        """Words of the query, OR-ed in the tsquery: ts_rank_cd favours items matching most of them."""
+        return list(dict.fromkeys(re.findall(r"\w+", query.lower())))
+
+    @staticmethod
+    def _clean_filters(filters: Optional[dict]) -> dict:
+        if not filters:
+            return {}
+        unknown = set(filters) - set(FILTERABLE_METADATA)
+        if unknown:
+            raise ValueError(f"Unsupported metadata filters: {sorted(unknown)}")
+        return {key: value for key, value in filters.items() if value}
+
+    async def _execute_search(self, stmt, filtered: bool) -> list:
+        """
+        Rows of a search statement. Filtered searches run with iterative HNSW scans: without
+        them, HNSW returns the ef_search nearest rows and the filter is applied afterwards, so
+        selective filters would yield fewer than `limit` hits.
+
+        The setting is transaction-scoped (set_config(..., true)), so it is put back right
+        after the search instead of applying to the rest of the request's transaction. If
+        the search fails, the aborted transaction must be rolled back, which discards it too.
+        """
+        mode = settings.RAG_HNSW_ITERATIVE_SCAN
+        if not filtered or mode == "off":
+            return (await self.session.execute(stmt)).all()
 
-        result = await self.session.execute(stmt)
-        return result.scalars().all()
+        # current_setting is evaluated before set_config (select list order)
+        previous = (await self.session.execute(select(
+            func.current_setting(HNSW_ITERATIVE_SCAN, True),
+            func.set_config(HNSW_ITERATIVE_SCAN, mode, True),
+        ))).scalar()
+        rows = (await self.session.execute(stmt)).all()
+        await self.session.execute(select(func.set_config(HNSW_ITERATIVE_SCAN, previous or "off", True)))
+        return rows
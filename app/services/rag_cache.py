@@ -0,0 +1,105 @@
+import time
+from collections import OrderedDict
+from typing import Hashable, List, Optional
+
+from app.core.config import settings
+from app.core.logging import app_logger
+from app.core.metrics import metrics
+from app.repositories.catalog_version import CatalogVersionRepository, KNOWLEDGE_BASE
+from app.schemas.knowledge import KnowledgeHit
+
+
+class SearchResultCache:
+    """
+    Bounded LRU + TTL cache of KnowledgeRetriever results.
+
+    The knowledge base only changes when ingest_knowledge.py runs, which bumps the
+    "knowledge_base" catalog version. The stamp is re-read at most every
+    `version_check_seconds`; a new stamp empties the cache. Searches read `generation`
+    before querying and pass it to `put`, so results of the previous version that
+    complete after the cache was emptied are not stored.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, version_check_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version_check_seconds = version_check_seconds
+        self._entries: OrderedDict[Hashable, tuple[float, tuple[KnowledgeHit, ...]]] = OrderedDict()
+        self._version: Optional[str] = None
+        self._version_checked_at = float("-inf")
+        # Incremented whenever the entries are dropped
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(query: str, **params) -> Hashable:
+        """Case and whitespace insensitive query + every parameter that changes the result."""
+        normalized = " ".join(query.lower().split())
+        frozen = tuple(
+            (name, tuple(sorted(value.items())) if isinstance(value, dict) else value)
+            for name, value in sorted(params.items())
+        )
+        return normalized, frozen
+
+    async def sync_version(self, session) -> None:
+        """Drop every entry if the knowledge base was re-ingested since the last check."""
+        now = time.monotonic()
+        if now - self._version_checked_at < self.version_check_seconds:
+            return
+        self._version_checked_at = now
+        try:
+            version = await CatalogVersionRepository(session).check_version(KNOWLEDGE_BASE)
+        except Exception as e:
+            # Stale results are better than failed searches; retry on the next window
+            app_logger.warning(f"Knowledge base version check failed: {e}")
+            return
+        if version != self._version:
+            self.clear()
+            self._version = version
+
+    def get(self, key: Hashable) -> Optional[List[KnowledgeHit]]:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl_seconds:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            metrics.inc("rag_cache_hits_total", help_text="KnowledgeRetriever searches served from cache")
+            return list(entry[1])
+        if entry is not None:
+            del self._entries[key]
+        self.misses += 1
+        metrics.inc("rag_cache_misses_total", help_text="KnowledgeRetriever searches that hit the DB")
+        return None
+
+    def put(self, key: Hashable, hits: List[KnowledgeHit], generation: Optional[int] = None) -> None:
+        """Store a result, unless the cache was emptied since `generation` was read"""
+        if generation is not None and generation != self.generation:
+            return
+        self._entries[key] = (time.monotonic(), tuple(hits))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.generation += 1
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+search_cache = SearchResultCache(
+    max_entries=settings.RAG_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RAG_CACHE_TTL_SECONDS,
+    version_check_seconds=settings.RAG_CACHE_VERSION_CHECK_SECONDS,
+)
+
+metrics.gauge("rag_cache_hit_ratio", lambda: search_cache.hit_ratio,
+              help_text="Share of KnowledgeRetriever searches served from cache")
+metrics.gauge("rag_cache_entries", lambda: len(search_cache),
+              help_text="Search results currently cached")
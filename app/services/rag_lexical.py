@@ -0,0 +1,141 @@
+import heapq
+import math
+import re
+import time
+from collections import Counter, defaultdict
+from typing import List, Optional, Sequence
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.logging import app_logger
+from app.models.domain import KnowledgeItem
+from app.repositories.catalog_version import CatalogVersionRepository, KNOWLEDGE_BASE
+from app.schemas.knowledge import KnowledgeHit
+
+
+def tokenize(text: str) -> list[str]:
+    # Same word split as the tsquery terms of hybrid search
+    return re.findall(r"\w+", text.lower())
+
+
+class BM25Index:
+    """
+    Immutable in-memory BM25 index over the content_text of knowledge items.
+
+    Used by KnowledgeRetriever when the query cannot be embedded in time: no network,
+    no DB, a few dictionary lookups per query term.
+    """
+
+    def __init__(self, docs: Sequence[KnowledgeHit], k1: float = 1.5, b: float = 0.75, vectors=None):
+        self.docs = tuple(docs)
+        # Optional embedding matrix (row i for docs[i]), e.g. memory-mapped from the knowledge bundle:
+        # hits then carry their vector like the ones of KnowledgeRetriever.search_pools
+        self.vectors = vectors
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        self._lengths = []
+        for index, doc in enumerate(self.docs):
+            terms = tokenize(doc.content_text)
+            self._lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self._postings[term].append((index, tf))
+        self._avg_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        n = len(self.docs)
+        self._idf = {
+            term: math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def search(
+        self,
+        query: str,
+        limit: int = 5,
+        source_type: Optional[str] = None,
+        filters: Optional[dict] = None,
+    ) -> List[KnowledgeHit]:
+        """Best `limit` documents containing at least one query term, filters applied in memory."""
+        scores: dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for index, tf in self._postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[index] / self._avg_length)
+                scores[index] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        def matches(doc: KnowledgeHit) -> bool:
+            if source_type and doc.source_type != source_type:
+                return False
+            return all(doc.metadata_info.get(key) == value for key, value in (filters or {}).items())
+
+        best = heapq.nlargest(
+            limit,
+            ((score, index) for index, score in scores.items() if matches(self.docs[index])),
+        )
+        return [self._hit(index, score) for score, index in best]
+
+    def _hit(self, index: int, score: float) -> KnowledgeHit:
+        update = {"score": score}
+        if self.vectors is not None:
+            update["embedding"] = self.vectors[index].tolist()
+        return self.docs[index].model_copy(update=update)
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+
+class LexicalFallback:
+    """
+    Process-wide BM25 index of knowledge_items, loaded at startup and rebuilt when
+    ingest_knowledge.py bumps the knowledge base version (checked at most every
+    `version_check_seconds`, and only while the fallback is in use).
+    """
+
+    def __init__(self, version_check_seconds: float):
+        self.version_check_seconds = version_check_seconds
+        self.index = BM25Index([])
+        # Prebuilt KnowledgeBundle, used instead of the table while it has the same version
+        self.bundle = None
+        self._version: Optional[str] = None
+        self._version_checked_at = float("-inf")
+
+    async def load(self, session) -> None:
+        version = await CatalogVersionRepository(session).get_version(KNOWLEDGE_BASE)
+        if self.bundle is not None and self.bundle.knowledge_version == version:
+            # Swapped in one assignment: concurrent searches see the old or the new index
+            self.index = BM25Index(self.bundle.items(), vectors=self.bundle.embeddings)
+        else:
+            result = await session.execute(
+                select(
+                    KnowledgeItem.id, KnowledgeItem.source_type, KnowledgeItem.source_id,
+                    KnowledgeItem.content_text, KnowledgeItem.metadata_info,
+                )
+            )
+            docs = [KnowledgeHit.model_validate(row) for row in result.all()]
+            self.index = BM25Index(docs)
+        self._version = version
+        self._version_checked_at = time.monotonic()
+
+    async def sync(self, session) -> None:
+        now = time.monotonic()
+        if now - self._version_checked_at < self.version_check_seconds:
+            return
+        self._version_checked_at = now
+        try:
+            # In a savepoint: a failure must not abort the transaction of the caller's session
+            async with session.begin_nested():
+                version = await CatalogVersionRepository(session).get_version(KNOWLEDGE_BASE)
+                if version != self._version or not len(self.index):
+                    await self.load(session)
+        except Exception as e:
+            # Keep answering from the current index
+            app_logger.warning(f"Lexical index refresh failed: {e}")
+
+    def search(self, query: str, limit: int = 5, source_type: Optional[str] = None,
+               filters: Optional[dict] = None) -> List[KnowledgeHit]:
+        return self.index.search(query, limit=limit, source_type=source_type, filters=filters)
+
+
+lexical_fallback = LexicalFallback(version_check_seconds=settings.RAG_CACHE_VERSION_CHECK_SECONDS)
@@ -1,15 +1,18 @@
 import httpx
-from typing import Dict, Any
-from app.core.config import settings
+from typing import Dict, Any, Optional
+from app.core.http import data_api
+from app.core.timing import timed
 from datetime import datetime
 
 class SensorService:
     """
     Connects to fit-buddy-data API to retrieve metrics.
     """
-    def __init__(self):
-        self.base_url = settings.FIT_BUDDY_DATA_URL
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        # Shared keep-alive client of the process by default (base URL: FIT_BUDDY_DATA_URL)
+        self.client = client or data_api.client
 
+    @timed("sensor")
     async def get_sensor_snapshot(self, machine_id: str, start_time: Any, end_time: Any) -> Dict[str, Any]:
         """
         Fetches sensor data for a set timeframe.
@@ -22,23 +25,22 @@ class SensorService:
         e_iso = end_time.isoformat() if isinstance(end_time, datetime) else str(end_time)
 
         try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.get(
-                    f"{self.base_url}/api/sensor/metrics",
-                    params={
-                        "machine_id": machine_id,
-                        "start_time": s_iso,
-                        "end_time": e_iso
-                    },
-                    timeout=5.0
-                )
-                
-                if resp.status_code == 200:
-                    payload = resp.json()
-                    return payload.get("data", {})
-                
-                print(f"Sensor API Error: {resp.status_code} - {resp.text}")
-                return {}
+            resp = await self.client.get(
+                "/api/sensor/metrics",
+                params={
+                    "machine_id": machine_id,
+                    "start_time": s_iso,
+                    "end_time": e_iso
+                },
+                timeout=5.0
+            )
+
+            if resp.status_code == 200:
+                payload = resp.json()
+                return payload.get("data", {})
+
+            print(f"Sensor API Error: {resp.status_code} - {resp.text}")
+            return {}
 
         except Exception as e:
             print(f"Sensor Service Connection Error: {e}")
@@ -0,0 +1,114 @@
+import copy
+import random
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+# Upper bounds of the stat bands used in the fingerprint
+BMI_BANDS = (18.5, 25.0, 30.0)
+AGE_BANDS = (25, 40, 55)
+DURATION_STEP_MINUTES = 15
+
+
+def _band(value, bounds) -> Optional[int]:
+    if value is None:
+        return None
+    return sum(1 for bound in bounds if value >= bound)
+
+
+def profile_fingerprint(profile_data: dict) -> Hashable:
+    """
+    Bucketed profile: users with the same fingerprint get interchangeable skeletons.
+    Goal, level, days per week and injuries are exact; duration and stats are banded.
+    """
+    stats = profile_data.get("current_stats") or {}
+    weight, height = stats.get("weight_kg"), stats.get("height_cm")
+    bmi = weight / (height / 100) ** 2 if weight and height else None
+    duration = profile_data.get("session_duration_minutes")
+    return (
+        profile_data.get("goal"),
+        profile_data.get("experience_level"),
+        profile_data.get("days_per_week"),
+        round(duration / DURATION_STEP_MINUTES) if duration else None,
+        tuple(sorted({injury.strip().lower() for injury in profile_data.get("injuries") or []})),
+        _band(bmi, BMI_BANDS),
+        _band(stats.get("age"), AGE_BANDS),
+    )
+
+
+def is_valid_skeleton(skeleton: dict) -> bool:
+    """Only complete skeletons are shared: sessions, each with exercises that have a search query"""
+    sessions = skeleton.get("sessions") if isinstance(skeleton, dict) else None
+    if not sessions or not isinstance(sessions, list):
+        return False
+    for session_plan in sessions:
+        exercises = session_plan.get("exercises") if isinstance(session_plan, dict) else None
+        if not exercises or not all(isinstance(ex, dict) and ex.get("search_query") for ex in exercises):
+            return False
+    return True
+
+
+class SkeletonCache:
+    """
+    Architect skeletons per profile fingerprint.
+
+    Each bucket keeps up to `pool_size` skeletons for `ttl_seconds`. Until the pool is full,
+    generations call the LLM and add to it; then a random skeleton of the pool is reused,
+    so users of the same bucket do not all get the same program.
+    """
+
+    def __init__(self, ttl_seconds: float, pool_size: int, max_buckets: int):
+        self.ttl_seconds = ttl_seconds
+        self.pool_size = pool_size
+        self.max_buckets = max_buckets
+        self._buckets: OrderedDict[Hashable, list[tuple[float, dict]]] = OrderedDict()
+
+    def get(self, fingerprint: Hashable) -> Optional[dict]:
+        pool = self._fresh_pool(fingerprint)
+        if len(pool) < self.pool_size:
+            metrics.inc("skeleton_cache_misses_total", help_text="Smart generations that called the Architect")
+            return None
+        self._buckets.move_to_end(fingerprint)
+        metrics.inc("skeleton_cache_hits_total", help_text="Smart generations that reused a cached skeleton")
+        # Callers get their own copy
+        return copy.deepcopy(random.choice(pool)[1])
+
+    def put(self, fingerprint: Hashable, skeleton: dict) -> bool:
+        """Add a skeleton to its bucket if it is valid and the pool has room"""
+        if not is_valid_skeleton(skeleton):
+            return False
+        pool = self._fresh_pool(fingerprint)
+        if len(pool) >= self.pool_size:
+            return False
+        pool.append((time.monotonic(), copy.deepcopy(skeleton)))
+        self._buckets[fingerprint] = pool
+        self._buckets.move_to_end(fingerprint)
+        while len(self._buckets) > self.max_buckets:
+            self._buckets.popitem(last=False)
+        return True
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+    def _fresh_pool(self, fingerprint: Hashable) -> list[tuple[float, dict]]:
+        now = time.monotonic()
+        pool = [entry for entry in self._buckets.get(fingerprint, []) if now - entry[0] < self.ttl_seconds]
+        if fingerprint in self._buckets:
+            self._buckets[fingerprint] = pool
+        return pool
+
+    def __len__(self) -> int:
+        return sum(len(pool) for pool in self._buckets.values())
+
+
+skeleton_cache = SkeletonCache(
+    ttl_seconds=settings.SKELETON_CACHE_TTL_SECONDS,
+    pool_size=settings.SKELETON_CACHE_POOL_SIZE,
+    max_buckets=settings.SKELETON_CACHE_MAX_BUCKETS,
+)
+
+metrics.gauge("skeleton_cache_entries", lambda: len(skeleton_cache),
+              help_text="Architect skeletons currently cached")
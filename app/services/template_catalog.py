@@ -0,0 +1,119 @@
+import time
+from typing import Mapping, Optional
+from types import MappingProxyType
+
+from pydantic import BaseModel, ConfigDict
+
+from app.core.config import settings
+from app.core.logging import app_logger
+from app.models.domain import Session
+from app.repositories.catalog_version import CatalogVersionRepository, EXERCISE_CATALOG
+from app.repositories.dictionary import DictionaryRepository
+from app.schemas.template import ProgramTemplate
+from app.services.templates import DEFAULT_TEMPLATE_KEY, PROGRAM_TEMPLATES, template_key
+
+
+class CompiledSession(BaseModel):
+    """A SessionTemplate with its exercises_plan payload already built"""
+    name: str
+    order_index: int
+    exercises_plan: tuple[Mapping, ...]
+
+    model_config = ConfigDict(frozen=True, arbitrary_types_allowed=True)
+
+
+class CompiledTemplate(BaseModel):
+    """A ProgramTemplate whose default exercises are resolved to exercise IDs"""
+    template: ProgramTemplate
+    sessions: tuple[CompiledSession, ...]
+
+    model_config = ConfigDict(frozen=True, arbitrary_types_allowed=True)
+
+    def build_sessions(self) -> list[Session]:
+        """New Session rows for a program, each with its own copy of the plan"""
+        return [
+            Session(
+                name=compiled.name,
+                order_index=compiled.order_index,
+                exercises_plan=[dict(entry) for entry in compiled.exercises_plan],
+            )
+            for compiled in self.sessions
+        ]
+
+
+async def compile_templates(dictionary_repo: DictionaryRepository) -> dict[str, CompiledTemplate]:
+    """Resolve the default exercises of every template (one query) and build the plans"""
+    exercises_by_name = await dictionary_repo.get_exercises_by_names([
+        ex.default_exercise
+        for template in PROGRAM_TEMPLATES.values()
+        for sess_tmpl in template.sessions
+        for ex in sess_tmpl.exercises
+    ])
+
+    compiled = {}
+    for key, template in PROGRAM_TEMPLATES.items():
+        sessions = []
+        for i, sess_tmpl in enumerate(template.sessions):
+            exercises_plan = []
+            for ex in sess_tmpl.exercises:
+                exercise_obj = exercises_by_name.get(ex.default_exercise)
+                exercises_plan.append(MappingProxyType({
+                    "exercise_id": str(exercise_obj.id) if exercise_obj else None,
+                    "exercise_name": ex.default_exercise,
+                    "target_sets": ex.sets,
+                    "target_reps": ex.reps,
+                    "rest_seconds": ex.rest,
+                    "notes": ex.notes
+                }))
+            sessions.append(CompiledSession(
+                name=sess_tmpl.name_template,
+                order_index=i + 1,
+                exercises_plan=tuple(exercises_plan),
+            ))
+        compiled[key] = CompiledTemplate(template=template, sessions=tuple(sessions))
+    return compiled
+
+
+class TemplateCatalog:
+    """
+    PROGRAM_TEMPLATES compiled once per process, so template mode costs no query per exercise.
+
+    Recompiled when seed_exercises.py bumps the "exercises" catalog version (checked at
+    most every `version_check_seconds`). Each compilation is swapped in as a whole.
+    """
+
+    def __init__(self, version_check_seconds: float):
+        self.version_check_seconds = version_check_seconds
+        self._templates: Mapping[str, CompiledTemplate] = MappingProxyType({})
+        self._version: Optional[str] = None
+        self._version_checked_at = float("-inf")
+
+    async def load(self, session) -> None:
+        version = await CatalogVersionRepository(session).get_version(EXERCISE_CATALOG)
+        self._templates = MappingProxyType(await compile_templates(DictionaryRepository(session)))
+        self._version = version
+        self._version_checked_at = time.monotonic()
+
+    async def sync(self, session) -> None:
+        """Compile on first use, recompile if the exercise catalog changed since the last check"""
+        now = time.monotonic()
+        if self._templates and now - self._version_checked_at < self.version_check_seconds:
+            return
+        self._version_checked_at = now
+        try:
+            version = await CatalogVersionRepository(session).check_version(EXERCISE_CATALOG)
+        except Exception as e:
+            if self._templates:
+                # Keep serving the current compilation
+                app_logger.warning(f"Exercise catalog version check failed: {e}")
+                return
+            raise
+        if version != self._version or not self._templates:
+            await self.load(session)
+
+    def get(self, goal: str, level: str) -> CompiledTemplate:
+        """Same selection as templates.get_template"""
+        return self._templates.get(template_key(goal, level), self._templates[DEFAULT_TEMPLATE_KEY])
+
+
+template_catalog = TemplateCatalog(version_check_seconds=settings.TEMPLATE_CATALOG_VERSION_CHECK_SECONDS)
@@ -70,6 +70,11 @@ PROGRAM_TEMPLATES: Dict[str, ProgramTemplate] = {
     "muscle_gain_beginner": MUSCLE_GAIN_BEGINNER
 }
 
+# Used when no template matches the goal and level
+DEFAULT_TEMPLATE_KEY = "muscle_gain_beginner"
+
+def template_key(goal: str, level: str) -> str:
+    return f"{goal}_{level}"
+
 def get_template(goal: str, level: str) -> ProgramTemplate:
-    key = f"{goal}_{level}"
-    return PROGRAM_TEMPLATES.get(key, PROGRAM_TEMPLATES["muscle_gain_beginner"])
+    return PROGRAM_TEMPLATES.get(template_key(goal, level), PROGRAM_TEMPLATES[DEFAULT_TEMPLATE_KEY])
@@ -0,0 +1,8 @@
+"""
+Local stand-in for the Fit Buddy Data API (:8001), for load and latency tests without it.
+
+    uv run uvicorn app.simulator.main:app --port 8001
+
+Same routes and response shapes as the real service (the ones IoTService and SensorService
+parse), with machines, latencies, errors and occupancy driven by the SIMULATOR_* settings.
+"""
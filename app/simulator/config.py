@@ -0,0 +1,25 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class SimulatorSettings(BaseSettings):
+    """Data API simulator settings, read from the SIMULATOR_* environment variables"""
+
+    MACHINE_TYPES: str = ""  # Comma-separated; empty: every "materiel" of exercices_autorises.csv
+    UNITS_PER_TYPE: int = 3  # Units "<TYPE>_001", "<TYPE>_002", ...
+    SEED: int = 42
+    LATENCY_DISTRIBUTION: str = "lognormal"  # "lognormal", "uniform" or "constant"
+    LATENCY_MEDIAN_MS: float = 30.0
+    LATENCY_SPREAD: float = 0.5  # lognormal sigma, or +/- fraction of the median for "uniform"
+    LATENCY_TAIL_PROBABILITY: float = 0.01  # Requests slowed down by LATENCY_TAIL_MS
+    LATENCY_TAIL_MS: float = 1000.0
+    ERROR_RATE: float = 0.0  # Requests answered with a 503
+    OCCUPANCY_PATTERN: str = "constant"  # "constant", "peak_hours" or "wave"
+    OCCUPANCY: float = 0.6  # Busy fraction of the units (peak of "peak_hours" and "wave")
+    OCCUPANCY_PERIOD_SECONDS: float = 300.0  # "wave" period
+    STATE_SECONDS: float = 20.0  # A unit keeps its availability this long
+    MAX_WAIT_MINUTES: int = 15
+
+    model_config = SettingsConfigDict(env_prefix="SIMULATOR_", env_file=".env", case_sensitive=True, extra="ignore")
+
+
+simulator_settings = SimulatorSettings()
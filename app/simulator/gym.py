@@ -0,0 +1,110 @@
+import csv
+import math
+import os
+import random
+import time
+from datetime import datetime
+from typing import Optional
+
+from app.simulator.config import SimulatorSettings
+
+CSV_PATH = "assets/Documentation pour développement/Dataset Exercices (à cleaner)/exercices_autorises.csv"
+
+# Local hours when the gym is at its SIMULATOR_OCCUPANCY ("peak_hours" pattern)
+PEAK_HOURS = {7, 8, 12, 17, 18, 19}
+OFF_PEAK_FACTOR = 0.3
+
+
+def csv_machine_types(path: str = CSV_PATH) -> list[str]:
+    """machine_type_id of every "materiel" of the exercise dataset (same rule as seed_exercises.py)"""
+    if not os.path.exists(path):
+        return []
+    with open(path, mode="r", encoding="utf-8") as csvfile:
+        materials = (row["materiel"].strip() for row in csv.DictReader(csvfile))
+        return list(dict.fromkeys(
+            material.upper().replace(" ", "_").replace("-", "_") for material in materials if material
+        ))
+
+
+class GymSimulator:
+    """
+    Simulated machines of a gym. Each unit keeps its availability for SIMULATOR_STATE_SECONDS,
+    drawn from a seeded generator, so every process and every request see the same state for
+    a given time window; the busy fraction follows SIMULATOR_OCCUPANCY_PATTERN.
+    """
+
+    def __init__(self, settings: SimulatorSettings, machine_types: Optional[list[str]] = None):
+        self.settings = settings
+        if machine_types is None:
+            configured = [t.strip() for t in settings.MACHINE_TYPES.split(",") if t.strip()]
+            machine_types = configured or csv_machine_types()
+        self.machines = [
+            f"{machine_type}_{unit:03d}"
+            for machine_type in machine_types
+            for unit in range(1, settings.UNITS_PER_TYPE + 1)
+        ]
+        self._known = set(self.machines)
+        self._rng = random.Random(settings.SEED)
+
+    def has_machine(self, machine_id: str) -> bool:
+        return machine_id in self._known
+
+    def occupancy(self, now: float) -> float:
+        """Busy fraction of the units at `now` (epoch seconds)"""
+        s = self.settings
+        if s.OCCUPANCY_PATTERN == "peak_hours":
+            hour = datetime.fromtimestamp(now).hour
+            return s.OCCUPANCY if hour in PEAK_HOURS else s.OCCUPANCY * OFF_PEAK_FACTOR
+        if s.OCCUPANCY_PATTERN == "wave":
+            phase = 2 * math.pi * now / s.OCCUPANCY_PERIOD_SECONDS
+            return s.OCCUPANCY * (0.5 + 0.5 * math.sin(phase))
+        return s.OCCUPANCY
+
+    def prediction(self, machine_id: str, now: Optional[float] = None) -> dict:
+        """Payload of /api/machine/{id}/prediction ("data")"""
+        now = time.time() if now is None else now
+        window = int(now // self.settings.STATE_SECONDS)
+        rng = random.Random(f"{self.settings.SEED}:{machine_id}:{window}")
+        if rng.random() >= self.occupancy(now):
+            return {"available": True, "time_to_wait": 0}
+        return {"available": False, "time_to_wait": rng.randint(1, self.settings.MAX_WAIT_MINUTES)}
+
+    def sensor_metrics(self, machine_id: str, start_time: str, end_time: str) -> dict:
+        """Payload of /api/sensor/metrics ("data"), the same for the same set"""
+        rng = random.Random(f"{self.settings.SEED}:{machine_id}:{start_time}:{end_time}")
+        try:
+            duration = (datetime.fromisoformat(end_time) - datetime.fromisoformat(start_time)).total_seconds()
+        except ValueError:
+            duration = 0.0
+        avg_power = round(rng.uniform(80, 400), 1)
+        return {
+            "machine_id": machine_id,
+            "start_time": start_time,
+            "end_time": end_time,
+            "metrics": {
+                "avg_power_watts": avg_power,
+                "peak_power_watts": round(avg_power * rng.uniform(1.2, 1.6), 1),
+                "avg_speed_concentric_ms": round(rng.uniform(0.3, 1.2), 2),
+                "avg_speed_eccentric_ms": round(rng.uniform(0.2, 0.8), 2),
+                "range_of_motion_cm": round(rng.uniform(20, 70), 1),
+                "duration_seconds": max(duration, 0.0),
+            },
+        }
+
+    def latency_seconds(self) -> float:
+        """Delay of one response, drawn from SIMULATOR_LATENCY_DISTRIBUTION"""
+        s = self.settings
+        median = s.LATENCY_MEDIAN_MS
+        if s.LATENCY_DISTRIBUTION == "lognormal":
+            delay = median * math.exp(self._rng.gauss(0, s.LATENCY_SPREAD))
+        elif s.LATENCY_DISTRIBUTION == "uniform":
+            spread = median * s.LATENCY_SPREAD
+            delay = self._rng.uniform(median - spread, median + spread)
+        else:
+            delay = median
+        if self._rng.random() < s.LATENCY_TAIL_PROBABILITY:
+            delay += s.LATENCY_TAIL_MS
+        return max(delay, 0.0) / 1000
+
+    def fails(self) -> bool:
+        return self._rng.random() < self.settings.ERROR_RATE
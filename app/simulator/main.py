@@ -0,0 +1,42 @@
+import asyncio
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+from app.simulator.config import simulator_settings
+from app.simulator.gym import GymSimulator
+
+
+def create_app(gym: Optional[GymSimulator] = None) -> FastAPI:
+    gym = gym or GymSimulator(simulator_settings)
+    app = FastAPI(title="Fit Buddy Data API simulator")
+    app.state.gym = gym
+
+    @app.middleware("http")
+    async def simulate_network(request: Request, call_next):
+        await asyncio.sleep(gym.latency_seconds())
+        if gym.fails():
+            return JSONResponse(status_code=503, content={"detail": "Simulated Data API error"})
+        return await call_next(request)
+
+    @app.get("/api/machine/list")
+    async def list_machines() -> dict:
+        return {"machines": gym.machines}
+
+    @app.get("/api/machine/{machine_id}/prediction")
+    async def predict(machine_id: str) -> dict:
+        if not gym.has_machine(machine_id):
+            raise HTTPException(status_code=404, detail=f"Unknown machine {machine_id}")
+        return {"data": gym.prediction(machine_id)}
+
+    @app.get("/api/sensor/metrics")
+    async def sensor_metrics(machine_id: str, start_time: str, end_time: str) -> dict:
+        if not gym.has_machine(machine_id):
+            raise HTTPException(status_code=404, detail=f"Unknown machine {machine_id}")
+        return {"data": gym.sensor_metrics(machine_id, start_time, end_time)}
+
+    return app
+
+
+app = create_app()
@@ -0,0 +1,46 @@
+"""Vector helpers shared by the RAG services and scripts"""
+
+from collections.abc import Sequence
+from typing import Optional
+
+import numpy as np
+
+
+def binary_quantize(vector: Sequence[float]) -> str:
+    """
+    Same as pgvector's binary_quantize(): one bit per dimension, set when the value is positive.
+
+    Returns a bit string ("0101...") as accepted by the `bit(n)` column type.
+    """
+    return "".join("1" if value > 0 else "0" for value in vector)
+
+
+def normalize_rows(vectors: Sequence[Sequence[float]]) -> np.ndarray:
+    """float32 matrix of L2-normalized rows: dot products are cosine similarities."""
+    matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def max_marginal_relevance(
+    relevance: np.ndarray,
+    candidates: np.ndarray,
+    selected: np.ndarray,
+    trade_off: float,
+    allowed: Optional[np.ndarray] = None,
+) -> Optional[int]:
+    """
+    Index of the candidate maximizing
+    trade_off * relevance - (1 - trade_off) * max cosine similarity with the selected vectors.
+
+    `candidates` and `selected` are normalized rows (see normalize_rows), `allowed` an optional
+    boolean mask. Returns None when no candidate is allowed.
+    """
+    scores = trade_off * relevance
+    if len(selected):
+        scores = scores - (1 - trade_off) * (candidates @ selected.T).max(axis=1)
+    if allowed is not None:
+        scores = np.where(allowed, scores, -np.inf)
+    if not len(scores) or np.isneginf(scores).all():
+        return None
+    return int(np.argmax(scores))
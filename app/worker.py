@@ -0,0 +1,131 @@
+"""
+Program generation worker
+
+Claims queued generation_jobs (FOR UPDATE SKIP LOCKED) and runs the generation pipeline
+outside of any HTTP request. Run as many workers as needed next to the API:
+
+    python -m app.worker [--concurrency 2]
+"""
+
+import argparse
+import asyncio
+import signal
+from contextlib import suppress
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.logging import app_logger
+from app.core.user_db import async_session_factory, engine
+from app.models.domain import GenerationJob
+from app.repositories.generation_job import GenerationJobRepository
+from app.services.knowledge import knowledge_base
+from app.services.knowledge_bundle import open_bundle
+from app.services.program import build_program_service
+from app.services.rag_lexical import lexical_fallback
+
+
+async def run_job(job: GenerationJob) -> None:
+    app_logger.info(f"Generation job {job.id} ({job.method}) for user {job.user_id}: attempt {job.attempts}")
+    async with async_session_factory() as session:
+        jobs = GenerationJobRepository(session)
+        try:
+            # Bounded: past it the reaper would hand the job to another worker
+            program = await asyncio.wait_for(
+                build_program_service(session).generate_program(
+                    job.user_id, method=job.method, status="pending" if job.speculative else "active"
+                ),
+                timeout=settings.GENERATION_JOB_TIMEOUT_SECONDS,
+            )
+        except Exception as e:
+            await session.rollback()
+            if isinstance(e, HTTPException):
+                error = e.detail
+            elif isinstance(e, asyncio.TimeoutError):
+                error = f"Generation timed out after {settings.GENERATION_JOB_TIMEOUT_SECONDS:.0f}s"
+            else:
+                error = f"{type(e).__name__}: {e}"
+            app_logger.error(f"Generation job {job.id} failed: {error}")
+            await jobs.mark_failed(job.id, job.attempts, str(error))
+            return
+        if job.speculative:
+            # The user may have asked for it, or changed their profile, in the meantime
+            final_status = await jobs.finish_speculative(job.id, job.attempts, program.id)
+            app_logger.info(f"Speculative generation job {job.id} {final_status}: program {program.id}")
+            return
+        if not await jobs.mark_succeeded(job.id, job.attempts, program.id):
+            app_logger.warning(f"Generation job {job.id} was no longer running attempt {job.attempts}")
+            return
+    app_logger.info(f"Generation job {job.id} succeeded: program {program.id}")
+
+
+async def claim_next() -> GenerationJob | None:
+    async with async_session_factory() as session:
+        return await GenerationJobRepository(session).claim_next()
+
+
+async def worker_loop(stop: asyncio.Event) -> None:
+    """Claim and run jobs one at a time until `stop` is set"""
+    while not stop.is_set():
+        try:
+            job = await claim_next()
+        except Exception as e:
+            app_logger.error(f"Could not claim a generation job: {e}")
+            job = None
+        if job is None:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.GENERATION_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        try:
+            await run_job(job)
+        except Exception as e:
+            # Left running: the reaper requeues it (or fails it after its last attempt)
+            app_logger.error(f"Generation job {job.id} could not be recorded: {e}")
+
+
+async def reaper_loop(stop: asyncio.Event) -> None:
+    """Requeue jobs left running by a crashed worker"""
+    while not stop.is_set():
+        try:
+            async with async_session_factory() as session:
+                requeued = await GenerationJobRepository(session).requeue_stale(
+                    settings.GENERATION_JOB_STALE_SECONDS, settings.GENERATION_JOB_MAX_ATTEMPTS
+                )
+            if requeued:
+                app_logger.warning(f"Requeued {requeued} stale generation jobs")
+        except Exception as e:
+            app_logger.error(f"Stale generation job check failed: {e}")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.GENERATION_JOB_STALE_SECONDS / 2)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def main(concurrency: int) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        # Finish the jobs in progress, then exit
+        loop.add_signal_handler(sig, stop.set)
+
+    bundle = await asyncio.to_thread(open_bundle, settings.KNOWLEDGE_BUNDLE_PATH)
+    lexical_fallback.bundle = bundle
+    await asyncio.to_thread(knowledge_base.load, bundle)
+    knowledge_refresher = asyncio.create_task(knowledge_base.run_refresher())
+
+    app_logger.info(f"Generation worker started ({concurrency} concurrent jobs)")
+    await asyncio.gather(reaper_loop(stop), *(worker_loop(stop) for _ in range(concurrency)))
+    knowledge_refresher.cancel()
+    with suppress(asyncio.CancelledError):
+        await knowledge_refresher
+    await engine.dispose()
+    app_logger.info("Generation worker stopped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=settings.GENERATION_WORKER_CONCURRENCY)
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency))
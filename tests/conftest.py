@@ -2,12 +2,16 @@
 Pytest configuration and fixtures
 """
 
-from collections.abc import Generator
+from collections.abc import Callable, Generator
+from contextlib import asynccontextmanager
+from uuid import uuid4
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
 
 from app.main import app
+from app.schemas.knowledge import KnowledgeHit
 
 
 @pytest.fixture(scope="module")
@@ -22,3 +26,116 @@ def override_get_db() -> None:
     """Override database dependency for testing"""
     # Add your test database setup here
     pass
+
+
+@pytest.fixture
+def make_hit() -> Callable[..., KnowledgeHit]:
+    """
+    KnowledgeHit factory: make_hit(text, source_type="exercise", score=None, embedding=None, **metadata).
+    Without metadata, metadata_info is {"name": text}.
+    """
+    def factory(text: str, source_type: str = "exercise", score: float | None = None,
+                embedding: list[float] | None = None, **metadata) -> KnowledgeHit:
+        return KnowledgeHit(
+            id=uuid4(), source_type=source_type, source_id=uuid4(), content_text=text,
+            metadata_info=metadata or {"name": text}, score=score, embedding=embedding,
+        )
+
+    return factory
+
+
+class FakeResult:
+    """Result of FakeSession.execute: `value` for scalar accessors, `rows` for all()"""
+
+    def __init__(self, value=None, rows=(), rowcount=0):
+        self.value = value
+        self.rows = list(rows)
+        self.rowcount = rowcount
+
+    def scalars(self):
+        return self
+
+    def scalar(self):
+        return self.value
+
+    def one_or_none(self):
+        return self.value
+
+    def scalar_one_or_none(self):
+        return self.value
+
+    def first(self):
+        return self.value
+
+    def one(self):
+        return self.value
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    """
+    AsyncSession stand-in without a database. Statements are compiled for PostgreSQL and
+    recorded in `statements` as (sql, params); `events` keeps the order of executes, flushes,
+    commits and rollbacks. execute() answers with the scripted `results` in turn (an
+    exception is raised instead), then with `default`.
+    """
+
+    def __init__(self, *results, default=None):
+        self.results = list(results)
+        self.default = default if default is not None else FakeResult()
+        self.statements = []
+        self.events = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def execute(self, statement, *args, **kwargs):
+        compiled = statement.compile(dialect=postgresql.dialect())
+        self.statements.append((str(compiled), compiled.params))
+        self.events.append("execute")
+        result = self.results.pop(0) if self.results else self.default
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def scalars(self, statement, *args, **kwargs):
+        return (await self.execute(statement, *args, **kwargs)).scalars()
+
+    async def flush(self):
+        self.events.append("flush")
+
+    async def commit(self):
+        self.commits += 1
+        self.events.append("commit")
+
+    async def rollback(self):
+        self.rollbacks += 1
+        self.events.append("rollback")
+
+    @asynccontextmanager
+    async def begin_nested(self):
+        self.events.append("savepoint")
+        try:
+            yield self
+        except Exception:
+            self.events.append("rollback to savepoint")
+            raise
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def fake_session() -> Callable[..., FakeSession]:
+    """FakeSession factory: fake_session(*results, default=None)"""
+    return FakeSession
+
+
+@pytest.fixture
+def fake_result() -> type[FakeResult]:
+    """FakeResult class: fake_result(value=None, rows=(), rowcount=0)"""
+    return FakeResult
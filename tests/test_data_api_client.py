@@ -0,0 +1,35 @@
+"""
+Tests for the shared Fit Buddy Data API client
+"""
+
+import httpx
+
+from app.core.http import DataApiClient
+from app.services.sensor import SensorService
+
+
+async def test_client_is_shared_until_closed() -> None:
+    owner = DataApiClient()
+    client = owner.client
+    assert owner.client is client
+    assert str(client.base_url).startswith("http")
+    assert owner.open_connections() == 0
+
+    await owner.close()
+    assert client.is_closed
+    assert owner.client is not client
+    await owner.close()
+
+
+async def test_services_send_relative_paths_through_the_client() -> None:
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.url.path)
+        return httpx.Response(200, json={"data": {"metrics": {"avg_power": 120}}})
+
+    async with httpx.AsyncClient(base_url="http://data-api", transport=httpx.MockTransport(handler)) as client:
+        snapshot = await SensorService(client).get_sensor_snapshot("DC_BENCH_001", "2026-01-01T10:00:00", "2026-01-01T10:01:00")
+
+    assert seen == ["/api/sensor/metrics"]
+    assert snapshot == {"metrics": {"avg_power": 120}}
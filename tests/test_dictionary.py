@@ -0,0 +1,46 @@
+"""
+Tests for the batched exercise name resolution of DictionaryRepository
+"""
+
+from uuid import uuid4
+
+from app.models.domain import Exercise
+from app.repositories.dictionary import DictionaryRepository
+
+
+async def test_names_are_resolved_exactly_then_by_trigram_in_one_query(fake_session, fake_result) -> None:
+    session = fake_session(fake_result())
+
+    await DictionaryRepository(session).get_exercises_by_names(["Squat Barre", "squat barre", "Curl biceps"])
+
+    (sql, params), = session.statements
+    # Requested once each, lowered for ix_exercises_name_lower
+    assert ["squat barre", "curl biceps"] in params.values()
+    exact, fuzzy = sql.split("UNION ALL")
+    assert "WHERE lower(exercises.name) = ANY (" in exact
+    # The trigram fallback only runs for names without an exact match, and keeps the best one
+    assert "exercises_1.name %% requested.name" in fuzzy
+    assert "ORDER BY similarity(exercises_1.name, requested.name) DESC" in fuzzy and "LATERAL" in fuzzy
+    assert "NOT (EXISTS (SELECT * \nFROM exercises \nWHERE lower(exercises.name) = requested.name))" in fuzzy
+
+
+async def test_each_name_resolves_to_its_best_match_at_most_once(fake_session, fake_result) -> None:
+    exact = Exercise(id=uuid4(), name="Squat barre")
+    similar = Exercise(id=uuid4(), name="Squat barre sumo")
+    fuzzy = Exercise(id=uuid4(), name="Curl biceps haltères")
+    # Ordered as the query returns them: by requested name, best score first
+    rows = [("curl biceps", fuzzy), ("squat barre", exact), ("squat barre", similar)]
+    session = fake_session(fake_result(rows=rows))
+
+    found = await DictionaryRepository(session).get_exercises_by_names(
+        ["Squat Barre", "squat barre", "Curl biceps", "Burpee"]
+    )
+
+    assert found == {"Squat Barre": exact, "squat barre": exact, "Curl biceps": fuzzy, "Burpee": None}
+
+
+async def test_no_names_no_query(fake_session) -> None:
+    session = fake_session()
+
+    assert await DictionaryRepository(session).get_exercises_by_names([]) == {}
+    assert session.statements == []
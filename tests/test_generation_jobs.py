@@ -0,0 +1,89 @@
+"""
+Tests for the generation job queue and the worker's handling of failed runs
+"""
+
+import asyncio
+from types import SimpleNamespace
+from uuid import uuid4
+
+from app import worker
+from app.models.domain import GenerationJob
+from app.repositories.generation_job import GenerationJobRepository
+
+
+async def test_enqueue_returns_the_job_of_a_repeated_idempotency_key(fake_session, fake_result) -> None:
+    existing = GenerationJob(id=uuid4(), user_id=uuid4(), method="smart", status="succeeded")
+    # The insert conflicts (nothing returned), then the duplicate lookup finds the first job
+    session = fake_session(fake_result(None), fake_result(existing))
+
+    job, created = await GenerationJobRepository(session).enqueue(existing.user_id, "smart", "key-1")
+
+    assert job is existing and not created
+    insert_sql, lookup = session.statements
+    assert "ON CONFLICT DO NOTHING" in insert_sql[0]
+    assert "key-1" in lookup[1].values()
+
+
+async def test_claim_next_takes_requested_jobs_first_then_oldest(fake_session, fake_result) -> None:
+    queued = GenerationJob(id=uuid4(), status="queued", attempts=0)
+    session = fake_session(fake_result(queued))
+
+    job = await GenerationJobRepository(session).claim_next()
+
+    sql = session.statements[0][0]
+    assert "ORDER BY generation_jobs.speculative, generation_jobs.created_at" in sql
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert (job.status, job.attempts, session.commits) == ("running", 1, 1)
+
+
+async def test_requeue_stale_fails_jobs_out_of_attempts(fake_session, fake_result) -> None:
+    session = fake_session(fake_result(rowcount=1), fake_result(rowcount=2))
+
+    requeued = await GenerationJobRepository(session).requeue_stale(stale_seconds=360, max_attempts=2)
+
+    (fail_sql, fail_params), (requeue_sql, requeue_params) = session.statements
+    assert "generation_jobs.attempts >= " in fail_sql and fail_params["status"] == "failed"
+    assert "generation_jobs.attempts < " in requeue_sql and requeue_params["status"] == "queued"
+    assert requeued == 2
+
+
+async def test_failed_run_is_recorded_for_its_attempt(monkeypatch, fake_session, fake_result) -> None:
+    session = fake_session(fake_result(rowcount=1))
+
+    class BrokenProgramService:
+        async def generate_program(self, user_id, method, status):
+            raise RuntimeError("LLM unavailable")
+
+    monkeypatch.setattr(worker, "async_session_factory", lambda: session)
+    monkeypatch.setattr(worker, "build_program_service", lambda session: BrokenProgramService())
+    job = SimpleNamespace(id=uuid4(), user_id=uuid4(), method="smart", speculative=False, attempts=2)
+
+    await worker.run_job(job)
+
+    sql, params = session.statements[0]
+    assert session.rollbacks == 1
+    assert params["status"] == "failed" and params["error"] == "RuntimeError: LLM unavailable"
+    # Not written if the job was requeued and claimed again meanwhile
+    assert "generation_jobs.status = " in sql and "generation_jobs.attempts = " in sql
+    assert 2 in params.values()
+
+
+async def test_worker_survives_a_run_that_cannot_be_recorded(monkeypatch) -> None:
+    stop = asyncio.Event()
+    jobs = [SimpleNamespace(id=uuid4())]
+
+    async def claim_next():
+        if not jobs:
+            stop.set()
+            return None
+        return jobs.pop()
+
+    async def run_job(job):
+        raise ConnectionError("database went away")
+
+    monkeypatch.setattr(worker, "claim_next", claim_next)
+    monkeypatch.setattr(worker, "run_job", run_job)
+
+    await worker.worker_loop(stop)
+
+    assert not jobs
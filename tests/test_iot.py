@@ -0,0 +1,180 @@
+"""
+Tests for the IoT machine registry and wait time lookups
+"""
+
+import asyncio
+import time
+
+import httpx
+
+from app.core.config import settings
+from app.services.availability_poller import AvailabilityPoller
+from app.services.iot import IoTService
+from app.services.machine_registry import MachineRegistry, machine_type_of
+
+MACHINES = ["DC_BENCH_001", "DC_BENCH_002", "DC_BENCH_INCLINE_001", "ROWER"]
+
+
+def data_api(predictions: dict, calls: list) -> httpx.AsyncClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path == "/api/machine/list":
+            return httpx.Response(200, json={"machines": MACHINES})
+        machine_id = request.url.path.split("/")[3]
+        return httpx.Response(200, json={"data": predictions[machine_id]})
+
+    return httpx.AsyncClient(base_url="http://data-api", transport=httpx.MockTransport(handler))
+
+
+def iot_service(client: httpx.AsyncClient, max_age_seconds: float = 15) -> IoTService:
+    poller = AvailabilityPoller(interval_seconds=5, max_interval_seconds=10, max_age_seconds=max_age_seconds)
+    return IoTService(client, MachineRegistry(ttl_seconds=60), poller)
+
+
+def test_machine_types_are_matched_exactly() -> None:
+    registry = MachineRegistry(ttl_seconds=60)
+    registry.load(MACHINES)
+
+    assert machine_type_of("DC_BENCH_INCLINE_001") == "DC_BENCH_INCLINE"
+    assert registry.by_type["DC_BENCH"] == ("DC_BENCH_001", "DC_BENCH_002")
+    assert registry.by_type["ROWER"] == ("ROWER",)
+
+
+async def test_machine_list_is_fetched_once_per_ttl() -> None:
+    calls = []
+    predictions = {
+        "DC_BENCH_001": {"available": False, "time_to_wait": 7},
+        "DC_BENCH_002": {"available": False, "time_to_wait": 4},
+        "DC_BENCH_INCLINE_001": {"available": True, "time_to_wait": 0},
+    }
+    async with data_api(predictions, calls) as client:
+        service = iot_service(client)
+        assert await service.get_estimated_wait_time("DC_BENCH") == 4
+        service.poller.snapshot = {}
+        assert await service.get_estimated_wait_time("DC_BENCH") == 4
+
+    assert calls.count("/api/machine/list") == 1
+    assert "/api/machine/DC_BENCH_INCLINE_001/prediction" not in calls
+
+
+def slow_data_api(delays: dict, predictions: dict) -> httpx.AsyncClient:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/api/machine/list":
+            return httpx.Response(200, json={"machines": MACHINES})
+        machine_id = request.url.path.split("/")[3]
+        await asyncio.sleep(delays.get(machine_id, 0))
+        return httpx.Response(200, json={"data": predictions[machine_id]})
+
+    return httpx.AsyncClient(base_url="http://data-api", transport=httpx.MockTransport(handler))
+
+
+async def test_first_free_machine_ends_the_fan_out() -> None:
+    predictions = {
+        "DC_BENCH_001": {"available": False, "time_to_wait": 7},
+        "DC_BENCH_002": {"available": True, "time_to_wait": 0},
+    }
+    async with slow_data_api({"DC_BENCH_001": 10}, predictions) as client:
+        start = time.perf_counter()
+        assert await iot_service(client).get_estimated_wait_time("DC_BENCH") == 0
+    assert time.perf_counter() - start < 1
+
+
+async def test_deadline_answers_with_the_predictions_received(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "IOT_PREDICTION_DEADLINE_SECONDS", 0.2)
+    predictions = {
+        "DC_BENCH_001": {"available": False, "time_to_wait": 7},
+        "DC_BENCH_002": {"available": True, "time_to_wait": 0},
+    }
+    async with slow_data_api({"DC_BENCH_002": 10}, predictions) as client:
+        start = time.perf_counter()
+        assert await iot_service(client).get_estimated_wait_time("DC_BENCH") == 7
+    assert time.perf_counter() - start < 1
+
+
+async def test_fresh_snapshot_answers_without_prediction_requests() -> None:
+    calls = []
+    predictions = {
+        "DC_BENCH_001": {"available": False, "time_to_wait": 7},
+        "DC_BENCH_002": {"available": False, "time_to_wait": 4},
+        "DC_BENCH_INCLINE_001": {"available": True, "time_to_wait": 0},
+        "ROWER": {"available": False, "time_to_wait": 2},
+    }
+    async with data_api(predictions, calls) as client:
+        service = iot_service(client)
+        assert await service.poller.poll_once(service) is True
+        polled = len(calls)
+        assert await service.get_estimated_wait_time("DC_BENCH") == 4
+        assert await service.get_estimated_wait_time("DC_BENCH_INCLINE") == 0
+        assert len(calls) == polled
+        # Nothing changed: the poller backs off
+        assert await service.poller.poll_once(service) is False
+
+
+async def test_stale_snapshot_falls_back_to_live_predictions() -> None:
+    calls = []
+    predictions = {
+        "DC_BENCH_001": {"available": False, "time_to_wait": 7},
+        "DC_BENCH_002": {"available": False, "time_to_wait": 4},
+    }
+    async with data_api(predictions, calls) as client:
+        service = iot_service(client, max_age_seconds=0)
+        service.poller.record({"DC_BENCH_001": {"available": True, "time_to_wait": 0}})
+        assert await service.get_estimated_wait_time("DC_BENCH") == 4
+    assert "/api/machine/DC_BENCH_001/prediction" in calls
+
+
+async def test_wait_times_of_several_types_share_one_round() -> None:
+    calls = []
+    predictions = {
+        "DC_BENCH_001": {"available": False, "time_to_wait": 7},
+        "DC_BENCH_002": {"available": False, "time_to_wait": 4},
+        "DC_BENCH_INCLINE_001": {"available": True, "time_to_wait": 0},
+        "ROWER": {"available": False, "time_to_wait": 2},
+    }
+    async with data_api(predictions, calls) as client:
+        wait_times = await iot_service(client).get_wait_times(
+            ["DC_BENCH", "DC_BENCH_INCLINE", "ROWER", "DC_BENCH", "SQUAT"]
+        )
+
+    assert wait_times == {"DC_BENCH": 4, "DC_BENCH_INCLINE": 0, "ROWER": 2, "SQUAT": 0}
+    assert calls.count("/api/machine/list") == 1
+    assert len(calls) == 1 + len(predictions)
+
+
+async def test_poller_backs_off_while_nothing_changes(monkeypatch) -> None:
+    poller = AvailabilityPoller(interval_seconds=1, max_interval_seconds=5, max_age_seconds=15)
+    rounds = iter([True, False, False, False, RuntimeError("Data API down"), False])
+    sleeps = []
+
+    async def poll_once(iot_service):
+        outcome = next(rounds)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 6:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(poller, "poll_once", poll_once)
+    monkeypatch.setattr("app.services.availability_poller.asyncio.sleep", sleep)
+    try:
+        await poller.run(iot_service=None)
+    except asyncio.CancelledError:
+        pass
+
+    assert sleeps == [1, 2, 4, 5, 1, 2]
+
+
+async def test_rounds_cut_by_the_deadline_refresh_the_other_machines_next() -> None:
+    predictions = {machine_id: {"available": False, "time_to_wait": 3} for machine_id in MACHINES}
+    async with slow_data_api({machine_id: 0.05 for machine_id in MACHINES}, predictions) as client:
+        service = iot_service(client)
+        service.poller.concurrency, service.poller.deadline_seconds = 2, 0.08
+        await service.poller.poll_once(service)
+        first = set(service.poller.snapshot)
+        await service.poller.poll_once(service)
+
+    assert first and first != set(MACHINES)
+    assert set(service.poller.snapshot) == set(MACHINES)
@@ -0,0 +1,78 @@
+"""
+Tests for the in-memory expert markdown corpus
+"""
+
+import os
+
+from app.services.knowledge import KnowledgeBase, KnowledgeService
+
+
+def write(path, text: str, mtime_ns: int) -> None:
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+async def test_refresh_follows_content_changes(tmp_path) -> None:
+    (tmp_path / "exercices").mkdir()
+    doc = tmp_path / "exercices" / "01_biceps.md"
+    write(doc, "# Biceps\nCurl", 1_000)
+    base = KnowledgeBase(str(tmp_path), refresh_seconds=60)
+    service = KnowledgeService(base)
+    assert "--- Source: 01_biceps.md ---\n# Biceps\nCurl" in service.get_muscle_group_info([])
+
+    # Touched, same content: no reload
+    write(doc, "# Biceps\nCurl", 2_000)
+    assert not await base.refresh()
+    assert not await base.refresh()
+
+    write(doc, "# Biceps\nHammer curl", 3_000)
+    (tmp_path / "exercices" / "02_triceps.md").write_text("# Triceps", encoding="utf-8")
+    assert await base.refresh()
+    text = service.get_muscle_group_info([])
+    assert "Hammer curl" in text and "02_triceps.md" in text
+
+
+async def test_removed_file_leaves_the_corpus(tmp_path) -> None:
+    (tmp_path / "principe-de-base").mkdir()
+    doc = tmp_path / "principe-de-base" / "01_volume.md"
+    write(doc, "Volume", 1_000)
+    base = KnowledgeBase(str(tmp_path), refresh_seconds=60)
+    assert "Volume" in KnowledgeService(base).get_construction_guidelines()
+
+    doc.unlink()
+    assert await base.refresh()
+    assert KnowledgeService(base).get_construction_guidelines() == ""
+
+
+def test_sections_are_filtered_by_muscle_group_and_program_type(tmp_path) -> None:
+    (tmp_path / "exercices").mkdir()
+    (tmp_path / "contruction-de-programme").mkdir()
+    (tmp_path / "exercices" / "01_biceps.md").write_text(
+        '---\nslug: "biceps"\ntype: "exercice"\ntags: ["bras"]\n---\n\n# Exercices Biceps\n\n'
+        "## Objectif\n\nCurl\n\n### Curl barre\n\n- Polyvalent\n\n## Pour aller plus loin\n\n- [Triceps](./02_triceps.md)\n",
+        encoding="utf-8",
+    )
+    (tmp_path / "exercices" / "06_jambes.md").write_text(
+        '---\nslug: "jambes"\ntype: "exercice"\n---\n\n# Exercices Jambes\n\n## Objectif\n\nSquat\n',
+        encoding="utf-8",
+    )
+    (tmp_path / "contruction-de-programme" / "04_push-pull-legs.md").write_text(
+        '---\nslug: "push-pull-legs"\ntype: "programme"\n---\n\n# PPL\n\n## Structure\n\nPush, pull, legs\n',
+        encoding="utf-8",
+    )
+    (tmp_path / "contruction-de-programme" / "05_bro-split.md").write_text(
+        '---\nslug: "bro-split"\ntype: "programme"\n---\n\n# Bro Split\n\n## Structure\n\nOne muscle a day\n',
+        encoding="utf-8",
+    )
+    service = KnowledgeService(KnowledgeBase(str(tmp_path), refresh_seconds=60))
+
+    legs = service.get_muscle_group_info(["quadriceps"])
+    assert "Squat" in legs and "Curl" not in legs
+    biceps = service.get_muscle_group_info(["biceps"])
+    assert "### Curl barre" in biceps and "Pour aller plus loin" not in biceps and "slug:" not in biceps
+    # No guidance for that muscle group: everything
+    assert "Squat" in service.get_muscle_group_info(["épaules"])
+
+    guidelines = service.get_construction_guidelines("push-pull-legs")
+    assert "Push, pull, legs" in guidelines and "One muscle a day" not in guidelines
+    assert "One muscle a day" in service.get_construction_guidelines()
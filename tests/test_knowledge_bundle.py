@@ -0,0 +1,69 @@
+"""
+Tests for the prebuilt knowledge bundle
+"""
+
+import uuid
+
+import numpy as np
+
+from app.schemas.knowledge import KnowledgeHit
+from app.services.knowledge import KnowledgeBase, KnowledgeService, load_corpus
+from app.services.knowledge_bundle import open_bundle, write_bundle
+from app.services.rag_lexical import BM25Index
+
+
+def test_bundle_round_trip(tmp_path) -> None:
+    (tmp_path / "md" / "exercices").mkdir(parents=True)
+    (tmp_path / "md" / "exercices" / "01_biceps.md").write_text(
+        '---\nslug: "biceps"\ntype: "exercice"\n---\n\n# Exercices Biceps\n\n## Objectif\n\nCurl\n', encoding="utf-8"
+    )
+    corpus = load_corpus(str(tmp_path / "md"))
+    items = [
+        KnowledgeHit(id=uuid.uuid4(), source_type="exercise", source_id=uuid.uuid4(),
+                     content_text="Barbell Curl biceps", metadata_info={"muscle": "biceps"}),
+        KnowledgeHit(id=uuid.uuid4(), source_type="exercise", source_id=uuid.uuid4(),
+                     content_text="Back Squat quadriceps", metadata_info={"muscle": "quadriceps"}),
+    ]
+    embeddings = np.arange(6, dtype=np.float32).reshape(2, 3)
+
+    path = str(tmp_path / "knowledge.bundle")
+    version = write_bundle(path, corpus, items, embeddings, knowledge_version="v1")
+    bundle = open_bundle(path)
+
+    assert bundle.version == version and bundle.knowledge_version == "v1"
+    assert isinstance(bundle.embeddings, np.memmap)
+    np.testing.assert_array_equal(bundle.embeddings, embeddings)
+    assert bundle.items() == items
+    assert bundle.corpus().sections == corpus.sections
+
+    # Lexical hits carry their vector from the mapped matrix
+    hit, = BM25Index(bundle.items(), vectors=bundle.embeddings).search("squat", limit=1)
+    assert hit.source_id == items[1].source_id and hit.embedding == [3.0, 4.0, 5.0]
+
+
+def test_missing_or_invalid_bundle_is_ignored(tmp_path) -> None:
+    assert open_bundle(str(tmp_path / "missing.bundle")) is None
+    (tmp_path / "bad.bundle").write_bytes(b"not a bundle")
+    assert open_bundle(str(tmp_path / "bad.bundle")) is None
+
+
+async def test_bundle_corpus_is_checked_against_file_contents(tmp_path) -> None:
+    (tmp_path / "exercices").mkdir()
+    doc = tmp_path / "exercices" / "01_biceps.md"
+    doc.write_text("# Biceps\nCurl", encoding="utf-8")
+    path = str(tmp_path / "knowledge.bundle")
+    write_bundle(path, load_corpus(str(tmp_path)), [], np.zeros((0, 3), dtype=np.float32), knowledge_version=None)
+    bundle = open_bundle(path)
+    # Built elsewhere: no mtime of the build machine
+    assert all(document.mtime_ns is None for document in bundle.corpus().documents)
+
+    base = KnowledgeBase(str(tmp_path), refresh_seconds=60)
+    base.load(bundle)
+    # Same content: the file is hashed once and its mtime recorded, nothing reloaded
+    assert not await base.refresh()
+    assert base.corpus.documents[0].mtime_ns is not None
+
+    base.load(bundle)
+    doc.write_text("# Biceps\nHammer curl", encoding="utf-8")
+    assert await base.refresh()
+    assert "Hammer curl" in KnowledgeService(base).get_muscle_group_info([])
@@ -0,0 +1,107 @@
+"""
+Tests for the in-memory exercise assignment of the Librarian (ProgramGenerator.realize_program)
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from app.core.config import settings
+from app.schemas.knowledge import KnowledgeHit
+from app.services.program_generator import ProgramGenerator
+
+
+def test_no_duplicate_within_a_session(make_hit) -> None:
+    """The same query twice in a session gets two different exercises"""
+    squat = make_hit("Squat", score=1.0, embedding=[1.0, 0.0, 0.0])
+    leg_press = make_hit("Leg Press", score=0.9, embedding=[0.0, 1.0, 0.0])
+    slots = [(0, {}, 0), (0, {}, 0)]
+
+    picks = ProgramGenerator._assign_exercises(slots, [[squat, leg_press]])
+
+    assert [hit.metadata_info["name"] for hit in picks] == ["Squat", "Leg Press"]
+
+
+def test_similar_queries_spread_across_sessions(make_hit) -> None:
+    """A near-duplicate of an exercise picked earlier loses to a slightly less relevant, different one"""
+    squat = make_hit("Squat", score=1.0, embedding=[1.0, 0.0, 0.0])
+    smith_squat = make_hit("Smith Squat", score=0.95, embedding=[0.99, 0.1, 0.0])
+    lunge = make_hit("Lunge", score=0.9, embedding=[0.0, 0.0, 1.0])
+    slots = [(0, {}, 0), (1, {}, 1)]
+
+    picks = ProgramGenerator._assign_exercises(slots, [[squat], [smith_squat, lunge]])
+
+    assert [hit.metadata_info["name"] for hit in picks] == ["Squat", "Lunge"]
+
+
+def test_exhausted_or_empty_pool_is_unresolved(make_hit) -> None:
+    squat = make_hit("Squat", score=1.0, embedding=[1.0, 0.0, 0.0])
+    slots = [(0, {}, 0), (0, {}, 0), (0, {}, 1)]
+
+    picks = ProgramGenerator._assign_exercises(slots, [[squat], []])
+
+    assert picks[0] is squat
+    assert picks[1] is None and picks[2] is None
+
+
+class FakeRetriever:
+    storage = "full"
+
+    def __init__(self, pools: dict[str, list[KnowledgeHit]]):
+        self.pools = pools
+        self.calls = []
+
+    async def search_pools(self, queries, pool_size, source_type, filters, mode):
+        self.calls.append(list(queries))
+        return [self.pools.get(query, []) for query in queries]
+
+
+async def test_realize_program_dedupes_queries_and_keeps_order(make_hit) -> None:
+    squat = make_hit("Squat", score=1.0, embedding=[1.0, 0.0, 0.0])
+    curl = make_hit("Curl", score=1.0, embedding=[0.0, 1.0, 0.0])
+    retriever = FakeRetriever({"leg compound": [squat], "arm isolation": [curl]})
+    skeleton = {"sessions": [
+        {"name": "A", "exercises": [{"search_query": "leg compound"}, {"search_query": "arm isolation"}]},
+        {"name": "B", "exercises": [{"search_query": "leg compound"}, {"search_query": "unknown"}]},
+    ]}
+
+    sessions = await ProgramGenerator(None, retriever).realize_program(skeleton)
+
+    assert retriever.calls == [["leg compound", "arm isolation", "unknown"]]
+    assert [s.name for s in sessions] == ["A", "B"]
+    assert [e["exercise_name"] for e in sessions[0].exercises_plan] == ["Squat", "Curl"]
+    assert [e["exercise_name"] for e in sessions[1].exercises_plan] == ["Squat", "unknown"]
+    assert sessions[1].exercises_plan[1]["exercise_id"] is None
+
+
+async def test_search_pools_chunks_keep_query_order(monkeypatch, make_hit) -> None:
+    """Chunks run concurrently on their own sessions; the first one finishes last"""
+    monkeypatch.setattr(settings, "LIBRARIAN_QUERIES_PER_TASK", 2)
+    monkeypatch.setattr(settings, "LIBRARIAN_CONCURRENCY", 3)
+    queries = [f"query {i}" for i in range(5)]
+    hits = {query: make_hit(query) for query in queries}
+    sessions, in_flight, peak = [], [0], [0]
+
+    class ChunkRetriever:
+        def __init__(self, session, storage=None):
+            self.session = session
+
+        async def search_pools(self, queries, pool_size, source_type, filters, mode):
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+            # Later chunks answer first
+            await asyncio.sleep(0.03 if queries[0] == "query 0" else 0.0)
+            in_flight[0] -= 1
+            return [[hits[query]] for query in queries]
+
+    @asynccontextmanager
+    async def session_factory():
+        sessions.append(object())
+        yield sessions[-1]
+
+    monkeypatch.setattr("app.services.program_generator.KnowledgeRetriever", ChunkRetriever)
+    generator = ProgramGenerator(None, FakeRetriever({}), session_factory=session_factory)
+
+    pools = await generator._search_pools(queries, [None] * len(queries))
+
+    assert [pool[0].content_text for pool in pools] == queries
+    assert len(sessions) == 3 and peak[0] == 3
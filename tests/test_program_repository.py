@@ -0,0 +1,56 @@
+"""
+Tests for the program creation transaction of ProgramRepository
+"""
+
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import inspect
+
+from app.models.domain import Program, Session
+from app.repositories.program import ProgramRepository
+
+
+def new_program(status: str = "active") -> tuple[Program, list[Session]]:
+    program = Program(user_id=uuid4(), name="Prise de masse", status=status)
+    sessions = [Session(name=f"Séance {i}", order_index=i) for i in (1, 2)]
+    return program, sessions
+
+
+async def test_archive_and_inserts_share_one_commit(fake_session, fake_result) -> None:
+    program, sessions = new_program()
+    created = Program(id=uuid4(), user_id=program.user_id, name=program.name, status="active")
+    created_sessions = [Session(id=uuid4(), program_id=created.id, name=s.name) for s in sessions]
+    session = fake_session(fake_result(), fake_result(created), fake_result(rows=created_sessions))
+
+    result = await ProgramRepository(session).create_program(program, sessions)
+
+    (archive, archive_params), (insert_program, _), (insert_sessions, _) = session.statements
+    assert archive.startswith("UPDATE programs SET status=") and "archived" in archive_params.values()
+    assert insert_program.startswith("INSERT INTO programs") and "RETURNING" in insert_program
+    assert insert_sessions.startswith("INSERT INTO sessions")
+    assert session.events == ["execute", "execute", "execute", "commit"]
+    # Sessions set as loaded, no lazy load (nor query) when they are read
+    assert result is created and "sessions" not in inspect(result).unloaded
+    assert result.sessions == created_sessions
+
+
+async def test_pending_program_keeps_the_active_one(fake_session, fake_result) -> None:
+    program, _ = new_program(status="pending")
+    session = fake_session(fake_result(Program(id=uuid4(), status="pending")))
+
+    await ProgramRepository(session).create_program(program, [])
+
+    assert not any(sql.startswith("UPDATE") for sql, _ in session.statements)
+    assert session.commits == 1
+
+
+async def test_failed_insert_rolls_back_the_archive(fake_session, fake_result) -> None:
+    program, sessions = new_program()
+    session = fake_session(fake_result(), ConnectionError("connection reset"))
+
+    with pytest.raises(ConnectionError):
+        await ProgramRepository(session).create_program(program, sessions)
+
+    assert session.events == ["execute", "execute", "rollback"]
+    assert session.commits == 0
@@ -0,0 +1,71 @@
+"""
+Tests for the KnowledgeRetriever result cache
+"""
+
+from app.services.rag_cache import SearchResultCache
+
+
+def test_key_is_normalized() -> None:
+    """Case, spacing and filter order do not change the key"""
+    a = SearchResultCache.make_key("  Cable  Lat Pulldown", limit=1, filters={"muscle": "dos", "level": "beginner"})
+    b = SearchResultCache.make_key("cable lat pulldown", filters={"level": "beginner", "muscle": "dos"}, limit=1)
+    c = SearchResultCache.make_key("cable lat pulldown", filters={"level": "beginner", "muscle": "dos"}, limit=2)
+
+    assert a == b
+    assert a != c
+
+
+def test_hit_and_miss_are_counted(make_hit) -> None:
+    """A stored result is returned and counted as a hit"""
+    cache = SearchResultCache(max_entries=10, ttl_seconds=60, version_check_seconds=60)
+    key = cache.make_key("squat", limit=1)
+    hits = [make_hit("Barbell Back Squat")]
+
+    assert cache.get(key) is None
+    cache.put(key, hits)
+
+    assert cache.get(key) == hits
+    assert cache.hits == 1
+    assert cache.misses == 1
+    assert cache.hit_ratio == 0.5
+
+
+def test_expired_and_evicted_entries(make_hit) -> None:
+    """Entries expire after the TTL and the least recently used one is evicted first"""
+    expired = SearchResultCache(max_entries=10, ttl_seconds=0, version_check_seconds=60)
+    expired.put("q", [make_hit("a")])
+    assert expired.get("q") is None
+
+    cache = SearchResultCache(max_entries=2, ttl_seconds=60, version_check_seconds=60)
+    cache.put("a", [])
+    cache.put("b", [])
+    cache.get("a")
+    cache.put("c", [])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == []
+    assert len(cache) == 2
+
+
+def test_results_of_the_previous_version_are_not_stored(make_hit) -> None:
+    """A search started before the cache was emptied does not store its hits"""
+    cache = SearchResultCache(max_entries=10, ttl_seconds=60, version_check_seconds=60)
+    key = cache.make_key("squat", limit=1)
+    generation = cache.generation
+
+    cache.clear()  # The knowledge base was re-ingested during the search
+    cache.put(key, [make_hit("Barbell Back Squat")], generation)
+
+    assert cache.get(key) is None
+
+
+async def test_failed_version_check_keeps_the_session_usable(fake_session, make_hit) -> None:
+    """The check runs in a savepoint: its failure does not abort the search's transaction"""
+    cache = SearchResultCache(max_entries=10, ttl_seconds=60, version_check_seconds=0)
+    cache.put("q", [make_hit("a")])
+    session = fake_session(ConnectionError("catalog_versions unavailable"))
+
+    await cache.sync_version(session)
+
+    assert session.events == ["savepoint", "execute", "rollback to savepoint"]
+    assert cache.get("q") is not None
@@ -0,0 +1,48 @@
+"""
+Tests for the BM25 fallback index of the RAG
+"""
+
+import pytest
+
+from app.schemas.knowledge import KnowledgeHit
+from app.services.rag_lexical import BM25Index, LexicalFallback
+
+
+@pytest.fixture
+def docs(make_hit) -> list[KnowledgeHit]:
+    return [
+        make_hit("Exercise: Squat barre. Target: quadriceps. Equipment: barre", muscle="quadriceps"),
+        make_hit("Exercise: Presse à cuisses. Target: quadriceps. Equipment: machine", muscle="quadriceps"),
+        make_hit("Exercise: Curl biceps barre. Target: biceps. Equipment: barre", muscle="biceps"),
+        make_hit("Le squat est le roi des exercices pour les jambes", source_type="doc_chunk"),
+    ]
+
+
+def test_exact_name_ranks_first(docs) -> None:
+    hits = BM25Index(docs).search("squat barre", limit=2)
+    assert hits[0].content_text == docs[0].content_text
+    assert hits[0].score > hits[1].score
+
+
+def test_filters_and_source_type(docs) -> None:
+    index = BM25Index(docs)
+    hits = index.search("barre", limit=5, source_type="exercise", filters={"muscle": "biceps"})
+    assert [hit.id for hit in hits] == [docs[2].id]
+    assert all(hit.source_type == "doc_chunk" for hit in index.search("squat", source_type="doc_chunk"))
+
+
+def test_unknown_terms_return_nothing(docs) -> None:
+    assert BM25Index(docs).search("deadlift") == []
+    assert BM25Index([]).search("squat") == []
+
+
+async def test_failed_refresh_keeps_the_index_and_the_session(docs, fake_session, fake_result) -> None:
+    fallback = LexicalFallback(version_check_seconds=0)
+    fallback.index = BM25Index(docs)
+    # The version changed, then reading the new items fails
+    session = fake_session(fake_result("v2"), fake_result("v2"), ConnectionError("connection reset"))
+
+    await fallback.sync(session)
+
+    assert session.events[0] == "savepoint" and session.events[-1] == "rollback to savepoint"
+    assert fallback.search("squat")[0].id == docs[0].id
@@ -0,0 +1,86 @@
+"""
+Tests for the SQL side of KnowledgeRetriever searches
+"""
+
+import re
+
+import pytest
+
+from app.services.rag import KnowledgeRetriever
+
+# Iterative scans are "strict_order" before the search
+PREVIOUS_SCAN_MODE = "strict_order"
+
+
+async def test_filtered_search_scopes_iterative_scan_to_the_search(monkeypatch, fake_session, fake_result) -> None:
+    monkeypatch.setattr("app.services.rag.settings.RAG_HNSW_ITERATIVE_SCAN", "relaxed_order")
+    session = fake_session(default=fake_result(PREVIOUS_SCAN_MODE))
+
+    await KnowledgeRetriever(session, use_cache=False).search_by_vector(
+        [0.1] * 8, limit=5, source_type="exercise", filters={"muscle": "dos"}
+    )
+
+    (enable, enable_params), (search, _), (reset, reset_params) = session.statements
+    assert "current_setting" in enable and "relaxed_order" in enable_params.values()
+    assert "knowledge_items.metadata_info @> " in search
+    # Back to the value the transaction had, not left on for its next statements
+    assert "set_config" in reset and PREVIOUS_SCAN_MODE in reset_params.values()
+
+
+async def test_unfiltered_search_leaves_the_setting_alone(fake_session, fake_result) -> None:
+    session = fake_session(default=fake_result(PREVIOUS_SCAN_MODE))
+
+    await KnowledgeRetriever(session, use_cache=False).search_by_vector([0.1] * 8, limit=5)
+
+    (search, _), = session.statements
+    assert "set_config" not in search
+
+
+async def test_hybrid_search_fuses_both_rankings(monkeypatch, fake_session, fake_result) -> None:
+    monkeypatch.setattr("app.services.rag.settings.RAG_RRF_K", 60)
+    session = fake_session(default=fake_result())
+
+    await KnowledgeRetriever(session, storage="full", use_cache=False).search_by_vector(
+        [0.1] * 8, limit=5, lexical_query="Squat barre", semantic_weight=2.0, lexical_weight=0.5
+    )
+
+    (sql, params), = session.statements
+    # Items found by only one of the rankings are kept, with no contribution from the other
+    assert "semantic FULL OUTER JOIN (" in sql and ") AS lexical ON semantic.id = lexical.id" in sql
+    assert "coalesce(semantic.id, lexical.id)" in sql
+    assert "squat | barre" in params.values()
+
+    # Each weight divides by k + the rank of its own ranking
+    for ranking, weight in (("semantic", 2.0), ("lexical", 0.5)):
+        weight_param, k_param = re.search(
+            rf"%\((\w+)\)s / CAST\(\(%\((\w+)\)s::INTEGER \+ {ranking}\.rank\)", sql
+        ).groups()
+        assert (params[weight_param], params[k_param]) == (weight, 60)
+
+    # Highest fused score first, ties to the better semantic rank, lexical-only items after
+    assert re.search(r"\) DESC, semantic\.rank NULLS LAST, lexical\.rank\s+LIMIT", sql)
+
+
+@pytest.mark.parametrize("storage, first_pass, query_param", [
+    ("halfvec", "knowledge_items.embedding_half <=> ", [0.1, -0.2, 0.3, 0.0]),
+    ("binary", "knowledge_items.embedding_bin <~> ", "1010"),
+])
+async def test_compact_storage_is_reranked_on_full_vectors(
+    monkeypatch, fake_session, fake_result, storage, first_pass, query_param
+) -> None:
+    monkeypatch.setattr("app.services.rag.settings.RAG_RERANK_FACTOR", 10)
+    session = fake_session(default=fake_result())
+
+    await KnowledgeRetriever(session, storage=storage, use_cache=False).search_by_vector(
+        [0.1, -0.2, 0.3, 0.0], limit=5
+    )
+
+    (sql, params), = session.statements
+    candidates = re.search(rf"ORDER BY {re.escape(first_pass)}%\((\w+)\)s\S*\s+LIMIT %\((\w+)\)s", sql)
+    assert candidates, sql
+    assert (params[candidates[1]], params[candidates[2]]) == (query_param, 50)
+    # The candidates are ordered again by exact cosine distance and cut to the limit
+    rerank = re.search(r"ORDER BY (anon_\d+)\.embedding <=> %\((\w+)\)s\s+LIMIT %\((\w+)\)s", sql)
+    assert rerank, sql
+    assert (params[rerank[2]], params[rerank[3]]) == ([0.1, -0.2, 0.3, 0.0], 5)
+    assert "FROM (SELECT knowledge_items.id AS id, knowledge_items.embedding AS embedding" in sql
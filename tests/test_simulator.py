@@ -0,0 +1,54 @@
+"""
+Tests for the Fit Buddy Data API simulator, through the services that call the real one
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from app.services.availability_poller import AvailabilityPoller
+from app.services.iot import IoTService
+from app.services.machine_registry import MachineRegistry
+from app.services.sensor import SensorService
+from app.simulator.config import SimulatorSettings
+from app.simulator.gym import GymSimulator
+from app.simulator.main import create_app
+
+
+def simulator(**overrides) -> GymSimulator:
+    config = SimulatorSettings(
+        LATENCY_DISTRIBUTION="constant", LATENCY_MEDIAN_MS=0,
+        LATENCY_TAIL_PROBABILITY=0, **overrides,
+    )
+    return GymSimulator(config, machine_types=["DC_BENCH", "ROWER"])
+
+
+def client_for(gym: GymSimulator) -> httpx.AsyncClient:
+    return httpx.AsyncClient(base_url="http://data-api", transport=httpx.ASGITransport(app=create_app(gym)))
+
+
+async def test_services_parse_the_simulated_responses() -> None:
+    gym = simulator(OCCUPANCY=1.0)
+    end = datetime.now(timezone.utc)
+    async with client_for(gym) as client:
+        iot = IoTService(client, MachineRegistry(ttl_seconds=60), AvailabilityPoller(5, 10, 15))
+        wait_times = await iot.get_wait_times(["DC_BENCH", "ROWER"])
+        snapshot = await SensorService(client).get_sensor_snapshot("ROWER_001", end - timedelta(seconds=30), end)
+
+    assert gym.machines == ["DC_BENCH_001", "DC_BENCH_002", "DC_BENCH_003", "ROWER_001", "ROWER_002", "ROWER_003"]
+    assert all(1 <= wait <= gym.settings.MAX_WAIT_MINUTES for wait in wait_times.values())
+    assert snapshot["metrics"]["avg_power_watts"] > 0
+    assert snapshot["metrics"]["duration_seconds"] == 30
+
+
+async def test_errors_and_unknown_machines() -> None:
+    async with client_for(simulator(ERROR_RATE=1.0)) as client:
+        assert (await client.get("/api/machine/list")).status_code == 503
+    async with client_for(simulator()) as client:
+        assert (await client.get("/api/machine/SQUAT_001/prediction")).status_code == 404
+
+
+def test_availability_is_stable_within_a_state_window() -> None:
+    gym = simulator(STATE_SECONDS=20)
+    assert gym.prediction("ROWER_001", now=1000.0) == gym.prediction("ROWER_001", now=1019.0)
+    assert simulator(OCCUPANCY=0.0).prediction("ROWER_001") == {"available": True, "time_to_wait": 0}
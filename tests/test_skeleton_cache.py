@@ -0,0 +1,53 @@
+"""
+Tests for the Architect skeleton cache
+"""
+
+from app.services.skeleton_cache import SkeletonCache, is_valid_skeleton, profile_fingerprint
+
+PROFILE = {
+    "goal": "muscle_gain",
+    "experience_level": "beginner",
+    "days_per_week": 3,
+    "session_duration_minutes": 60,
+    "injuries": ["Knee"],
+    "current_stats": {"weight_kg": 75.0, "height_cm": 180.0, "age": 30},
+}
+
+
+def make_skeleton(name: str) -> dict:
+    return {"program_name": name, "sessions": [{"name": "A", "exercises": [{"search_query": "squat"}]}]}
+
+
+def test_similar_profiles_share_a_fingerprint() -> None:
+    similar = {**PROFILE, "session_duration_minutes": 55, "injuries": [" knee "],
+               "current_stats": {"weight_kg": 78.0, "height_cm": 182.0, "age": 33}}
+    different = {**PROFILE, "days_per_week": 4}
+
+    assert profile_fingerprint(similar) == profile_fingerprint(PROFILE)
+    assert profile_fingerprint(different) != profile_fingerprint(PROFILE)
+
+
+def test_reuse_starts_once_the_pool_is_full() -> None:
+    cache = SkeletonCache(ttl_seconds=60, pool_size=2, max_buckets=10)
+    key = profile_fingerprint(PROFILE)
+
+    assert cache.put(key, make_skeleton("one"))
+    assert cache.get(key) is None
+    assert cache.put(key, make_skeleton("two"))
+    assert not cache.put(key, make_skeleton("three"))
+
+    hit = cache.get(key)
+    assert hit["program_name"] in ("one", "two")
+    hit["sessions"].clear()
+    assert all(cache.get(key)["sessions"] for _ in range(5))
+
+
+def test_invalid_or_expired_skeletons_are_not_reused() -> None:
+    assert not is_valid_skeleton({})
+    assert not is_valid_skeleton({"sessions": [{"name": "A", "exercises": [{"sets": 3}]}]})
+
+    cache = SkeletonCache(ttl_seconds=0, pool_size=1, max_buckets=10)
+    key = profile_fingerprint(PROFILE)
+    assert not cache.put(key, {"sessions": []})
+    assert cache.put(key, make_skeleton("one"))
+    assert cache.get(key) is None
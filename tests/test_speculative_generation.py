@@ -0,0 +1,138 @@
+"""
+Tests for the hand-over of speculative program generations
+"""
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+
+from app.api.dependencies import get_current_user
+from app.api.v1.endpoints.profile import get_profile_service
+from app.main import app
+from app.services.generation_job import GenerationJobService
+from app.services.profile import ProfileService
+
+VERSION = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeProfileRepository:
+    async def get_by_user_id(self, user_id):
+        return SimpleNamespace(user_id=user_id, updated_at=VERSION)
+
+
+class FakeJobRepository:
+    def __init__(self, speculative=None):
+        self.speculative = speculative
+        self.calls = []
+
+    async def get_by_idempotency_key(self, user_id, idempotency_key):
+        return None
+
+    async def take_speculative(self, user_id, method, profile_version, idempotency_key=None):
+        self.calls.append(("take", method, profile_version))
+        job = self.speculative
+        if job is not None and job.method == method and job.profile_version == profile_version:
+            return job
+        return None
+
+    async def cancel_speculative(self, user_id):
+        self.calls.append(("cancel",))
+        return 1
+
+    async def enqueue(self, user_id, method, idempotency_key=None):
+        self.calls.append(("enqueue", method))
+        return SimpleNamespace(id=uuid4(), method=method, status="queued"), True
+
+
+async def test_request_takes_over_matching_speculation() -> None:
+    ready = SimpleNamespace(id=uuid4(), method="template", profile_version=VERSION, status="succeeded")
+    jobs = FakeJobRepository(speculative=ready)
+    service = GenerationJobService(jobs, FakeProfileRepository())
+
+    job, created = await service.enqueue_generation(uuid4(), method="template")
+
+    assert job is ready and not created
+    assert [call[0] for call in jobs.calls] == ["take"]
+
+
+async def test_other_method_cancels_speculation_and_enqueues() -> None:
+    ready = SimpleNamespace(id=uuid4(), method="template", profile_version=VERSION, status="succeeded")
+    jobs = FakeJobRepository(speculative=ready)
+    service = GenerationJobService(jobs, FakeProfileRepository())
+
+    job, created = await service.enqueue_generation(uuid4(), method="smart")
+
+    assert created and job.method == "smart"
+    assert [call[0] for call in jobs.calls] == ["take", "cancel", "enqueue"]
+
+
+class ExpiringProfile:
+    """ORM row stand-in: attributes can no longer be read once its session rolled back"""
+
+    def __init__(self, session, user_id):
+        self._session = session
+        self._values = {
+            "user_id": user_id,
+            "onboarding_data": {"goal": "muscle_gain", "experience_level": "beginner"},
+            "current_stats": {"weight_kg": 80, "height_cm": 180, "age": 30},
+            "created_at": VERSION,
+            "updated_at": VERSION,
+        }
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if self._session.rollbacks:
+            raise RuntimeError(f"expired attribute {name} lazy-loaded outside of a greenlet")
+        return self._values[name]
+
+
+class FailingProfileStore:
+    """Profile and job repositories sharing one session, with a broken job queue"""
+
+    def __init__(self, session):
+        self.session = session
+
+    async def get_by_user_id(self, user_id):
+        return None
+
+    async def create(self, user_id, onboarding, stats):
+        return ExpiringProfile(self.session, user_id)
+
+    async def update(self, user_id, onboarding=None, stats=None):
+        return ExpiringProfile(self.session, user_id)
+
+    async def enqueue_speculative(self, user_id, method, profile_version):
+        raise RuntimeError("generation_jobs unavailable")
+
+    async def cancel_speculative(self, user_id):
+        raise RuntimeError("generation_jobs unavailable")
+
+
+def test_profile_writes_succeed_when_the_job_queue_fails(fake_session) -> None:
+    user_id = uuid4()
+    stores = []
+
+    def failing_service():
+        stores.append(FailingProfileStore(fake_session()))
+        return ProfileService(stores[-1], stores[-1])
+
+    app.dependency_overrides[get_current_user] = lambda: {"id": user_id}
+    app.dependency_overrides[get_profile_service] = failing_service
+    body = {
+        "onboarding_data": {"goal": "muscle_gain", "experience_level": "beginner"},
+        "current_stats": {"weight_kg": 80, "height_cm": 180, "age": 30},
+    }
+    try:
+        client = TestClient(app)
+        created = client.post("/api/v1/profile/onboarding", json=body)
+        updated = client.patch("/api/v1/profile/me", json=body)
+    finally:
+        app.dependency_overrides.clear()
+
+    assert created.status_code == 200, created.text
+    assert created.json()["data"]["user_id"] == str(user_id)
+    assert updated.status_code == 200, updated.text
+    assert all(store.session.rollbacks == 1 for store in stores)
@@ -0,0 +1,56 @@
+"""
+Tests for the compiled program template catalog
+"""
+
+from types import SimpleNamespace
+from uuid import uuid4
+
+from app.services.template_catalog import TemplateCatalog, compile_templates
+from app.services.templates import PROGRAM_TEMPLATES
+
+
+class FakeDictionaryRepository:
+    def __init__(self, known: set[str]):
+        self.known = known
+        self.calls = 0
+
+    async def get_exercises_by_names(self, names):
+        self.calls += 1
+        return {name: SimpleNamespace(id=uuid4()) if name in self.known else None for name in names}
+
+
+async def test_templates_are_resolved_in_one_query() -> None:
+    template = PROGRAM_TEMPLATES["muscle_gain_beginner"]
+    first = template.sessions[0].exercises[0].default_exercise
+    repo = FakeDictionaryRepository({first})
+
+    compiled = await compile_templates(repo)
+
+    assert repo.calls == 1
+    plan = compiled["muscle_gain_beginner"].sessions[0].exercises_plan
+    assert plan[0]["exercise_id"] is not None
+    assert plan[1]["exercise_id"] is None
+    assert plan[1]["exercise_name"] == template.sessions[0].exercises[1].default_exercise
+
+
+async def test_built_sessions_do_not_share_plans() -> None:
+    compiled = (await compile_templates(FakeDictionaryRepository(set())))["muscle_gain_beginner"]
+
+    a, b = compiled.build_sessions(), compiled.build_sessions()
+    a[0].exercises_plan[0]["notes"] = "changed"
+
+    assert b[0].exercises_plan[0]["notes"] != "changed"
+    assert compiled.sessions[0].exercises_plan[0]["notes"] != "changed"
+    assert [s.order_index for s in a] == list(range(1, len(a) + 1))
+
+
+async def test_failed_version_check_keeps_the_compilation(fake_session) -> None:
+    catalog = TemplateCatalog(version_check_seconds=0)
+    catalog._templates = await compile_templates(FakeDictionaryRepository(set()))
+    session = fake_session(ConnectionError("catalog_versions unavailable"))
+
+    await catalog.sync(session)
+
+    # Only the savepoint is rolled back: the caller's transaction goes on
+    assert session.events == ["savepoint", "execute", "rollback to savepoint"]
+    assert catalog.get("muscle_gain", "beginner").template is PROGRAM_TEMPLATES["muscle_gain_beginner"]
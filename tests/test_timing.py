@@ -0,0 +1,47 @@
+"""
+Tests for the Server-Timing breakdown
+"""
+
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.timing import record, span, timed
+from app.middleware.timing import TimingMiddleware
+
+
+@timed("llm")
+async def fake_llm_call() -> None:
+    await asyncio.sleep(0)
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(TimingMiddleware)
+
+    @app.get("/work")
+    async def work() -> dict:
+        await fake_llm_call()
+        await fake_llm_call()
+        # Spans recorded from a worker thread land in the same request
+        await asyncio.to_thread(record, "embedding", 0.002)
+        with span("iot"):
+            pass
+        return {}
+
+    return app
+
+
+def test_spans_are_returned_in_server_timing() -> None:
+    response = TestClient(build_app()).get("/work")
+
+    entries = {entry.split(";")[0]: entry for entry in response.headers["Server-Timing"].split(", ")}
+    assert set(entries) == {"llm", "embedding", "iot", "total"}
+    assert 'desc="2x"' in entries["llm"]
+    assert "dur=2.0" in entries["embedding"]
+
+
+def test_recording_outside_a_request_is_a_no_op() -> None:
+    record("db", 1.0)
+    asyncio.run(fake_llm_call())
@@ -0,0 +1,15 @@
+"""
+Tests for the vector helpers of app/utils/vectors.py
+"""
+
+from app.utils.vectors import binary_quantize
+
+
+def test_binary_quantize_sets_the_bits_of_positive_values() -> None:
+    # Same as pgvector: zero and negative values give 0
+    assert binary_quantize([0.5, -0.5, 0.0, 1e-9, -1e-9]) == "10010"
+
+
+def test_binary_quantize_keeps_one_bit_per_dimension() -> None:
+    assert binary_quantize([]) == ""
+    assert len(binary_quantize([0.1] * 768)) == 768